@@ -0,0 +1,300 @@
+"""
+📚 BATCH INSTAGRAM SCRAPER
+===========================
+Captura una lista de perfiles de Instagram repartiéndolos entre varios Chrome
+que trabajan a la vez. Cada worker toma una copia del pool de perfiles
+(profile_pool.py), así que tiene su propia sesión y su propio Chrome, y va
+sacando perfiles de una cola común hasta vaciarla; su Chrome se reutiliza de
+un perfil al siguiente.
+
+Todo va a la misma salida que el scraper de un perfil: carruseles/<post_id>,
+imagenes/<post_id>, un único posts_data.jsonl y un único índice de posts
+vistos (así dos perfiles que comparten un post no lo capturan dos veces).
+
+Mientras corre muestra el ritmo (posts/minuto) de cada worker y el total.
+
+Uso:
+    python batch_scraper.py perfiles.txt [--workers 3] [--harvest] [--tabs 3]
+    python batch_scraper.py https://www.instagram.com/a/ https://www.instagram.com/b/
+
+    En los archivos de perfiles va una URL por línea; las que empiezan por #
+    se ignoran.
+"""
+
+import os
+import sys
+import time
+import queue
+import argparse
+import threading
+
+from wait_engine import reset_wait_stats, format_wait_report
+from profile_pool import ProfilePool, POOL_SIZE, LEASE_POLL
+from instagram_scraper import (HeadlessScraper, PostLogWriter, SeenPostsIndex, compact_posts_log,
+                               migrate_legacy_posts_json,
+                               PROFILE_PATH, POSTS_LOG_PATH, OUTPUT_DIR, STOP_AFTER_KNOWN, POST_TABS)
+
+WORKERS = 3  # Chrome simultáneos por defecto
+REPORT_INTERVAL = 30  # Segundos entre reportes de ritmo
+STAGGER_DELAY = 2.0  # Segundos entre el arranque de un worker y el siguiente
+LEASE_TIMEOUT = 120  # Segundos que un worker espera una copia del perfil que otra herramienta tiene prestada
+
+
+def read_profile_urls(sources):
+    """URLs de perfil a partir de URLs sueltas o archivos (una por línea), sin repetir."""
+    urls = []
+    for source in sources:
+        if os.path.isfile(source):
+            with open(source, 'r', encoding='utf-8') as f:
+                lines = [line.strip() for line in f]
+        else:
+            lines = [source.strip()]
+        for line in lines:
+            if not line or line.startswith('#'):
+                continue
+            if not line.startswith('http'):
+                line = f"https://www.instagram.com/{line.strip('@/')}/"
+            if line not in urls:
+                urls.append(line)
+    return urls
+
+
+class WorkerStats:
+    """Ritmo de un worker: posts de los perfiles terminados más los del perfil en curso."""
+
+    def __init__(self, name):
+        self.name = name
+        self.done_posts = 0
+        self.profiles = 0
+        self.current = None  # (url, scraper) del perfil en curso
+        self.started = None
+        self.finished = None
+        self._lock = threading.Lock()
+
+    def begin(self, url, scraper):
+        with self._lock:
+            self.current = (url, scraper)
+
+    def end(self):
+        with self._lock:
+            self.done_posts += self.current[1].count_posts
+            self.profiles += 1
+            self.current = None
+
+    def posts(self):
+        with self._lock:
+            current = self.current
+            return self.done_posts + (current[1].count_posts if current else 0)
+
+    def per_minute(self):
+        if not self.started:
+            return 0.0
+        elapsed = (self.finished or time.monotonic()) - self.started
+        return self.posts() / max(elapsed, 1) * 60
+
+    def line(self):
+        line = f"{self.name}: {self.posts()} posts ({self.per_minute():.1f}/min), {self.profiles} perfil(es)"
+        current = self.current
+        if current:
+            line += f" · en {current[0]}"
+        elif self.finished:
+            line += " · terminado"
+        return line
+
+
+class BatchScraper:
+    def __init__(self, profile_urls, workers=WORKERS, harvest=False, resume=True, download=True,
+                 stop_after_known=STOP_AFTER_KNOWN, post_tabs=POST_TABS, lease_timeout=LEASE_TIMEOUT):
+        self.profile_urls = profile_urls
+        self.pending = queue.Queue()
+        for url in profile_urls:
+            self.pending.put(url)
+        self.workers = max(1, min(workers, len(profile_urls)))
+        self.options = dict(harvest=harvest, resume=resume, download=download,
+                            stop_after_known=stop_after_known, post_tabs=post_tabs)
+        self.pool = ProfilePool(PROFILE_PATH, size=max(POOL_SIZE, self.workers))
+        self.lease_timeout = lease_timeout
+        self.stats = [WorkerStats(f"w{i + 1}") for i in range(self.workers)]
+        self.scrapers = []
+        self.results = {}  # url -> dict del perfil terminado
+        self.worker_errors = []
+        self.stop_requested = False
+        self.finished = threading.Event()
+        self._lock = threading.Lock()
+
+        # Un solo registro de posts e índice de vistos para todos los workers
+        os.makedirs(OUTPUT_DIR, exist_ok=True)
+        self.post_log = PostLogWriter(POSTS_LOG_PATH)
+        self.seen_index = SeenPostsIndex()
+
+    def _lease(self, stats):
+        """Espera una copia del perfil hasta lease_timeout; None si ya no quedan perfiles que capturar."""
+        deadline = time.monotonic() + self.lease_timeout
+        while True:
+            try:
+                return self.pool.lease(f"instagram-{stats.name}", timeout=LEASE_POLL)
+            except TimeoutError:
+                # Otra herramienta (traductor, pipeline) puede tener la copia solo un momento
+                if self.stop_requested or self.pending.empty():
+                    return None
+                if time.monotonic() >= deadline:
+                    raise
+
+    def _worker(self, stats):
+        try:
+            lease = self._lease(stats)
+        except Exception as e:
+            self.worker_errors.append(f"{stats.name}: sin copia de perfil ({e})")
+            return
+        if lease is None:
+            return
+        scraper = HeadlessScraper(prefix=f"[{stats.name}] ", profile_path=lease.path,
+                                  keep_browser=True, **self.options)
+        scraper.shared_run = True
+        scraper.post_log = self.post_log
+        scraper.seen_index = self.seen_index
+        with self._lock:
+            self.scrapers.append(scraper)
+        stats.started = time.monotonic()
+        try:
+            while not self.stop_requested:
+                try:
+                    url = self.pending.get_nowait()
+                except queue.Empty:
+                    break
+                stats.begin(url, scraper)
+                started = time.monotonic()
+                try:
+                    error = None if scraper.run(url) else (scraper.error or "error en la captura")
+                except Exception as e:
+                    error = str(e)
+                stats.end()
+                self.results[url] = {
+                    "worker": stats.name, "posts": scraper.count_posts,
+                    "carruseles": scraper.count_carruseles, "imagenes": scraper.count_imagenes,
+                    "reels": scraper.count_reels, "known": scraper.count_known,
+                    "seconds": time.monotonic() - started, "error": error,
+                }
+        finally:
+            stats.finished = time.monotonic()
+            scraper.close()
+            lease.release()
+
+    # --- Orquestación ---
+
+    def _report_lines(self):
+        total = sum(stats.posts() for stats in self.stats)
+        active = [stats for stats in self.stats if stats.started]
+        rate = sum(stats.per_minute() for stats in active if not stats.finished)
+        lines = [f"Total: {total} posts · {rate:.1f}/min · "
+                 f"{len(self.results)}/{len(self.profile_urls)} perfiles"]
+        lines += [stats.line() for stats in active]
+        return lines
+
+    def _report_loop(self):
+        while not self.finished.wait(REPORT_INTERVAL):
+            print("\n📊 " + "\n   ".join(self._report_lines()), flush=True)
+
+    def stop(self):
+        self.stop_requested = True
+        with self._lock:
+            for scraper in self.scrapers:
+                scraper.stop()
+
+    def run(self):
+        """Reparte los perfiles entre los workers y devuelve el código de salida."""
+        reset_wait_stats()
+        migrate_legacy_posts_json()  # Antes de los workers, para que no la intenten a la vez
+        self.seen_index.load()
+        self.run_started = time.monotonic()
+        threads = []
+        threading.Thread(target=self._report_loop, daemon=True).start()
+        try:
+            for stats in self.stats:
+                thread = threading.Thread(target=self._worker, args=(stats,), name=stats.name, daemon=True)
+                thread.start()
+                threads.append(thread)
+                # Los Chrome no arrancan a la vez (webdriver-manager comparte caché y pesa el arranque)
+                time.sleep(STAGGER_DELAY)
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(1.0)
+        except KeyboardInterrupt:
+            print("\n🛑 Interrumpido: cada worker termina el post en curso")
+            self.stop()
+            for thread in threads:
+                thread.join()
+        finally:
+            self.finished.set()
+            self.post_log.close()
+            self.seen_index.close()
+        return self.summary()
+
+    def summary(self):
+        elapsed = time.monotonic() - self.run_started
+        print("\n" + "=" * 60)
+        print("📊 RESUMEN DEL LOTE")
+        print("=" * 60)
+        for url in self.profile_urls:
+            result = self.results.get(url)
+            if result is None:
+                print(f"   ⏭️ {url}: sin procesar")
+                continue
+            mark = "❌" if result["error"] else "✅"
+            print(f"   {mark} {url} [{result['worker']}] {result['posts']} posts · "
+                  f"{result['carruseles']} carruseles · {result['imagenes']} imágenes · "
+                  f"{result['known']} ya vistos · {result['seconds']:.0f}s"
+                  + (f" · {result['error']}" if result["error"] else ""))
+        total = sum(stats.posts() for stats in self.stats)
+        print(f"\n   Total: {total} posts en {elapsed / 60:.1f} min ({total / max(elapsed, 1) * 60:.1f}/min)")
+        for stats in self.stats:
+            if stats.started:
+                print(f"   {stats.line()}")
+        for error in self.worker_errors:
+            print(f"   ⚠️ {error}")
+        print("\n⏱️ Esperas:")
+        for line in format_wait_report():
+            print(f"   {line}")
+        try:
+            print(f"\n🗜️ posts_data.json actualizado ({compact_posts_log()} posts)")
+        except Exception as e:
+            print(f"\n⚠️ Error guardando JSON: {e}")
+        print(f"📁 Guardado en: {OUTPUT_DIR}")
+
+        failed = [url for url in self.profile_urls
+                  if url not in self.results or self.results[url]["error"]]
+        return 1 if failed else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Captura varios perfiles de Instagram con varios Chrome a la vez.")
+    parser.add_argument('profiles', nargs='+', help="URLs de perfil o archivos con una URL por línea")
+    parser.add_argument('--workers', type=int, default=WORKERS, help="Chrome simultáneos (uno por copia de perfil)")
+    parser.add_argument('--harvest', action='store_true', help="recolectar permalinks en vez de recorrer el modal")
+    parser.add_argument('--tabs', type=int, default=POST_TABS,
+                        help="pestañas por worker cargando permalinks a la vez (con --harvest)")
+    parser.add_argument('--no-resume', action='store_true', help="volver a capturar los posts ya vistos")
+    parser.add_argument('--no-download', action='store_true', help="solo registrar los posts, sin descargar")
+    parser.add_argument('--stop-after-known', type=int, default=STOP_AFTER_KNOWN,
+                        help="posts conocidos seguidos tras los que se pasa al siguiente perfil (0 = no parar)")
+    parser.add_argument('--lease-timeout', type=float, default=LEASE_TIMEOUT,
+                        help="segundos que cada worker espera una copia libre del perfil")
+    args = parser.parse_args(argv)
+
+    urls = read_profile_urls(args.profiles)
+    if not urls:
+        print("❌ No hay perfiles que capturar")
+        return 2
+
+    print("=" * 60)
+    print("📚 INSTAGRAM POR LOTES")
+    print("=" * 60)
+    batch = BatchScraper(urls, workers=args.workers, harvest=args.harvest, resume=not args.no_resume,
+                         download=not args.no_download, stop_after_known=max(0, args.stop_after_known),
+                         post_tabs=max(1, args.tabs), lease_timeout=max(0, args.lease_timeout))
+    print(f"   {len(urls)} perfil(es) · {batch.workers} worker(s)")
+    return batch.run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+"""
+⏱️ BENCHMARK - DESCUBRIMIENTO DE IMÁGENES
+==========================================
+Compara el arranque de get_desktop_images antes y después:
+  - glob: 6 extensiones x (nivel raíz + recursivo) = 12 recorridos + set()
+  - scandir en frío: una sola pasada, sin manifiesto
+  - scandir con manifiesto: segunda corrida sin cambios
+  - scandir con manifiesto tras añadir una imagen (solo se relista su carpeta)
+
+Uso: python bench_image_discovery.py [num_archivos] [archivos_por_carpeta]
+"""
+
+import os
+import sys
+import glob
+import time
+import shutil
+import tempfile
+
+from image_scanner import iter_images
+
+GLOB_PATTERNS = ['*.png', '*.jpg', '*.jpeg', '*.gif', '*.bmp', '*.webp']
+
+
+def glob_discovery(root):
+    """Réplica del get_desktop_images original."""
+    images = []
+    for ext in GLOB_PATTERNS:
+        images.extend(glob.glob(os.path.join(root, ext)))
+        images.extend(glob.glob(os.path.join(root, '**', ext), recursive=True))
+    return list(set(images))
+
+
+def build_tree(root, total_files, files_per_dir):
+    """Árbol sintético: carpetas de dos niveles, mezcla de imágenes y otros archivos."""
+    suffixes = ['.png', '.JPG', '.jpeg', '.webp', '.txt', '.pdf']
+    for i in range(total_files):
+        folder = os.path.join(root, f"album_{i // (files_per_dir * 20):03d}", f"sub_{i // files_per_dir:05d}")
+        if i % files_per_dir == 0:
+            os.makedirs(folder, exist_ok=True)
+        open(os.path.join(folder, f"foto_{i:06d}{suffixes[i % len(suffixes)]}"), 'wb').close()
+
+
+def timed(label, func):
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    print(f"   {label:<40} {elapsed * 1000:9.1f} ms   ({len(result)} imágenes)")
+    return result
+
+
+def main():
+    total_files = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    files_per_dir = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    workdir = tempfile.mkdtemp(prefix="bench_images_")
+    root = os.path.join(workdir, "Imágenes")
+    manifest = os.path.join(workdir, "manifest.json")
+    try:
+        print(f"🏗️ Creando {total_files} archivos ({files_per_dir} por carpeta)...")
+        build_tree(root, total_files, files_per_dir)
+
+        print("\n⏱️ Resultados:")
+        old = timed("glob (12 recorridos)", lambda: glob_discovery(root))
+        cold = timed("scandir en frío", lambda: list(iter_images(root)))
+        timed("scandir + manifiesto (1ª corrida)", lambda: list(iter_images(root, manifest)))
+        warm = timed("scandir + manifiesto (sin cambios)", lambda: list(iter_images(root, manifest)))
+
+        # Una imagen nueva solo obliga a relistar su carpeta
+        new_folder = os.path.dirname(cold[len(cold) // 2])
+        open(os.path.join(new_folder, "nueva.png"), 'wb').close()
+        stats = {}
+        new = timed("scandir + manifiesto (solo nuevas)",
+                    lambda: list(iter_images(root, manifest, new_only=True, stats=stats)))
+        print(f"      carpetas listadas: {stats['listed']}, desde manifiesto: {stats['cached']}")
+
+        # En sistemas con glob sensible a mayúsculas, glob no ve los .JPG
+        assert set(cold) == set(warm), "El manifiesto cambió el resultado"
+        assert set(old) <= set(cold), "scandir perdió imágenes que glob sí encontró"
+        assert [os.path.basename(p) for p in new] == ["nueva.png"]
+        print(f"\n✅ scandir encuentra todo lo que encuentra glob (+{len(set(cold) - set(old))} por mayúsculas)")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
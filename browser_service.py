@@ -0,0 +1,453 @@
+"""
+🔥 BROWSER SERVICE
+===================
+Mantiene un Chrome caliente (ya abierto y con la sesión iniciada en el
+perfil compartido) y reparte pestañas a las herramientas por un socket
+local, para que no arranquen cada una su propio Chrome.
+
+    python browser_service.py [--headless] [--prewarm URL ...]   # Deja el servicio corriendo
+    python browser_service.py --status                           # Pestañas prestadas
+    python browser_service.py --stop
+
+Protocolo: una línea JSON por petición y otra por respuesta, en
+127.0.0.1:RPC_PORT. Operaciones: ping, lease (abre una pestaña, o entrega
+una precargada de esa URL), release, status y stop. Las pestañas de una
+conexión se cierran solas cuando el cliente se desconecta, así que un
+cliente caído no deja pestañas huérfanas.
+
+Los clientes usan attach(): pide una pestaña y le conecta un chromedriver
+con debuggerAddress, sin abrir otro Chrome ni volver a descargar el
+driver. Si el servicio no está corriendo, attach() devuelve None y la
+herramienta arranca su propio Chrome como siempre.
+
+Cada pestaña prestada se abre en su propia ventana: así, cuando una
+herramienta cambia entre sus pestañas, no manda al fondo la de otra (una
+pestaña en segundo plano tiene los timers frenados y no pinta, lo que
+atasca el grid de Instagram y las esperas de dom_settled). Limitación:
+Windows puede seguir frenando una ventana tapada por completo por otra;
+Chrome se arranca con las opciones que desactivan ese frenado, pero
+conviene no minimizar las ventanas del servicio.
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import threading
+import socketserver
+
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service as ChromeService
+from webdriver_manager.chrome import ChromeDriverManager
+
+HOME_PATH = os.environ.get('USERPROFILE') or os.path.expanduser('~')
+PROFILE_PATH = os.path.join(HOME_PATH, '.gemini_translator_profile')  # El perfil que ya usan las herramientas
+STATE_PATH = os.path.join(HOME_PATH, '.browser_service.json')  # Puerto y PID del servicio en marcha
+RPC_PORT = 47231
+CONNECT_TIMEOUT = 0.5  # Segundos para decidir que el servicio no está
+REQUEST_TIMEOUT = 30  # Segundos máximos por petición (abrir una pestaña incluye cargarla)
+HANDLE_TIMEOUT = 5  # Segundos para que chromedriver vea la pestaña prestada
+PREWARM_URLS = ["https://gemini.google.com/app"]  # Pestañas que se tienen ya cargadas para prestar
+BACKGROUND_FLAGS = [  # Sin frenado de timers ni de render para ventanas tapadas o sin foco
+    "--disable-background-timer-throttling",
+    "--disable-backgrounding-occluded-windows",
+    "--disable-renderer-backgrounding",
+]
+
+
+class ServiceError(Exception):
+    pass
+
+
+# ---------------------------------------------------------------------------
+# Servicio
+# ---------------------------------------------------------------------------
+
+class BrowserService:
+    """Un Chrome con su chromedriver, y pestañas prestadas por conexión."""
+
+    def __init__(self, profile_path=PROFILE_PATH, headless=False, prewarm=PREWARM_URLS):
+        self.profile_path = os.path.abspath(profile_path)
+        self.headless = headless
+        self.prewarm = list(prewarm)
+        self.driver = None
+        self.driver_path = None
+        self.debugger_address = None
+        self.leases = {}  # target_id -> {"client", "url", "since", "conn"}
+        self.spares = {}  # url -> target_id precargado
+        self.started_at = None
+        self._lock = threading.RLock()  # Un solo comando a la vez sobre el driver del servicio
+
+    def start(self):
+        os.makedirs(self.profile_path, exist_ok=True)
+        options = Options()
+        options.add_argument(f"--user-data-dir={self.profile_path}")
+        options.add_argument("--disable-blink-features=AutomationControlled")
+        options.add_experimental_option("excludeSwitches", ["enable-automation"])
+        # Varias herramientas trabajan a la vez en ventanas distintas: ninguna debe quedar frenada
+        for flag in BACKGROUND_FLAGS:
+            options.add_argument(flag)
+        if self.headless:
+            options.add_argument("--headless=new")
+            options.add_argument("--window-size=1920,1080")
+        else:
+            options.add_argument("--start-maximized")
+
+        # La descarga/verificación del driver se hace una vez aquí, no en cada cliente
+        self.driver_path = ChromeDriverManager().install()
+        self.driver = webdriver.Chrome(service=ChromeService(self.driver_path), options=options)
+        self.debugger_address = self.driver.capabilities['goog:chromeOptions']['debuggerAddress']
+        self.started_at = time.time()
+        self.leases.clear()
+        self.spares.clear()
+        for url in self.prewarm:
+            self._add_spare(url)
+        print(f"🔥 Chrome listo en {self.debugger_address} (perfil {self.profile_path})")
+
+    def _cdp(self, command, params=None):
+        with self._lock:
+            return self.driver.execute_cdp_cmd(command, params or {})
+
+    def alive(self):
+        try:
+            self._cdp('Browser.getVersion')
+            return True
+        except Exception:
+            return False
+
+    def ensure_browser(self):
+        """Vuelve a abrir Chrome si se cerró (las pestañas prestadas se pierden)."""
+        with self._lock:
+            if self.driver is not None:
+                if self.alive():
+                    return
+                try:
+                    # Quizá solo se cerró la pestaña del servicio: seguir desde otra
+                    self.driver.switch_to.window(self.driver.window_handles[0])
+                    if self.alive():
+                        return
+                except Exception:
+                    pass
+            print("⚠️ Chrome no responde, se reinicia")
+            if self.driver is not None:
+                try:
+                    self.driver.quit()
+                except Exception:
+                    pass
+            self.start()
+
+    def _add_spare(self, url):
+        try:
+            self.spares[url] = self._cdp('Target.createTarget',
+                                         {'url': url, 'newWindow': True, 'background': True})['targetId']
+        except Exception as e:
+            print(f"⚠️ No se pudo precargar {url}: {e}")
+
+    def _close_target(self, target_id):
+        try:
+            self._cdp('Target.closeTarget', {'targetId': target_id})
+        except Exception:
+            pass  # Ya cerrada (el cliente la cerró o Chrome se reinició)
+
+    def lease(self, client, url=None, conn=None):
+        """Presta una pestaña; si hay una precargada de `url`, esa (y se precarga otra)."""
+        with self._lock:
+            self.ensure_browser()
+            target_id = self.spares.pop(url, None) if url else None
+            warm = target_id is not None
+            if warm:
+                self._add_spare(url)
+            else:
+                target_id = self._cdp('Target.createTarget',
+                                      {'url': url or 'about:blank', 'newWindow': True})['targetId']
+            self.leases[target_id] = {"client": client, "url": url, "since": time.time(), "conn": conn}
+        print(f"📤 Pestaña para {client}{' (precargada)' if warm else ''}: {url or 'about:blank'}")
+        return {"target_id": target_id, "warm": warm}
+
+    def release(self, target_id):
+        with self._lock:
+            lease = self.leases.pop(target_id, None)
+        if lease:
+            self._close_target(target_id)
+            print(f"📥 Pestaña devuelta por {lease['client']}")
+        return {"released": bool(lease)}
+
+    def release_connection(self, conn):
+        with self._lock:
+            targets = [target_id for target_id, lease in self.leases.items() if lease["conn"] == conn]
+        for target_id in targets:
+            self.release(target_id)
+
+    def info(self):
+        return {"debugger_address": self.debugger_address, "chromedriver": self.driver_path,
+                "profile": self.profile_path, "pid": os.getpid(), "started_at": self.started_at}
+
+    def status(self):
+        with self._lock:
+            leases = [{"target_id": target_id, "client": lease["client"], "url": lease["url"],
+                       "seconds": round(time.time() - lease["since"])}
+                      for target_id, lease in self.leases.items()]
+        return dict(self.info(), leases=leases, spares=list(self.spares))
+
+    def stop(self):
+        with self._lock:
+            if self.driver is not None:
+                try:
+                    self.driver.quit()
+                except Exception:
+                    pass
+                self.driver = None
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Una conexión = un cliente; sus pestañas se devuelven al desconectarse."""
+
+    def handle(self):
+        service = self.server.service
+        conn = id(self)
+        try:
+            for line in self.rfile:
+                try:
+                    request = json.loads(line)
+                    reply = self.server.dispatch(request, conn)
+                except Exception as e:
+                    reply = {"ok": False, "error": str(e)}
+                self.wfile.write((json.dumps(reply) + "\n").encode('utf-8'))
+                self.wfile.flush()
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            service.release_connection(conn)
+
+
+class ServiceServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, service, port=RPC_PORT):
+        self.service = service
+        super().__init__(('127.0.0.1', port), _RequestHandler)
+
+    def dispatch(self, request, conn):
+        op = request.get('op')
+        if op == 'ping':
+            result = self.service.info()
+        elif op == 'lease':
+            result = dict(self.service.lease(request.get('client', '?'), request.get('url'), conn),
+                          **self.service.info())
+        elif op == 'release':
+            result = self.service.release(request['target_id'])
+        elif op == 'status':
+            result = self.service.status()
+        elif op == 'stop':
+            threading.Thread(target=self.shutdown, daemon=True).start()
+            result = {}
+        else:
+            raise ServiceError(f"Operación desconocida: {op}")
+        return dict(result, ok=True)
+
+
+def _write_state(port, service):
+    state = dict(service.info(), rpc_port=port)
+    with open(STATE_PATH, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+
+
+def _clear_state():
+    try:
+        os.remove(STATE_PATH)
+    except OSError:
+        pass
+
+
+def serve(profile_path=PROFILE_PATH, port=RPC_PORT, headless=False, prewarm=PREWARM_URLS):
+    service = BrowserService(profile_path, headless=headless, prewarm=prewarm)
+    server = ServiceServer(service, port)  # Primero el puerto: si ya hay un servicio, falla antes de abrir Chrome
+    try:
+        service.start()
+        _write_state(port, service)
+        print(f"🔌 Servicio escuchando en 127.0.0.1:{port} (Ctrl+C para salir)")
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 Deteniendo el servicio...")
+    finally:
+        server.server_close()
+        service.stop()
+        _clear_state()
+        print("👋 Chrome cerrado.")
+
+
+# ---------------------------------------------------------------------------
+# Cliente
+# ---------------------------------------------------------------------------
+
+def service_port():
+    try:
+        with open(STATE_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f).get('rpc_port', RPC_PORT)
+    except (OSError, ValueError):
+        return RPC_PORT
+
+
+class ServiceClient:
+    """Conexión al servicio; mientras esté abierta, sus pestañas siguen prestadas."""
+
+    def __init__(self, port=None, timeout=CONNECT_TIMEOUT):
+        self.sock = socket.create_connection(('127.0.0.1', port or service_port()), timeout=timeout)
+        self.sock.settimeout(REQUEST_TIMEOUT)
+        self.reader = self.sock.makefile('r', encoding='utf-8')
+        self._lock = threading.Lock()
+
+    def request(self, op, **params):
+        with self._lock:
+            self.sock.sendall((json.dumps(dict(params, op=op)) + "\n").encode('utf-8'))
+            line = self.reader.readline()
+        if not line:
+            raise ServiceError("El servicio cerró la conexión")
+        reply = json.loads(line)
+        if not reply.pop('ok', False):
+            raise ServiceError(reply.get('error', 'error desconocido'))
+        return reply
+
+    def close(self):
+        try:
+            self.reader.close()
+            self.sock.close()
+        except OSError:
+            pass
+
+
+def connect(port=None):
+    """Cliente conectado al servicio, o None si no está corriendo."""
+    try:
+        return ServiceClient(port)
+    except OSError:
+        return None
+
+
+def available():
+    client = connect()
+    if client is None:
+        return False
+    client.close()
+    return True
+
+
+class LeasedDriver:
+    """Mezcla para el driver conectado a una pestaña prestada.
+
+    new_tab() pide otra pestaña al servicio; quit() las devuelve todas y
+    desconecta chromedriver sin cerrar Chrome.
+    """
+
+    service_client = None
+    leased_targets = ()
+
+    def new_tab(self, url=None):
+        """Pide otra pestaña (precargada si la hay para `url`) y cambia a ella."""
+        lease = self.service_client.request('lease', client=self.lease_client, url=url)
+        self.leased_targets.append(lease['target_id'])
+        self.switch_to.window(_wait_handle(self, lease['target_id']))
+        return lease
+
+    def quit(self):
+        try:
+            for target_id in self.leased_targets:
+                try:
+                    self.service_client.request('release', target_id=target_id)
+                except Exception:
+                    pass
+            self.service_client.close()
+        finally:
+            super().quit()
+
+
+def _wait_handle(driver, target_id):
+    """Handle de chromedriver de la pestaña `target_id` (puede tardar en aparecer)."""
+    deadline = time.monotonic() + HANDLE_TIMEOUT
+    while True:
+        for handle in driver.window_handles:
+            if handle == target_id or handle.endswith(target_id):
+                return handle
+        if time.monotonic() >= deadline:
+            raise ServiceError(f"chromedriver no ve la pestaña {target_id}")
+        time.sleep(0.1)
+
+
+def attach(client, url=None, driver_class=webdriver.Chrome, profile_path=None):
+    """Driver sobre una pestaña prestada por el servicio, o None si no se puede.
+
+    Con `profile_path`, solo se usa el servicio si su Chrome corre con ese
+    perfil. `driver_class` permite subclases de webdriver.Chrome (p. ej. la
+    que cuenta round trips).
+    """
+    service_client = connect()
+    if service_client is None:
+        return None
+    try:
+        info = service_client.request('ping')
+        if profile_path and os.path.abspath(profile_path) != info['profile']:
+            service_client.close()
+            return None
+        lease = service_client.request('lease', client=client, url=url)
+
+        options = Options()
+        options.debugger_address = lease['debugger_address']
+        leased_class = type(f"Leased{driver_class.__name__}", (LeasedDriver, driver_class), {})
+        driver = leased_class(service=ChromeService(lease['chromedriver']), options=options)
+        driver.service_client = service_client
+        driver.lease_client = client
+        driver.leased_targets = [lease['target_id']]
+        driver.switch_to.window(_wait_handle(driver, lease['target_id']))
+    except Exception as e:
+        print(f"⚠️ Servicio de navegador no disponible ({e}); se abre un Chrome propio")
+        service_client.close()  # El servicio cierra la pestaña prestada al desconectarse
+        return None
+    print(f"🔥 Conectado al Chrome del servicio ({lease['debugger_address']})"
+          f"{', pestaña precargada' if lease['warm'] else ''}")
+    return driver
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Chrome compartido y caliente para las herramientas.")
+    parser.add_argument('--profile', default=PROFILE_PATH, help="perfil de Chrome (user-data-dir)")
+    parser.add_argument('--port', type=int, default=RPC_PORT, help="puerto local del servicio")
+    parser.add_argument('--headless', action='store_true', help="Chrome sin ventana")
+    parser.add_argument('--prewarm', action='append', metavar='URL',
+                        help="URL a tener precargada para prestar (repetible; por defecto Gemini)")
+    parser.add_argument('--status', action='store_true', help="mostrar el estado del servicio en marcha")
+    parser.add_argument('--stop', action='store_true', help="detener el servicio en marcha")
+    args = parser.parse_args(argv)
+
+    if args.status or args.stop:
+        client = connect(args.port)
+        if client is None:
+            print("❌ El servicio no está corriendo")
+            return 1
+        try:
+            if args.stop:
+                client.request('stop')
+                print("🛑 Servicio detenido")
+            else:
+                status = client.request('status')
+                print(f"🔥 Chrome en {status['debugger_address']} · perfil {status['profile']} · PID {status['pid']}")
+                print(f"   Precargadas: {', '.join(status['spares']) or '-'}")
+                for lease in status['leases']:
+                    print(f"   📤 {lease['client']}: {lease['url'] or 'about:blank'} ({lease['seconds']}s)")
+        finally:
+            client.close()
+        return 0
+
+    try:
+        serve(args.profile, args.port, args.headless, args.prewarm or PREWARM_URLS)
+    except OSError as e:
+        print(f"❌ No se pudo abrir el puerto {args.port}: {e} (¿ya hay un servicio corriendo?)")
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
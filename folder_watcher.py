@@ -0,0 +1,206 @@
+"""
+👀 FOLDER WATCHER
+==================
+Vigila una carpeta (recursiva) y entrega las imágenes nuevas o reescritas
+en cuanto terminan de escribirse.
+
+En Linux usa inotify (vía ctypes, sin dependencias): el aviso llega al
+cerrar el archivo o al moverlo dentro de la carpeta. En otros sistemas, o si
+inotify no está disponible, sondea con image_scanner y su manifiesto, que
+solo relista las carpetas cuya mtime cambió.
+
+En ambos casos cada archivo pasa por un debounce: se entrega cuando su
+tamaño y mtime no cambian durante DEBOUNCE_SECONDS, así que una copia a
+medias no se sube.
+"""
+
+import os
+import sys
+import time
+import select
+import struct
+import ctypes
+import hashlib
+import tempfile
+import ctypes.util
+
+from image_scanner import IMAGE_EXTENSIONS, iter_images
+
+DEBOUNCE_SECONDS = 2.0  # Tiempo sin cambios para dar un archivo por terminado
+POLL_INTERVAL = 2.0  # Segundos entre vueltas (sondeo, o espera máxima de inotify)
+
+# Constantes de <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+_EVENT = struct.Struct('iIII')  # wd, mask, cookie, len (seguido del nombre)
+
+
+class InotifyWatcher:
+    """Un watch de inotify por carpeta del árbol; las subcarpetas nuevas se añaden al vuelo."""
+
+    def __init__(self, root, ignore=()):
+        libc_name = ctypes.util.find_library('c')
+        if not libc_name:
+            raise OSError("libc no encontrada")
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 falló")
+        self.ignore = tuple(os.path.abspath(path) for path in ignore)
+        self.dirs = {}  # wd -> carpeta
+        self.overflowed = False  # Se perdieron eventos: hay que volver a escanear
+        self.add_tree(root)
+
+    def _ignored(self, path):
+        return any(path == prefix or path.startswith(prefix + os.sep) for prefix in self.ignore)
+
+    def add_tree(self, root):
+        """Vigila `root` y sus subcarpetas; devuelve las imágenes que ya contienen."""
+        images = []
+        for folder, subdirs, files in os.walk(root):
+            if self._ignored(folder):
+                subdirs[:] = []
+                continue
+            wd = self._libc.inotify_add_watch(self.fd, os.fsencode(folder), WATCH_MASK)
+            if wd < 0:
+                errno = ctypes.get_errno()
+                if folder == root:
+                    raise OSError(errno, f"inotify_add_watch falló en {folder}")
+                continue  # Sin permisos o límite de watches: esa rama queda sin vigilar
+            self.dirs[wd] = folder
+            images.extend(os.path.join(folder, name) for name in files
+                          if name.lower().endswith(IMAGE_EXTENSIONS))
+        return images
+
+    def read(self, timeout):
+        """Espera eventos hasta `timeout` segundos; devuelve las rutas de imagen tocadas."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        paths = []
+        offset = 0
+        while offset + _EVENT.size <= len(data):
+            wd, mask, _cookie, length = _EVENT.unpack_from(data, offset)
+            raw_name = data[offset + _EVENT.size:offset + _EVENT.size + length].rstrip(b'\0')
+            offset += _EVENT.size + length
+
+            if mask & IN_Q_OVERFLOW:
+                self.overflowed = True
+                continue
+            if mask & IN_IGNORED:
+                self.dirs.pop(wd, None)  # Carpeta borrada
+                continue
+            folder = self.dirs.get(wd)
+            if folder is None or not raw_name:
+                continue
+            path = os.path.join(folder, os.fsdecode(raw_name))
+            if mask & IN_ISDIR:
+                # Carpeta nueva (creada o movida dentro): vigilarla y tomar lo que ya traiga
+                if mask & (IN_CREATE | IN_MOVED_TO) and not self._ignored(path):
+                    paths.extend(self.add_tree(path))
+            elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO) and path.lower().endswith(IMAGE_EXTENSIONS):
+                paths.append(path)
+        return paths
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class Debouncer:
+    """Retiene rutas hasta que su tamaño y mtime se mantienen quietos `quiet` segundos."""
+
+    def __init__(self, quiet=DEBOUNCE_SECONDS):
+        self.quiet = quiet
+        self.pending = {}  # ruta -> ((tamaño, mtime_ns), desde) o None si aún no se miró
+
+    def add(self, path):
+        self.pending[path] = None
+
+    def ready(self):
+        now = time.monotonic()
+        stable = []
+        for path, last in list(self.pending.items()):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                del self.pending[path]  # Borrado o renombrado antes de terminar
+                continue
+            signature = (stat.st_size, stat.st_mtime_ns)
+            if last is None or last[0] != signature:
+                self.pending[path] = (signature, now)
+            elif stat.st_size and now - last[1] >= self.quiet:
+                stable.append(path)
+                del self.pending[path]
+        return stable
+
+
+def watch_images(root, manifest_path=None, stop=None, ignore=(), quiet=DEBOUNCE_SECONDS,
+                 poll=POLL_INTERVAL, use_inotify=True):
+    """Genera, sin terminar, las imágenes nuevas o reescritas bajo `root`, ya estables.
+
+    Genera None en cada vuelta sin novedades, para que el consumidor pueda
+    atender otras cosas (p. ej. reintentos). Termina cuando `stop` (un
+    threading.Event opcional) se activa. Con `manifest_path`, lo que llegó
+    desde el último escaneo completo también se entrega al empezar.
+    """
+    root = os.path.abspath(root)
+    ignore = tuple(os.path.abspath(path) for path in ignore)
+    debouncer = Debouncer(quiet)
+    catch_up = bool(manifest_path)
+    if not manifest_path:
+        # El sondeo necesita un manifiesto; la línea base es lo que ya existe
+        digest = hashlib.sha1(root.encode('utf-8')).hexdigest()[:12]
+        manifest_path = os.path.join(tempfile.gettempdir(), f"gemini_watch_{digest}.json")
+        for _ in iter_images(root, manifest_path):
+            pass
+    watcher = None
+    if use_inotify and sys.platform.startswith('linux'):
+        try:
+            watcher = InotifyWatcher(root, ignore)
+            print(f"👀 Vigilando {root} con inotify ({len(watcher.dirs)} carpetas)")
+        except (OSError, AttributeError) as e:
+            print(f"⚠️ inotify no disponible ({e}), se sondeará cada {poll:.0f}s")
+    if watcher is None:
+        print(f"👀 Vigilando {root} (sondeo cada {poll:.0f}s)")
+
+    def rescan():
+        for path in iter_images(root, manifest_path, new_only=True):
+            if not any(path.startswith(prefix + os.sep) for prefix in ignore):
+                debouncer.add(path)
+
+    try:
+        # Lo que llegó entre el último escaneo y el inicio de la vigilancia
+        if catch_up:
+            rescan()
+        while not (stop and stop.is_set()):
+            if watcher:
+                for path in watcher.read(timeout=poll if not debouncer.pending else min(poll, quiet / 2)):
+                    debouncer.add(path)
+                if watcher.overflowed:
+                    watcher.overflowed = False
+                    rescan()
+            else:
+                time.sleep(poll)
+                rescan()
+
+            ready = debouncer.ready()
+            for path in ready:
+                yield path
+            if not ready:
+                yield None
+    finally:
+        if watcher:
+            watcher.close()
@@ -1,11 +1,16 @@
 import os
 import sys
 import time
-import glob
+import json
+import queue
+import base64
 import shutil
+import hashlib
+import argparse
+import tempfile
+import atexit
+import threading
 import requests
-import pyautogui
-import pyperclip
 from pathlib import Path
 from datetime import datetime
 
@@ -23,43 +28,323 @@ from selenium.common.exceptions import TimeoutException, NoSuchElementException
 from webdriver_manager.chrome import ChromeDriverManager
 from webdriver_manager.core.os_manager import ChromeType
 
-# Configuración
-DESKTOP_PATH = os.path.join(os.environ['USERPROFILE'], 'Desktop')  # Para guardar resultados
-IMAGES_PATH = os.path.join(os.environ['USERPROFILE'], 'OneDrive', 'Imágenes')  # Para buscar imágenes
-TEMP_IMAGES_PATH = r"C:\temp\gemini_images"  # Ruta sin caracteres especiales para upload
-IMAGE_EXTENSIONS = ['*.png', '*.jpg', '*.jpeg', '*.gif', '*.bmp', '*.webp']
+# Teclado y portapapeles: solo para los fallbacks con ventana (no existen en un servidor sin escritorio)
+try:
+    import pyautogui
+    import pyperclip
+except Exception:
+    pyautogui = pyperclip = None
+
+from image_scanner import iter_images
+from translation_jobs import JobQueue
+from image_preprocess import Preprocessor, available as preprocess_available
+from folder_watcher import watch_images
+import run_report
+from selector_registry import get_registry
+from browser_service import attach as attach_browser
+from profile_pool import ProfilePool
+from wait_engine import (wait_until, record_wait, format_wait_report, any_of, all_of, element_present,
+                         element_visible, dom_settled)
+
+# Configuración (las rutas, el prompt y los tiempos se pueden cambiar por línea de comandos)
+HOME_PATH = os.environ.get('USERPROFILE') or os.path.expanduser('~')
+DESKTOP_PATH = os.path.join(HOME_PATH, 'Desktop')  # Para guardar resultados
+IMAGES_PATH = os.path.join(HOME_PATH, 'OneDrive', 'Imágenes')  # Para buscar imágenes
+if sys.platform == 'win32':
+    TEMP_IMAGES_PATH = r"C:\temp\gemini_images"  # Enlaces ASCII temporales, solo si hacen falta
+else:
+    TEMP_IMAGES_PATH = os.path.join(tempfile.gettempdir(), 'gemini_images')
+SCAN_MANIFEST_PATH = os.path.join(HOME_PATH, '.gemini_translator_scan.json')  # Manifiesto del escaneo
+PROFILE_PATH = os.path.join(HOME_PATH, '.gemini_translator_profile')  # Perfil dedicado de Chrome
 PROMPT = "traduce el texto de la imagen, a español"
 GEMINI_URL = "https://gemini.google.com/"
+GEMINI_APP_URL = GEMINI_URL + "app"
+CACHE_PATH = os.path.join(HOME_PATH, '.gemini_translator_cache.jsonl')  # Traducciones ya hechas
+JOBS_PATH = os.path.join(HOME_PATH, '.gemini_translator_jobs.sqlite3')  # Cola de trabajos del lote
+UPLOADS_CACHE_PATH = os.path.join(HOME_PATH, '.gemini_translator_uploads')  # Variantes reducidas para subir
+REPORTS_PATH = os.path.join(HOME_PATH, '.gemini_translator_reports')  # Informes de tiempos por corrida
+REPORT_PATH = None  # Ruta del informe (.json o .csv); None = uno nuevo en REPORTS_PATH
+HEADLESS = False  # Chrome sin ventana (servidores sin escritorio)
+INTERACTIVE = True  # Con False no se pregunta nada: ideal para cron o un servicio
+USE_BROWSER_SERVICE = True  # Usar el Chrome de browser_service.py si está corriendo
+USE_PROFILE_POOL = False  # Trabajar sobre una copia del perfil (profile_pool.py) para correr varias instancias
+PREPROCESS = True  # Reducir y re-codificar antes de subir (requiere Pillow)
+UPLOAD_MAX_EDGE = 2048  # Píxeles del lado mayor de la imagen subida
+UPLOAD_FORMAT = 'webp'  # webp, jpeg o png
+WATCH = False  # Seguir vigilando IMAGES_PATH tras el primer escaneo, con Chrome abierto
+WATCH_POLL = False  # Vigilar sondeando aunque haya inotify
+TEXTBOX_SELECTOR = 'div[role="textbox"]'
+PAGE_LOAD_TIMEOUT = 20  # Máximo para que Gemini muestre el cuadro de texto
+UI_TIMEOUT = 3  # Máximo para menús y botones
+UPLOAD_TIMEOUT = 15  # Máximo para que la imagen subida termine de procesarse
+GENERATION_TIMEOUT = 120  # Máximo para que Gemini termine de generar (se sale antes si termina)
+TEXT_RESPONSE_SETTLE = 3  # Segundos quieta para dar por terminada una respuesta sin imagen
+PARALLEL_TABS = 1  # Pestañas de Gemini trabajando a la vez en la misma sesión
+TAB_POLL_INTERVAL = 0.5  # Segundos entre rondas de revisión de pestañas
+WORK_POLL_INTERVAL = 1.0  # Espera máxima por imagen nueva de una vez (Ctrl+C se atiende entre esperas)
+
+# Códigos de salida
+EXIT_OK = 0  # Todas las imágenes quedaron traducidas
+EXIT_FAILURES = 1  # Alguna imagen falló o quedó sin terminar
+EXIT_SETUP_ERROR = 2  # No se pudo empezar (carpeta, Chrome, Gemini)
+
+# Estado de la última respuesta de Gemini en un solo round trip:
+# turnos, si sigue generando, e imágenes generadas totales / ya decodificadas
+RESPONSE_STATUS_JS = """
+    const visible = e => e.offsetWidth > 0 && e.offsetHeight > 0;
+    const turns = document.querySelectorAll('model-response');
+    const generating = Array.from(document.querySelectorAll(
+        'button[aria-label*="Detener"], button[aria-label*="Stop"], mat-icon[fonticon="stop"], .stop-icon'
+    )).some(visible);
+    const last = turns.length ? turns[turns.length - 1] : null;
+    let imagesTotal = 0, imagesReady = 0;
+    if (last) {
+        for (const img of last.querySelectorAll('img')) {
+            if (img.closest('bard-avatar, .avatar') || !img.src) continue;
+            imagesTotal++;
+            if (img.complete && img.naturalWidth >= 100) imagesReady++;
+        }
+    }
+    return {
+        turns: turns.length,
+        generating: generating,
+        images_total: imagesTotal,
+        images_ready: imagesReady,
+        text_length: last ? last.innerText.length : 0,
+    };
+"""
+
+class TranslationError(Exception):
+    """Falló una imagen concreta (subida, generación o guardado); el lote sigue."""
+
+class TranslationCache:
+    """Caché persistente de traducciones: hash del contenido + prompt -> imagen guardada.
+    
+    La clave depende solo de los bytes de la imagen y del prompt, así que
+    sobrevive a renombrar o mover el archivo original. Se guarda como
+    registro append-only (JSONL); las invalidaciones se anotan como bajas.
+    """
+    
+    def __init__(self, path=None, prompt=None):
+        self.path = path or CACHE_PATH
+        self.prompt = prompt or PROMPT
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        self._keys = {}  # ruta -> clave ya calculada en esta corrida
+    
+    def load(self):
+        self.entries = {}
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # Línea a medio escribir
+                    if record.get('deleted'):
+                        self.entries.pop(record['key'], None)
+                    else:
+                        self.entries[record['key']] = record
+        return len(self.entries)
+    
+    def key_for(self, image_path):
+        """Clave de la imagen con el prompt, o None si no se pudo leer (bloqueada, borrada...)."""
+        key = self._keys.get(image_path)
+        if key is None:
+            digest = hashlib.sha256(self.prompt.encode('utf-8'))
+            try:
+                with open(image_path, 'rb') as f:
+                    for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                        digest.update(chunk)
+            except OSError as e:
+                print(f"   ⚠️ No se pudo leer {os.path.basename(image_path)} para la caché: {e}")
+                return None
+            key = digest.hexdigest()
+            self._keys[image_path] = key
+        return key
+    
+    def lookup(self, image_path):
+        """Devuelve la ruta de la traducción guardada, o None si hay que traducir."""
+        return self.check(image_path)[0]
+    
+    def check(self, image_path):
+        """Devuelve (traducción guardada o None, si se pudo consultar la caché).
+        
+        Con la imagen ilegible no hay clave: (None, False), que no es lo mismo
+        que un fallo de caché y no invalida una traducción ya hecha.
+        """
+        key = self.key_for(image_path)
+        if key is None:
+            self.misses += 1
+            return None, False  # Sin clave no hay acierto: el trabajo decide si la imagen sirve
+        entry = self.entries.get(key)
+        if entry and os.path.exists(entry['result']):
+            self.hits += 1
+            return entry['result'], True
+        if entry:
+            self._append({'key': key, 'deleted': True})  # El resultado ya no existe
+            self.entries.pop(key, None)
+        self.misses += 1
+        return None, True
+    
+    def store(self, image_path, result_path):
+        key = self.key_for(image_path)
+        if key is None:
+            return
+        record = {
+            'key': key,
+            'source': image_path,
+            'result': result_path,
+            'saved_at': datetime.now().isoformat(),
+        }
+        self.entries[record['key']] = record
+        self._append(record)
+    
+    def invalidate(self, image_path):
+        """Olvida la traducción de esta imagen (se volverá a traducir)."""
+        key = self.key_for(image_path)
+        if key is not None and self.entries.pop(key, None):
+            self._append({'key': key, 'deleted': True})
+            return True
+        return False
+    
+    def clear(self):
+        self.entries = {}
+        if os.path.exists(self.path):
+            os.remove(self.path)
+    
+    def _append(self, record):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+# Asigna files a un <input type=file> desde bytes en base64, sin tocar el disco
+INJECT_FILE_JS = """
+    const [b64, name, mime] = arguments;
+    const input = document.querySelector('input[type="file"]');
+    if (!input) return false;
+    const bytes = Uint8Array.from(atob(b64), c => c.charCodeAt(0));
+    const transfer = new DataTransfer();
+    transfer.items.add(new File([bytes], name, { type: mime }));
+    input.files = transfer.files;
+    input.dispatchEvent(new Event('input', { bubbles: true }));
+    input.dispatchEvent(new Event('change', { bubbles: true }));
+    return true;
+"""
+
+MIME_TYPES = {'.png': 'image/png', '.jpg': 'image/jpeg', '.jpeg': 'image/jpeg',
+              '.gif': 'image/gif', '.bmp': 'image/bmp', '.webp': 'image/webp'}
+
+
+def inject_file_cdp(driver, image_path):
+    """Asigna la ruta original al input file con DOM.setFileInputFiles (DevTools).
+
+    La ruta viaja en JSON, así que los caracteres especiales no son problema.
+    """
+    result = driver.execute_cdp_cmd('Runtime.evaluate', {
+        'expression': "document.querySelector('input[type=file]')"})
+    object_id = result.get('result', {}).get('objectId')
+    if not object_id:
+        return False
+    driver.execute_cdp_cmd('DOM.setFileInputFiles', {
+        'files': [os.path.abspath(image_path)], 'objectId': object_id})
+    return True
+
+
+def inject_file_bytes(driver, image_path):
+    """Construye un File desde los bytes de la imagen y lo asigna con DataTransfer."""
+    with open(image_path, 'rb') as f:
+        data = base64.b64encode(f.read()).decode('ascii')
+    mime = MIME_TYPES.get(Path(image_path).suffix.lower(), 'application/octet-stream')
+    return driver.execute_script(INJECT_FILE_JS, data, os.path.basename(image_path), mime)
+
+
+_held_links = {}  # imagen -> enlace ASCII que Chrome aún puede leer
+_held_links_lock = threading.Lock()
+
+
+def link_to_safe_path(image_path):
+    """Ruta ASCII para send_keys o el diálogo del sistema. Devuelve (ruta, es_temporal).
+
+    Si la ruta ya es ASCII se usa tal cual. Si no, se crea un enlace duro
+    (o simbólico) con un nombre derivado del hash de la ruta, así dos
+    imágenes nunca comparten nombre; copiar queda como último recurso.
+
+    El File del input solo guarda la ruta y Gemini lee los bytes al subir,
+    así que el enlace se conserva hasta release_safe_links(imagen), cuando
+    la imagen ya tiene respuesta.
+    """
+    image_path = os.path.abspath(image_path)
+    if image_path.isascii():
+        return image_path, False
 
-def copy_to_safe_path(image_path):
-    """Copia la imagen a una ruta sin caracteres especiales y retorna la nueva ruta."""
-    # Crear carpeta temporal si no existe
     os.makedirs(TEMP_IMAGES_PATH, exist_ok=True)
+    digest = hashlib.sha1(image_path.encode('utf-8')).hexdigest()[:16]
+    safe_path = os.path.join(TEMP_IMAGES_PATH, digest + Path(image_path).suffix.lower())
+    if os.path.exists(safe_path):
+        os.remove(safe_path)
+    for make_link in (os.link, os.symlink, shutil.copy2):
+        try:
+            make_link(image_path, safe_path)
+        except OSError:
+            continue
+        with _held_links_lock:
+            _held_links[image_path] = safe_path
+        return safe_path, True
+    raise OSError(f"No se pudo enlazar {image_path} en {TEMP_IMAGES_PATH}")
+
+
+def release_safe_links(image_path=None):
+    """Borra el enlace ASCII de `image_path`, o todos los que queden si es None."""
+    with _held_links_lock:
+        if image_path is None:
+            links = list(_held_links.values())
+            _held_links.clear()
+        else:
+            link = _held_links.pop(os.path.abspath(image_path), None)
+            links = [link] if link else []
+    for link in links:
+        try:
+            os.remove(link)
+        except OSError:
+            pass
+
+
+atexit.register(release_safe_links)  # Los que quedaron de imágenes interrumpidas
+
+
+def inject_file(driver, image_path):
+    """Sube la imagen al input file de la página sin copiarla.
+
+    Prueba DevTools, luego DataTransfer y por último send_keys con un enlace
+    ASCII. Devuelve el método que funcionó, o None.
+    """
+    for method, inject in (("cdp", inject_file_cdp), ("datatransfer", inject_file_bytes)):
+        try:
+            if inject(driver, image_path):
+                return method
+        except Exception as e:
+            print(f"   ⚠️ {method} falló: {e}")
+
+    # El enlace queda vivo hasta que la imagen tenga respuesta (release_safe_links)
+    with run_report.span("enlace_ascii"):
+        safe_path, temporary = link_to_safe_path(image_path)
+    for file_input in driver.find_elements(By.CSS_SELECTOR, "input[type='file']"):
+        try:
+            driver.execute_script("arguments[0].style.display = 'block';", file_input)
+            file_input.send_keys(safe_path)
+            return "send_keys"
+        except Exception:
+            continue
+    return None
+
+def get_desktop_images(new_only=False):
+    """Genera las imágenes de la carpeta Imágenes (incluyendo subcarpetas) en una sola pasada.
     
-    # Generar nombre de archivo sin caracteres especiales
-    original_name = os.path.basename(image_path)
-    # Reemplazar caracteres problemáticos
-    safe_name = original_name.encode('ascii', 'ignore').decode('ascii')
-    if not safe_name:
-        safe_name = f"image_{int(time.time())}.png"
-    
-    # Copiar archivo
-    safe_path = os.path.join(TEMP_IMAGES_PATH, safe_name)
-    shutil.copy2(image_path, safe_path)
-    
-    return safe_path
-
-def get_desktop_images():
-    """Obtiene todas las imágenes de la carpeta Imágenes (incluyendo subcarpetas)."""
-    images = []
-    for ext in IMAGE_EXTENSIONS:
-        # Buscar en la carpeta principal
-        images.extend(glob.glob(os.path.join(IMAGES_PATH, ext)))
-        # Buscar en subcarpetas
-        images.extend(glob.glob(os.path.join(IMAGES_PATH, '**', ext), recursive=True))
-    # Eliminar duplicados
-    images = list(set(images))
-    return images
+    Las carpetas sin cambios desde la corrida anterior se resuelven desde el
+    manifiesto sin volver a listarlas. Con new_only, solo las nuevas o cambiadas.
+    """
+    return iter_images(IMAGES_PATH, SCAN_MANIFEST_PATH, new_only=new_only)
 
 import subprocess
 
@@ -76,11 +361,17 @@ def copy_image_to_clipboard(image_path):
 
 # ... (imports)
 
-def setup_chrome_driver():
+def setup_chrome_driver(profile_path=None):
+    # Si browser_service.py está corriendo con este perfil, una pestaña de su Chrome ya abierto
+    profile_path = profile_path or PROFILE_PATH
+    if USE_BROWSER_SERVICE:
+        driver = attach_browser("traductor", GEMINI_APP_URL, profile_path=profile_path)
+        if driver:
+            return driver
+    
     chrome_options = Options()
     
     # Usar un perfil separado para evitar conflictos y bloqueos de automatización
-    profile_path = os.path.join(os.environ['USERPROFILE'], '.gemini_translator_profile')
     if not os.path.exists(profile_path):
         os.makedirs(profile_path)
     print(f"   📂 Usando perfil dedicado: {profile_path}")
@@ -88,7 +379,11 @@ def setup_chrome_driver():
     chrome_options.add_argument(f"--user-data-dir={profile_path}")
     
     # Flags estándar para automatización estable
-    chrome_options.add_argument("--start-maximized")
+    if HEADLESS:
+        chrome_options.add_argument("--headless=new")
+        chrome_options.add_argument("--window-size=1920,1080")
+    else:
+        chrome_options.add_argument("--start-maximized")
     chrome_options.add_argument("--disable-blink-features=AutomationControlled")
     chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
     chrome_options.add_experimental_option('useAutomationExtension', False)
@@ -111,14 +406,13 @@ def setup_chrome_driver():
         return driver
     except Exception as e:
         print(f"\n❌ Error iniciando Chrome: {e}")
-        sys.exit(1)
+        raise
 
 def wait_and_click(driver, by, value, timeout=30):
     """Espera un elemento y hace clic en él."""
     element = WebDriverWait(driver, timeout).until(
         EC.element_to_be_clickable((by, value))
     )
-    time.sleep(0.5)
     element.click()
     return element
 
@@ -130,76 +424,99 @@ def wait_for_element(driver, by, value, timeout=30):
 
 from selenium.webdriver.common.action_chains import ActionChains
 
+# Busca y pulsa en un solo round trip: primero el primer selector CSS con un
+# elemento visible y, si no, el elemento más interno de `scope` cuyo texto o
+# aria-label contenga alguno de los textos. Devuelve {index, label, count}
+# (index = selector que ganó, -1 si fue por texto), o null si no hubo coincidencia.
+CLICK_MATCH_JS = """
+    const [selectors, needles, scope, clickAll] = arguments;
+    const visible = el => {
+        const rect = el.getBoundingClientRect();
+        return rect.width > 0 && rect.height > 0 && getComputedStyle(el).visibility !== 'hidden';
+    };
+    const label = el => ((el.getAttribute('aria-label') || el.textContent || '').trim()).slice(0, 60);
+    let found = [], index = -1;
+    for (let i = 0; i < selectors.length && !found.length; i++) {
+        found = Array.from(document.querySelectorAll(selectors[i])).filter(visible);
+        if (found.length) index = i;
+    }
+    if (!found.length && needles.length) {
+        const matches = el => {
+            const text = ((el.textContent || '') + ' ' + (el.getAttribute('aria-label') || '')).toLowerCase();
+            return needles.some(needle => text.includes(needle));
+        };
+        const all = Array.from(document.querySelectorAll(scope)).filter(matches);
+        // Sin los contenedores de otra coincidencia (con scope '*' coincidiría hasta el body)
+        found = all.filter(el => !all.some(other => other !== el && el.contains(other))).filter(visible);
+    }
+    if (!found.length) return null;
+    (clickAll ? found : found.slice(0, 1)).forEach(el => el.click());
+    return { index: index, label: label(found[0]), count: found.length };
+"""
+
+TOOLS_BUTTON_SELECTORS = [
+    "button[aria-label='🍌 Crear imagen, botón, toca para usar la herramienta']",
+    "button[aria-label='Tools']",
+    "button[aria-label*='erramienta']",  # Parcial
+    "button[aria-label*='ool']",  # Parcial
+]
+NEW_CHAT_SELECTORS = ["button[aria-label*='Nueva']", "button[aria-label*='New']"]
+
+
+def click_match(driver, selectors=(), needles=(), scope='button', click_all=False, key=None):
+    """Pulsa el elemento que coincide (ver CLICK_MATCH_JS) con un solo execute_script.
+    
+    Con `key`, los selectores se prueban en el orden del registro de
+    selectores y el resultado se anota en él. Devuelve la etiqueta de lo
+    pulsado (o cuántos, con click_all), o None.
+    """
+    registry = get_registry() if key else None
+    selectors = registry.ordered(key, selectors) if registry else list(selectors)
+    started = time.perf_counter()
+    found = driver.execute_script(CLICK_MATCH_JS, selectors, [needle.lower() for needle in needles],
+                                  scope, click_all)
+    if registry and selectors:
+        index = found['index'] if found and found['index'] >= 0 else None
+        registry.resolved(key, selectors, index, time.perf_counter() - started)
+    if not found:
+        return None
+    return found['count'] if click_all else found['label']
+
+
 def navigate_to_image_tool(driver):
     """Navega a Gemini App y selecciona la herramienta 'Crear imagen'."""
     print("🌐 Abriendo Gemini App...")
-    driver.get("https://gemini.google.com/app")
-    time.sleep(5)
+    # Una pestaña precargada por el servicio de navegador ya está en la app
+    if driver.current_url.split('?')[0].rstrip('/') != GEMINI_APP_URL:
+        driver.get(GEMINI_APP_URL)
+    wait_until(driver, element_present(TEXTBOX_SELECTOR), timeout=PAGE_LOAD_TIMEOUT, label="gemini cargado")
     
     # Cerrar popups iniciales
+    started = time.perf_counter()
     try:
-        close_btns = driver.find_elements(By.XPATH, "//button[contains(@aria-label, 'Cerrar') or contains(@aria-label, 'Close') or contains(text(), 'Entendido') or contains(text(), 'Got it')]")
-        for btn in close_btns:
-            if btn.is_displayed():
-                driver.execute_script("arguments[0].click();", btn)
-                time.sleep(0.5)
-    except: pass
+        if click_match(driver, needles=('Cerrar', 'Close', 'Entendido', 'Got it'), click_all=True):
+            wait_until(driver, dom_settled(0.3), timeout=UI_TIMEOUT, label="cerrar popups")
+    except Exception:
+        pass
     
     # Seleccionar herramienta "Crear imágenes"
     print("🎨 Activando herramienta 'Crear imágenes'...")
     tool_selected = False
     
     try:
-        # Método 1: Buscar botón "Herramientas" por aria-label (varios idiomas)
-        tools_btn = None
-        selectors = [
-            "button[aria-label='🍌 Crear imagen, botón, toca para usar la herramienta']",
-            "button[aria-label='Tools']",
-            "button[aria-label*='erramienta']",  # Parcial
-            "button[aria-label*='ool']"  # Parcial
-        ]
-        
-        for sel in selectors:
-            try:
-                tools_btn = driver.find_element(By.CSS_SELECTOR, sel)
-                if tools_btn.is_displayed():
-                    break
-                tools_btn = None
-            except:
-                continue
-        
-        # Método 2: Buscar por texto del botón
-        if not tools_btn:
-            all_buttons = driver.find_elements(By.TAG_NAME, "button")
-            for btn in all_buttons:
-                try:
-                    text = (btn.text or "").lower()
-                    aria = (btn.get_attribute("aria-label") or "").lower()
-                    if "herramienta" in text or "herramienta" in aria or "tools" in aria:
-                        if btn.is_displayed():
-                            tools_btn = btn
-                            break
-                except:
-                    continue
-        
-        if tools_btn:
-            driver.execute_script("arguments[0].click();", tools_btn)
-            print("   ✅ Menú Herramientas abierto")
-            time.sleep(1)
+        # Botón "Herramientas": por aria-label (varios idiomas) o, si no, por texto
+        tools_label = click_match(driver, TOOLS_BUTTON_SELECTORS, ('herramienta', 'tools'),
+                                  key="gemini.tools_button")
+        if tools_label:
+            print(f"   ✅ Menú Herramientas abierto ({tools_label})")
+            wait_until(driver, any_of(element_visible("[role='menu'], [role='menuitem']"), dom_settled(0.3)),
+                       timeout=UI_TIMEOUT, label="menú herramientas")
             
-            # Buscar "Crear imágenes" en el menú desplegable
-            menu_items = driver.find_elements(By.CSS_SELECTOR, "button, div[role='menuitem'], li")
-            for item in menu_items:
-                try:
-                    text = (item.text or "").strip().lower()
-                    if "crear imagen" in text:
-                        driver.execute_script("arguments[0].click();", item)
-                        print("   ✅ Herramienta 'Crear imágenes' activada!")
-                        tool_selected = True
-                        time.sleep(1)
-                        break
-                except:
-                    continue
+            # "Crear imágenes" en el menú desplegable
+            if click_match(driver, needles=('crear imagen',), scope="button, div[role='menuitem'], li"):
+                print("   ✅ Herramienta 'Crear imágenes' activada!")
+                tool_selected = True
+                wait_until(driver, dom_settled(0.3), timeout=UI_TIMEOUT, label="herramienta activada")
         else:
             print("   ⚠️ Botón Herramientas no encontrado")
             
@@ -209,26 +526,25 @@ def navigate_to_image_tool(driver):
     # Fallback: Buscar botón de acceso rápido (pantalla inicial)
     if not tool_selected:
         try:
-            quick_btns = driver.find_elements(By.XPATH, 
-                "//*[contains(text(), 'Crear imagen') or contains(@aria-label, 'Crear imagen')]")
-            for btn in quick_btns:
-                if btn.is_displayed():
-                    driver.execute_script("arguments[0].click();", btn)
-                    print("   ✅ Acceso rápido 'Crear imagen' usado!")
-                    tool_selected = True
-                    break
-        except:
+            if click_match(driver, needles=('Crear imagen',), scope='*'):
+                print("   ✅ Acceso rápido 'Crear imagen' usado!")
+                tool_selected = True
+        except Exception:
             pass
     
+    elapsed = time.perf_counter() - started
+    record_wait("activar herramienta", elapsed, not tool_selected)
     if not tool_selected:
         print("   ⚠️ No se pudo activar 'Crear imágenes'.")
         print("   👉 Selecciona manualmente: Herramientas > Crear imágenes")
     
-    print("✅ Gemini listo para recibir imágenes.")
+    print(f"✅ Gemini listo para recibir imágenes. (herramienta en {elapsed * 1000:.0f} ms)")
     return True
             
 def bring_chrome_to_front(driver):
     """Trae la ventana de Chrome al frente usando Windows API."""
+    if pyautogui is None or HEADLESS:
+        return False
     try:
         import ctypes
         # Obtener el handle de la ventana actual de Selenium
@@ -252,52 +568,38 @@ def bring_chrome_to_front(driver):
         print(f"   ⚠️ Error al traer ventana al frente: {e}")
         return False
 
-def upload_image_and_translate(driver, image_path):
-    """Sube una imagen y envía el prompt de traducción."""
+def submit_image(driver, image_path):
+    """Sube una imagen y envía el prompt en la pestaña actual, sin esperar la respuesta.
+    
+    Devuelve cuántas respuestas había antes del prompt, para reconocer la nueva.
+    Lanza TranslationError si no se pudo subir.
+    """
     image_name = os.path.basename(image_path)
     print(f"\n📷 Procesando: {image_name}")
     
-    # Copiar imagen a ruta segura (sin caracteres especiales)
-    print("📋 Copiando imagen a ruta segura...")
-    safe_image_path = copy_to_safe_path(image_path)
-    print(f"   ✅ Imagen copiada a: {safe_image_path}")
-    
     print("📤 Subiendo imagen...")
     
     uploaded = False
     
     try:
-        time.sleep(2)
+        with run_report.span("chat_listo"):
+            wait_until(driver, element_present(TEXTBOX_SELECTOR), timeout=PAGE_LOAD_TIMEOUT, label="chat listo")
+        upload_started = time.perf_counter()
         
         # ESTRATEGIA 1: Buscar input file que ya existe (name='Filedata' u otro)
         print("   🔍 Buscando input file existente...")
         
-        # Usar JavaScript para encontrar y habilitar el input file
-        uploaded = driver.execute_script("""
-            const inputs = document.querySelectorAll('input[type="file"]');
-            if (inputs.length > 0) {
-                const input = inputs[0];
-                input.style.display = 'block';
-                input.style.visibility = 'visible';
-                input.style.opacity = '1';
-                input.style.position = 'fixed';
-                input.style.top = '0';
-                input.style.left = '0';
-                input.style.width = '100px';
-                input.style.height = '100px';
-                input.style.zIndex = '999999';
-                return true;
-            }
-            return false;
-        """)
+        has_input = driver.execute_script(
+            "return document.querySelectorAll('input[type=\"file\"]').length > 0;")
         
-        if uploaded:
+        if has_input:
             print("   ✅ Input file encontrado, enviando archivo...")
-            time.sleep(0.5)
-            file_input = driver.find_element(By.CSS_SELECTOR, "input[type='file']")
-            file_input.send_keys(safe_image_path)
-            print("   ✅ Archivo enviado!")
-            time.sleep(3)
+            method = inject_file(driver, image_path)
+            if method:
+                uploaded = True
+                run_report.fallback("subida", f"input:{method}")
+                print(f"   ✅ Archivo enviado! ({method})")
+                wait_until(driver, dom_settled(0.5), timeout=UPLOAD_TIMEOUT, label="subida")
         else:
             # ESTRATEGIA 2: Abrir el menú y usar pyautogui para el diálogo
             print("   🔍 No hay input file, abriendo menú de subida...")
@@ -307,60 +609,75 @@ def upload_image_and_translate(driver, image_path):
                 menu_btn = driver.find_element(By.CSS_SELECTOR, 
                     "button[aria-label*='menú de subida'], button[aria-label*='upload menu']")
                 driver.execute_script("arguments[0].click();", menu_btn)
-                time.sleep(1)
+                wait_until(driver, element_visible("button[aria-label*='Subir archivos'], button[aria-label*='Upload files']"),
+                           timeout=UI_TIMEOUT, label="menú de subida")
                 
                 # Hacer clic en "Subir archivos"
                 upload_btn = driver.find_element(By.CSS_SELECTOR, 
                     "button[aria-label*='Subir archivos'], button[aria-label*='Upload files']")
                 driver.execute_script("arguments[0].click();", upload_btn)
-                time.sleep(1.5)
+                wait_until(driver, element_present("input[type='file']"), timeout=1.5, label="input file")
                 
                 # Buscar de nuevo el input file (podría aparecer ahora)
-                file_inputs = driver.find_elements(By.CSS_SELECTOR, "input[type='file']")
-                if file_inputs:
-                    for fi in file_inputs:
-                        try:
-                            driver.execute_script("arguments[0].style.display = 'block';", fi)
-                            fi.send_keys(safe_image_path)
-                            print("   ✅ Archivo enviado via input!")
-                            uploaded = True
-                            time.sleep(3)
-                            break
-                        except:
-                            continue
+                if driver.find_elements(By.CSS_SELECTOR, "input[type='file']"):
+                    method = inject_file(driver, image_path)
+                    if method:
+                        print(f"   ✅ Archivo enviado via input! ({method})")
+                        uploaded = True
+                        run_report.fallback("subida", f"menu:{method}")
+                        wait_until(driver, dom_settled(0.5), timeout=UPLOAD_TIMEOUT, label="subida")
                 
                 # Si aun no funciona, probablemente abrió diálogo del sistema
-                if not uploaded:
+                if not uploaded and (pyautogui is None or HEADLESS):
+                    print("   ⚠️ Sin escritorio para usar el diálogo del sistema")
+                elif not uploaded:
                     print("   ⌨️ Usando diálogo del sistema...")
+                    # El diálogo es del sistema operativo: no hay DOM que observar
                     time.sleep(1)
-                    import pyperclip
-                    pyperclip.copy(safe_image_path)
+                    # El enlace se borra cuando la imagen tenga respuesta (release_safe_links)
+                    with run_report.span("enlace_ascii"):
+                        safe_path, temporary = link_to_safe_path(image_path)
+                    pyperclip.copy(safe_path)
                     pyautogui.hotkey('ctrl', 'v')
                     time.sleep(0.5)
                     pyautogui.press('enter')
-                    time.sleep(3)
+                    wait_until(driver, dom_settled(0.5), timeout=UPLOAD_TIMEOUT, label="subida")
                     uploaded = True
+                    run_report.fallback("subida", "dialogo")
                     
             except Exception as e:
                 print(f"   ⚠️ Error con menú: {e}")
+        
+        run_report.record("subida", time.perf_counter() - upload_started)
                 
     except Exception as e:
         print(f"   ⚠️ Error: {e}")
     
     if not uploaded:
         print("\n❌ No se pudo subir automáticamente.")
-        print(f"📁 Imagen: {safe_image_path}")
-        print("👉 Sube la imagen manualmente y presiona Enter...")
-        input()
+        raise TranslationError("No se pudo subir la imagen")
     
-    time.sleep(2)
-
+    # Esperar a que la imagen se procese (la vista previa deja de cambiar)
+    with run_report.span("vista_previa"):
+        wait_until(driver, dom_settled(1.0), timeout=UPLOAD_TIMEOUT, label="imagen procesada")
         
-    search_prompt = "traduce el texto de la imagen, a español"
+    search_prompt = PROMPT
     
     print(f"✏️ Escribiendo prompt: '{search_prompt}'")
-    time.sleep(2)  # Esperar a que la imagen se procese
     
+    # Respuestas ya presentes, para reconocer la nueva
+    try:
+        baseline = count_responses(driver)
+    except Exception:
+        baseline = 0
+    
+    with run_report.span("prompt"):
+        send_prompt(driver, search_prompt)
+    
+    return baseline
+
+def send_prompt(driver, prompt):
+    """Escribe el prompt en el cuadro de texto y lo envía; lanza TranslationError si no puede."""
     # Usar JavaScript para establecer el texto (evita problemas de encoding y Trusted Types)
     try:
         sent = driver.execute_script("""
@@ -378,225 +695,680 @@ def upload_image_and_translate(driver, image_path):
                 return true;
             }
             return false;
-        """, search_prompt)
+        """, prompt)
         
         if sent:
             print("   ✅ Prompt enviado via JavaScript!")
+            run_report.fallback("prompt", "js")
         else:
             raise Exception("Textbox not found")
             
     except Exception as e:
         print(f"   ⚠️ Error con JS: {e}")
         # Fallback: usar pyautogui
+        if pyautogui is None or HEADLESS:
+            raise TranslationError(f"No se pudo enviar el prompt: {e}")
         try:
-            pyperclip.copy(search_prompt)
+            pyperclip.copy(prompt)
             pyautogui.hotkey('ctrl', 'v')
             time.sleep(0.5)
             pyautogui.press('enter')
             print("   ✅ Prompt enviado via pyautogui!")
-        except:
-            print("👉 Escribe el prompt manualmente y presiona Enter...")
-            input()
-    
-    time.sleep(1)
+            run_report.fallback("prompt", "pyautogui")
+        except Exception as e:
+            raise TranslationError(f"No se pudo enviar el prompt: {e}")
+
+def count_responses(driver):
+    """Número de respuestas de Gemini en la conversación actual."""
+    return driver.execute_script("return document.querySelectorAll('model-response').length;")
+
+def response_complete(baseline, text_settle=TEXT_RESPONSE_SETTLE):
+    """Condición: hay una respuesta nueva, ya no está generando y su imagen terminó de cargar.
     
-    # Esperar la respuesta
-    print("⏳ Esperando respuesta de Gemini...")
-    # Esperar a que aparezca una nueva imagen o texto de respuesta
-    # Método simple: esperar tiempo fijo + chequeo de carga
-    time.sleep(30)  # Esperar más tiempo para generación de imagen
+    Si la respuesta no trae imagen (texto o rechazo), se da por terminada
+    cuando lleva `text_settle` segundos sin generar.
+    """
+    state = {"idle_since": None}
     
-    return save_result_image(driver, image_name)
+    def condition(driver):
+        status = driver.execute_script(RESPONSE_STATUS_JS)
+        if not status or status["turns"] <= baseline or status["generating"]:
+            state["idle_since"] = None
+            return None
+        if status["images_total"]:
+            return status if status["images_ready"] == status["images_total"] else None
+        now = time.monotonic()
+        if state["idle_since"] is None:
+            state["idle_since"] = now
+        return status if now - state["idle_since"] >= text_settle else None
+    condition.__name__ = 'response_complete'
+    return condition
+
+# Elige la imagen más nueva de la última respuesta y la lee en la página (fetch
+# con las cookies de la sesión; blob:, data: y http por igual). Si fetch falla,
+# la redibuja en un canvas a resolución natural. Devuelve el primer trozo en base64.
+FETCH_RESULT_IMAGE_JS = """
+    const chunkSize = arguments[0];
+    const done = arguments[arguments.length - 1];
+    const responses = document.querySelectorAll('model-response');
+    const scope = responses.length ? responses[responses.length - 1] : document;
+    const candidates = Array.from(scope.querySelectorAll('img, canvas')).filter(el => {
+        if (el.tagName === 'CANVAS') return el.width > 0;
+        const src = el.currentSrc || el.src || '';
+        return src.startsWith('blob:') || src.startsWith('data:image') ||
+            /generated/i.test(src + ' ' + el.alt) || /response/i.test(el.className) ||
+            (src && (el.naturalWidth > 200 || el.getBoundingClientRect().width > 200));
+    });
+    if (!candidates.length) return done(null);
+    const el = candidates[candidates.length - 1];
+    const src = el.currentSrc || el.src || '';
+
+    const finish = (blob, source) => {
+        const reader = new FileReader();
+        reader.onload = () => {
+            const data = reader.result.slice(reader.result.indexOf(',') + 1);
+            if (data.length > chunkSize) window.__geminiResultData = data;
+            done({ source: source, mime: blob.type, length: data.length, src: src,
+                   width: el.naturalWidth || el.width, height: el.naturalHeight || el.height,
+                   chunk: data.slice(0, chunkSize) });
+        };
+        reader.onerror = () => done({ error: 'FileReader: ' + reader.error, src: src });
+        reader.readAsDataURL(blob);
+    };
+    const fromCanvas = () => {
+        let canvas = el;
+        if (el.tagName !== 'CANVAS') {
+            canvas = document.createElement('canvas');
+            canvas.width = el.naturalWidth;
+            canvas.height = el.naturalHeight;
+            canvas.getContext('2d').drawImage(el, 0, 0);
+        }
+        try {
+            canvas.toBlob(blob => blob ? finish(blob, 'canvas') : done({ error: 'canvas vacío', src: src }),
+                          'image/png');
+        } catch (e) {
+            done({ error: String(e), src: src });  // Canvas contaminado por CORS
+        }
+    };
+
+    if (el.tagName === 'CANVAS') return fromCanvas();
+    fetch(src, { credentials: 'include' })
+        .then(r => { if (!r.ok) throw new Error('HTTP ' + r.status); return r.blob(); })
+        .then(blob => finish(blob, 'fetch'))
+        .catch(fromCanvas);
+"""
+
+READ_RESULT_CHUNK_JS = "return window.__geminiResultData.slice(arguments[0], arguments[0] + arguments[1]);"
+RELEASE_RESULT_JS = "delete window.__geminiResultData;"
+
+RESULT_CHUNK_SIZE = 8 * 1024 * 1024  # Caracteres base64 por round trip
+RESULT_FETCH_TIMEOUT = 30  # Segundos
+
+RESULT_EXTENSIONS = {'image/png': '.png', 'image/jpeg': '.jpg', 'image/webp': '.webp', 'image/gif': '.gif'}
+
+
+def fetch_result_image(driver):
+    """Lee en la página los bytes de la imagen generada, a resolución original.
+
+    Un solo execute_async_script; solo las imágenes de más de
+    RESULT_CHUNK_SIZE necesitan viajes extra. Devuelve un dict con data
+    (bytes), mime, source, width y height; un dict con error y src si la
+    página no pudo leerla o llegó incompleta; o None si no hay imagen en la
+    respuesta.
+    """
+    # El timeout de scripts asíncronos es de toda la sesión: se devuelve el anterior
+    previous_timeout = driver.timeouts.script
+    driver.set_script_timeout(RESULT_FETCH_TIMEOUT)
+    try:
+        result = driver.execute_async_script(FETCH_RESULT_IMAGE_JS, RESULT_CHUNK_SIZE)
+    finally:
+        driver.set_script_timeout(previous_timeout)
+    if not result or 'error' in result:
+        return result
+
+    chunks = [result.pop('chunk')]
+    received = len(chunks[0])
+    while received < result['length']:
+        chunk = driver.execute_script(READ_RESULT_CHUNK_JS, received, RESULT_CHUNK_SIZE)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        received += len(chunk)
+    if result['length'] > RESULT_CHUNK_SIZE:
+        driver.execute_script(RELEASE_RESULT_JS)
+    if received != result['length']:
+        # Una imagen truncada no se guarda como buena: que la descargue el fallback
+        return {'error': f"lectura incompleta ({received} de {result['length']} caracteres)",
+                'src': result.get('src', '')}
+
+    result['data'] = base64.b64decode(''.join(chunks))
+    return result
+
+
+def download_with_browser_session(driver, url):
+    """Descarga una URL http con las cookies y el user agent del navegador."""
+    session = requests.Session()
+    for cookie in driver.get_cookies():
+        session.cookies.set(cookie['name'], cookie['value'], domain=cookie.get('domain'))
+    session.headers['User-Agent'] = driver.execute_script("return navigator.userAgent;")
+    response = session.get(url, timeout=RESULT_FETCH_TIMEOUT)
+    response.raise_for_status()
+    return response.content, response.headers.get('Content-Type', '').split(';')[0]
+
 
 def save_result_image(driver, original_name):
-    """Guarda la imagen resultante de la traducción."""
+    """Guarda la imagen resultante de la traducción. Lanza TranslationError si no puede."""
     print("💾 Buscando imagen para guardar...")
     
     try:
-        # Esperar un poco más para que la imagen se renderice
-        time.sleep(3)
+        # Buscar la imagen en la última respuesta de Gemini (no en la imagen subida)
+        with run_report.span("lectura_resultado"):
+            result = fetch_result_image(driver)
+        if not result:
+            print("⚠️ No se encontró imagen de respuesta")
+            raise TranslationError("No se encontró imagen en la respuesta")
         
-        # Buscar imágenes en la respuesta de Gemini
-        # Las imágenes generadas pueden tener varios formatos de src
-        images = driver.find_elements(By.CSS_SELECTOR, "img, canvas")
+        if 'error' in result:
+            # La página no pudo leerla (p. ej. CORS): descargar fuera con la sesión del navegador
+            if not result.get('src', '').startswith('http'):
+                raise RuntimeError(result['error'])
+            print(f"   ⚠️ {result['error']}, descargando con las cookies del navegador...")
+            with run_report.span("descarga_http"):
+                data, mime = download_with_browser_session(driver, result['src'])
+            source = "requests"
+        else:
+            data, mime, source = result['data'], result['mime'], result['source']
         
-        # Filtrar imágenes que podrían ser la respuesta generada
-        result_images = []
-        for img in images:
-            try:
-                src = img.get_attribute("src") or ""
-                alt = img.get_attribute("alt") or ""
-                class_name = img.get_attribute("class") or ""
-                
-                # Incluir imágenes blob, data, o de respuesta
-                if ("blob:" in src or "data:image" in src or 
-                    "generated" in src.lower() or "generated" in alt.lower() or
-                    "response" in class_name.lower() or
-                    img.tag_name == "canvas"):
-                    result_images.append(img)
-                # También buscar imágenes grandes que no sean iconos
-                elif src and img.size.get('width', 0) > 200:
-                    result_images.append(img)
-            except:
-                continue
+        # Generar nombre para guardar
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        base_name = os.path.splitext(original_name)[0]
+        save_name = f"traduccion_{base_name}_{timestamp}{RESULT_EXTENSIONS.get(mime, '.png')}"
+        save_path = os.path.join(DESKTOP_PATH, save_name)
         
-        if result_images:
-            # Intentar descargar la última imagen (probablemente la respuesta)
-            img = result_images[-1]
-            src = img.get_attribute("src")
-            
-            # Generar nombre para guardar
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            base_name = os.path.splitext(original_name)[0]
-            save_name = f"traduccion_{base_name}_{timestamp}.png"
-            save_path = os.path.join(DESKTOP_PATH, save_name)
+        with run_report.span("guardado"), open(save_path, 'wb') as f:
+            f.write(data)
+        run_report.fallback("resultado", source)
+        size = f" {result['width']}x{result['height']}," if 'width' in result else ""
+        print(f"✅ Imagen guardada: {save_name} ({source},{size} {len(data) // 1024} KB)")
+        return save_path
             
-            # Intentar hacer clic derecho y guardar, o usar JavaScript
+    except TranslationError:
+        raise
+    except Exception as e:
+        print(f"⚠️ No se pudo guardar automáticamente: {e}")
+        raise TranslationError(f"No se pudo guardar la imagen: {e}")
+
+def open_tabs(driver, count):
+    """Abre pestañas extra en la misma sesión, cada una con su conversación en 'Crear imagen'.
+    
+    La pestaña actual (ya preparada) es la primera. Devuelve los handles.
+    """
+    handles = [driver.current_window_handle]
+    for i in range(count - 1):
+        if hasattr(driver, 'new_tab'):
+            driver.new_tab(GEMINI_APP_URL)  # Pestaña prestada por el servicio de navegador
+        else:
+            driver.switch_to.new_window('tab')
+        print(f"\n🗂️ Preparando pestaña {i + 2}/{count}...")
+        navigate_to_image_tool(driver)
+        handles.append(driver.current_window_handle)
+    return handles
+
+def translate_in_tabs(driver, images, tabs=PARALLEL_TABS, on_submit=None, on_result=None, preprocessor=None):
+    """Reparte las imágenes entre varias pestañas de Gemini.
+    
+    Mientras una pestaña espera a que Gemini genere, en otra se sube la
+    siguiente imagen. Las imágenes llegan por una cola acotada alimentada
+    desde otro hilo, así que `images` puede ser un generador.
+    
+    on_submit(imagen) se llama cuando el prompt quedó enviado y
+    on_result(imagen, resultado, error) al terminar cada una; un fallo no
+    detiene el lote. Con `preprocessor`, las imágenes se reducen en su pool
+    de procesos mientras las pestañas esperan a Gemini.
+    """
+    handles = open_tabs(driver, max(1, tabs))
+    
+    # Cola acotada: el productor no adelanta más de dos imágenes por pestaña
+    work = queue.Queue(maxsize=len(handles) * 2)
+    
+    source_errors = []  # Excepción de la fuente de imágenes, para relanzarla aquí
+    
+    def produce():
+        try:
+            if preprocessor:
+                for image_path, upload_path, waited in preprocessor.iter_prepared(images):
+                    work.put((image_path, upload_path, waited))
+            else:
+                for image_path in images:
+                    work.put((image_path, image_path, None))
+        except Exception as e:
+            print(f"\n❌ La fuente de imágenes falló: {e}")
+            source_errors.append(e)
+        finally:
+            work.put(None)
+    
+    def next_item(block):
+        # Get con timeout en bucle: un get sin timeout no se interrumpe con Ctrl+C en Windows
+        while True:
+            try:
+                return work.get(timeout=WORK_POLL_INTERVAL) if block else work.get_nowait()
+            except queue.Empty:
+                if not block:
+                    raise
+    
+    threading.Thread(target=produce, daemon=True).start()
+    
+    results = []
+    active = {}  # handle -> trabajo en generación
+    exhausted = False
+    submitted = 0
+    
+    while True:
+        # Asignar imágenes a las pestañas libres
+        for handle in handles:
+            if exhausted or handle in active:
+                continue
+            # Solo se bloquea esperando imágenes si no hay ninguna pestaña generando
+            try:
+                item = next_item(block=not active)
+            except queue.Empty:
+                break
+            if item is None:
+                exhausted = True
+                break
+            image_path, upload_path, waited = item
+            submitted += 1
+            run_report.begin(image_path)
+            if waited is not None:
+                run_report.record("preprocesado", waited)
+            driver.switch_to.window(handle)
+            print(f"\n{'=' * 40}")
+            print(f"📷 Imagen {submitted} → pestaña {handles.index(handle) + 1}: {os.path.basename(image_path)}")
+            print(f"{'=' * 40}")
             try:
-                # Intentar descargar usando requests si es una URL accesible
-                if src.startswith("http"):
-                    response = requests.get(src)
-                    with open(save_path, 'wb') as f:
-                        f.write(response.content)
-                    print(f"✅ Imagen guardada: {save_name}")
-                    return save_path
-                elif src.startswith("data:"):
-                    # Decodificar base64
-                    import base64
-                    data = src.split(",")[1]
-                    with open(save_path, 'wb') as f:
-                        f.write(base64.b64decode(data))
-                    print(f"✅ Imagen guardada: {save_name}")
-                    return save_path
-                else:
-                    # Intentar hacer screenshot del elemento
-                    img.screenshot(save_path)
-                    print(f"✅ Captura de imagen guardada: {save_name}")
-                    return save_path
+                baseline = submit_image(driver, upload_path)
             except Exception as e:
-                print(f"⚠️ No se pudo guardar automáticamente: {e}")
-                print("📝 Por favor, guarda la imagen manualmente haciendo clic derecho > Guardar imagen")
-                input("Presiona Enter cuando hayas guardado la imagen...")
-                return None
-        else:
-            print("⚠️ No se encontró imagen de respuesta")
-            print("📝 Si hay una imagen, guárdala manualmente")
-            input("Presiona Enter para continuar...")
-            return None
+                print(f"❌ {e}")
+                release_safe_links(upload_path)
+                run_report.finish(image_path, False, str(e))
+                results.append({'original': image_path, 'result': None, 'error': str(e)})
+                if on_result:
+                    on_result(image_path, None, str(e))
+                clear_conversation(driver)
+                continue
+            if on_submit:
+                on_submit(image_path)
+            active[handle] = {
+                'original': image_path,
+                'upload': upload_path,
+                'condition': response_complete(baseline),
+                'started': time.monotonic(),
+            }
+        
+        if not active:
+            break
+        
+        # Revisar las pestañas que están generando
+        for handle, job in list(active.items()):
+            driver.switch_to.window(handle)
+            try:
+                status = job['condition'](driver)
+            except Exception:
+                status = None
+            elapsed = time.monotonic() - job['started']
+            timed_out = elapsed >= GENERATION_TIMEOUT
+            if not status and not timed_out:
+                continue
             
-    except Exception as e:
-        print(f"❌ Error guardando imagen: {e}")
+            record_wait("respuesta gemini", elapsed, timed_out)
+            run_report.activate(job['original'])
+            run_report.record("generacion", elapsed)
+            name = os.path.basename(job['original'])
+            result = error = None
+            if status:
+                print(f"\n✅ Pestaña {handles.index(handle) + 1}: respuesta lista en {elapsed:.1f}s ({name})")
+                try:
+                    result = save_result_image(driver, name)
+                except Exception as e:
+                    error = str(e)
+            else:
+                print(f"\n⚠️ Pestaña {handles.index(handle) + 1}: Gemini no terminó en {GENERATION_TIMEOUT}s ({name})")
+                error = f"Gemini no terminó en {GENERATION_TIMEOUT}s"
+            release_safe_links(job['upload'])
+            run_report.finish(job['original'], bool(result), error)
+            results.append({'original': job['original'], 'result': result, 'error': error})
+            if on_result:
+                on_result(job['original'], result, error)
+            del active[handle]
+            
+            # Limpiar la conversación de esta pestaña para la siguiente imagen
+            clear_conversation(driver)
+        
+        time.sleep(TAB_POLL_INTERVAL)
+    
+    release_safe_links()
+    if source_errors:
+        raise TranslationError(f"La fuente de imágenes falló: {source_errors[0]}") from source_errors[0]
+    return results
+
+def write_run_report():
+    """Escribe el informe de tiempos de la corrida y muestra su resumen; devuelve la ruta o None."""
+    lines = run_report.format_report_lines()
+    if not lines:
+        return None
+    print("\n📈 Tiempos por etapa:")
+    for line in lines:
+        print(f"   {line}")
+    path = REPORT_PATH
+    if not path:
+        os.makedirs(REPORTS_PATH, exist_ok=True)
+        path = os.path.join(REPORTS_PATH, f"run_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    try:
+        run_report.write_report(path)
+    except OSError as e:
+        print(f"⚠️ No se pudo escribir el informe: {e}")
         return None
+    print(f"   📄 Informe: {path}")
+    return path
+
+def create_preprocessor():
+    """Pool de preprocesado según la configuración, o None si está desactivado o falta Pillow."""
+    if PREPROCESS and preprocess_available():
+        return Preprocessor(UPLOADS_CACHE_PATH, UPLOAD_MAX_EDGE, UPLOAD_FORMAT)
+    if PREPROCESS:
+        print("⚠️ Pillow no está instalado: se suben las imágenes originales")
+    return None
+
+def stream_jobs(paths, jobs, cache, seen_at, on_cached=None):
+    """Registra cada ruta de `paths` en la cola y genera los trabajos que van quedando listos.
+    
+    `paths` puede generar None para decir "nada nuevo": es la ocasión de
+    reclamar los reintentos cuya espera ya venció. Cuando `paths` se agota,
+    se terminan los reintentos pendientes.
+    """
+    for path in paths:
+        if path is not None:
+            cached, checked = cache.check(path)
+            jobs.add(path, result=cached, seen_at=seen_at, missed=checked)
+            if cached and on_cached:
+                on_cached(path, cached)
+        job = jobs.claim()
+        while job:
+            yield job['source']
+            job = jobs.claim()
+    yield from jobs.iter_ready()
+
+def translate_jobs(driver, sources, jobs, cache, on_result=None, preprocessor=None):
+    """Traduce los trabajos que entrega `sources` y anota cada resultado en la cola y la caché.
+    
+    `sources` genera rutas ya reclamadas en `jobs` (p. ej. jobs.iter_ready()).
+    """
+    def ready_images():
+        for image_path in sources:
+            if os.path.exists(image_path):
+                yield image_path
+            else:
+                jobs.fail(image_path, "El archivo ya no existe", retry=False)
+    
+    def remember(original, result, error):
+        if result:
+            cache.store(original, result)
+            jobs.mark_saved(original, result)
+        elif jobs.fail(original, error) == 'pending':
+            print(f"   🔁 Se reintentará más tarde: {os.path.basename(original)}")
+        if on_result:
+            on_result(original, result, error)
+    
+    return translate_in_tabs(driver, ready_images(), PARALLEL_TABS, on_submit=jobs.mark_generating,
+                             on_result=remember, preprocessor=preprocessor)
 
 def clear_conversation(driver):
     """Limpia la conversación para la siguiente imagen."""
+    started = time.perf_counter()
     try:
-        # Buscar botón de nueva conversación
-        new_chat_selectors = [
-            "//button[contains(@aria-label, 'Nueva')]",
-            "//button[contains(@aria-label, 'New')]",
-            "//*[contains(text(), 'Nueva conversación')]",
-            "//*[contains(text(), 'New chat')]",
-        ]
-        
-        for selector in new_chat_selectors:
-            try:
-                btn = driver.find_element(By.XPATH, selector)
-                btn.click()
-                time.sleep(2)
+        # Botón de nueva conversación: por aria-label o por texto, en un solo round trip
+        if click_match(driver, NEW_CHAT_SELECTORS, ('Nueva conversación', 'New chat'), scope='*',
+                       key="gemini.new_chat"):
+            if wait_until(driver, all_of(element_present(TEXTBOX_SELECTOR), dom_settled(0.5)),
+                          timeout=PAGE_LOAD_TIMEOUT, label="nueva conversación"):
+                elapsed = time.perf_counter() - started
+                record_wait("limpiar conversación", elapsed)
+                print(f"🧹 Conversación nueva en {elapsed * 1000:.0f} ms")
                 return True
-            except:
-                continue
-        
-        # Si no encuentra, refrescar la página
-        driver.refresh()
-        time.sleep(3)
-        return True
-        
     except Exception as e:
         print(f"⚠️ Error limpiando conversación: {e}")
-        driver.refresh()
-        time.sleep(3)
-        return True
+    
+    # Si no encuentra, refrescar la página
+    driver.refresh()
+    wait_until(driver, element_present(TEXTBOX_SELECTOR), timeout=PAGE_LOAD_TIMEOUT, label="recarga")
+    record_wait("limpiar conversación", time.perf_counter() - started)
+    return True
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Traduce con Gemini las imágenes de una carpeta y guarda los resultados.")
+    parser.add_argument('--source', default=IMAGES_PATH, help="carpeta con las imágenes (recursiva)")
+    parser.add_argument('--output', default=DESKTOP_PATH, help="carpeta donde guardar las traducciones")
+    parser.add_argument('--prompt', default=PROMPT, help="instrucción enviada con cada imagen")
+    parser.add_argument('--tabs', type=int, default=PARALLEL_TABS, help="pestañas de Gemini trabajando a la vez")
+    parser.add_argument('--page-timeout', type=float, default=PAGE_LOAD_TIMEOUT,
+                        help="segundos máximos para que cargue Gemini")
+    parser.add_argument('--upload-timeout', type=float, default=UPLOAD_TIMEOUT,
+                        help="segundos máximos para procesar una subida")
+    parser.add_argument('--generation-timeout', type=float, default=GENERATION_TIMEOUT,
+                        help="segundos máximos para que Gemini genere una imagen")
+    parser.add_argument('--max-edge', type=int, default=UPLOAD_MAX_EDGE,
+                        help="lado mayor en píxeles de la imagen subida (0 = sin reducir)")
+    parser.add_argument('--upload-format', choices=('webp', 'jpeg', 'png'), default=UPLOAD_FORMAT,
+                        help="formato en que se re-codifica la imagen subida")
+    parser.add_argument('--no-preprocess', action='store_true', help="subir las imágenes originales tal cual")
+    parser.add_argument('--watch', action='store_true',
+                        help="tras el primer escaneo, seguir vigilando la carpeta con Chrome abierto (Ctrl+C para salir)")
+    parser.add_argument('--watch-poll', action='store_true', help="vigilar sondeando aunque haya inotify")
+    parser.add_argument('--headless', action='store_true', help="Chrome sin ventana")
+    parser.add_argument('--no-service', action='store_true',
+                        help="abrir un Chrome propio aunque browser_service.py esté corriendo")
+    parser.add_argument('--pooled-profile', action='store_true',
+                        help="usar una copia del perfil del pool, para correr varias instancias a la vez "
+                             "sobre la misma cola")
+    parser.add_argument('--non-interactive', action='store_true',
+                        help="no preguntar nada; los fallos quedan registrados en la cola")
+    parser.add_argument('--retry-failed', action='store_true',
+                        help="volver a intentar las imágenes que fallaron en corridas anteriores")
+    parser.add_argument('--invalidate', action='append', default=[], metavar='IMAGEN',
+                        help="olvidar la traducción guardada de esta imagen (repetible)")
+    parser.add_argument('--clear-cache', action='store_true', help="borrar toda la caché de traducciones")
+    parser.add_argument('--report', metavar='RUTA',
+                        help="informe de tiempos por imagen (.json o .csv); por defecto uno nuevo en "
+                             f"{REPORTS_PATH}")
+    return parser.parse_args(argv)
 
-def main():
-    """Función principal del script."""
+def apply_args(args):
+    """Vuelca las opciones de línea de comandos en la configuración del módulo."""
+    global IMAGES_PATH, DESKTOP_PATH, PROMPT, PARALLEL_TABS, PAGE_LOAD_TIMEOUT, UPLOAD_TIMEOUT
+    global GENERATION_TIMEOUT, HEADLESS, INTERACTIVE, PREPROCESS, UPLOAD_MAX_EDGE, UPLOAD_FORMAT, WATCH, WATCH_POLL
+    global REPORT_PATH, USE_BROWSER_SERVICE, USE_PROFILE_POOL
+    IMAGES_PATH = os.path.abspath(args.source)
+    DESKTOP_PATH = os.path.abspath(args.output)
+    PROMPT = args.prompt
+    PARALLEL_TABS = max(1, args.tabs)
+    PAGE_LOAD_TIMEOUT = args.page_timeout
+    UPLOAD_TIMEOUT = args.upload_timeout
+    GENERATION_TIMEOUT = args.generation_timeout
+    HEADLESS = args.headless
+    USE_BROWSER_SERVICE = not args.no_service
+    USE_PROFILE_POOL = args.pooled_profile
+    PREPROCESS = not args.no_preprocess
+    UPLOAD_MAX_EDGE = max(0, args.max_edge)
+    UPLOAD_FORMAT = args.upload_format
+    WATCH = args.watch or args.watch_poll
+    WATCH_POLL = args.watch_poll
+    REPORT_PATH = os.path.abspath(args.report) if args.report else None
+    INTERACTIVE = not args.non_interactive and sys.stdin is not None and sys.stdin.isatty()
+
+def main(argv=None):
+    """Función principal del script. Devuelve el código de salida."""
+    args = parse_args(argv)
+    apply_args(args)
+    
     print("=" * 60)
     print("🍌 GEMINI NANO BANANA - Traductor de Imágenes")
     print("=" * 60)
     
-    # Obtener imágenes del escritorio
-    images = get_desktop_images()
+    if not os.path.isdir(IMAGES_PATH):
+        print(f"❌ No existe la carpeta de imágenes: {IMAGES_PATH}")
+        return EXIT_SETUP_ERROR
+    os.makedirs(DESKTOP_PATH, exist_ok=True)
+    
+    # Las ya traducidas (mismo contenido y prompt) no pasan por Chrome;
+    # se consultan a medida que el escaneo va encontrando imágenes
+    cache = TranslationCache()
+    cache.load()
+    if args.clear_cache:
+        cache.clear()
+        print("🗑️ Caché de traducciones borrada")
+    for image_path in args.invalidate:
+        if cache.invalidate(os.path.abspath(image_path)):
+            print(f"🗑️ Se volverá a traducir: {os.path.basename(image_path)}")
     
-    if not images:
+    # Cola persistente: lo que quedó a medias en una corrida caída vuelve a pending
+    jobs = JobQueue(JOBS_PATH)
+    recovered = jobs.recover()
+    if args.retry_failed:
+        print(f"🔁 {jobs.retry_failed()} trabajo(s) fallido(s) vuelven a la cola")
+    run_started = time.time()
+    run_report.reset_report()
+    found = 0
+    print("\n📷 Buscando imágenes...")
+    for image_path in get_desktop_images():
+        found += 1
+        print(f"   - {os.path.basename(image_path)}")
+        cached, checked = cache.check(image_path)
+        jobs.add(image_path, result=cached, seen_at=run_started, missed=checked)
+    
+    if not found and not WATCH:
         print("❌ No se encontraron imágenes en la carpeta Imágenes.")
         print(f"📁 Ruta de Imágenes: {IMAGES_PATH}")
         print("Por favor, coloca las imágenes que deseas traducir en esa carpeta.")
-        return
+        jobs.close()
+        return EXIT_OK
+    
+    print(f"\n📷 Se encontraron {found} imagen(es)")
+    print(f"\n🗃️ Caché: {cache.hits} ya traducida(s), {cache.misses} por traducir")
+    if recovered:
+        print(f"♻️ Se retoman {recovered} trabajo(s) interrumpido(s) de la corrida anterior")
+    
+    counts = jobs.counts()
+    if not counts['pending'] and not WATCH:
+        print("✅ Todas las imágenes ya estaban traducidas.")
+        jobs.close()
+        if counts['failed']:
+            print(f"   ({counts['failed']} fallida(s) tras {jobs.max_attempts} intentos; usa --retry-failed)")
+            return EXIT_FAILURES
+        return EXIT_OK
     
-    print(f"\n📷 Se encontraron {len(images)} imagen(es):")
-    for img in images:
-        print(f"   - {os.path.basename(img)}")
+    if INTERACTIVE:
+        print("\n⚠️ IMPORTANTE: Se usará un PERFIL DEDICADO.")
+        print("   1. Se abrirá una ventana de Chrome nueva.")
+        print("   2. Si es la primera vez, INICIA SESIÓN en Google manualmente.")
+        print("   3. Si no encuentra el agente, selecciónalo tú mismo.")
+        input("\nPresiona Enter para iniciar...")
     
-    print("\n⚠️ IMPORTANTE: Se usará un PERFIL DEDICADO.")
-    print("   1. Se abrirá una ventana de Chrome nueva.")
-    print("   2. Si es la primera vez, INICIA SESIÓN en Google manualmente.")
-    print("   3. Si no encuentra el agente, selecciónalo tú mismo.")
-    input("\nPresiona Enter para iniciar...")
+    # Con el pool, esta instancia trabaja sobre su propia copia del perfil
+    profile_lease = None
+    if USE_PROFILE_POOL:
+        try:
+            profile_lease = ProfilePool(PROFILE_PATH).lease(f"traductor-{os.getpid()}", timeout=0)
+            print(f"🧬 Perfil del pool: {profile_lease.name}")
+        except (OSError, TimeoutError) as e:
+            print(f"❌ No hay copia del perfil disponible: {e}")
+            jobs.close()
+            return EXIT_SETUP_ERROR
     
     # Configurar el driver
     print("\n🚀 Iniciando Chrome...")
     try:
-        driver = setup_chrome_driver()
+        driver = setup_chrome_driver(profile_lease.path if profile_lease else None)
     except Exception as e:
         print(f"❌ Error iniciando Chrome: {e}")
         print("\n💡 Posibles soluciones:")
         print("   1. Asegúrate de que Chrome esté cerrado completamente")
         print("   2. Instala ChromeDriver: pip install webdriver-manager")
         print("   3. Verifica que Chrome esté instalado")
-        return
+        if profile_lease:
+            profile_lease.release()
+        jobs.close()
+        return EXIT_SETUP_ERROR
     
+    exit_code = EXIT_FAILURES
     try:
         # Navegar a la Herramienta de Imagen
         if not navigate_to_image_tool(driver):
             print("❌ No se pudo configurar la herramienta")
-            return
+            return EXIT_SETUP_ERROR
         
-        # Procesar cada imagen
-        results = []
-        for i, image_path in enumerate(images, 1):
-            print(f"\n{'=' * 40}")
-            print(f"📷 Imagen {i}/{len(images)}")
-            print(f"{'=' * 40}")
-            
-            result = upload_image_and_translate(driver, image_path)
-            results.append({
-                'original': image_path,
-                'result': result
-            })
-            
-            # Limpiar para la siguiente imagen
-            if i < len(images):
-                print("\n🔄 Preparando para la siguiente imagen...")
-                clear_conversation(driver)
-                time.sleep(2)
+        # Procesar los trabajos listos repartidos entre las pestañas
+        started = time.monotonic()
+        attempts = []
+        if WATCH:
+            # Sin terminar: cada imagen que llega entra a la cola y se traduce con este mismo Chrome
+            ignore = [path for path in (DESKTOP_PATH, UPLOADS_CACHE_PATH, TEMP_IMAGES_PATH)
+                      if path.startswith(IMAGES_PATH + os.sep)]
+            arrivals = watch_images(IMAGES_PATH, SCAN_MANIFEST_PATH, ignore=ignore, use_inotify=not WATCH_POLL)
+            sources = stream_jobs(arrivals, jobs, cache, run_started)
+        else:
+            sources = jobs.iter_ready()
+        preprocessor = create_preprocessor()
+        try:
+            translate_jobs(driver, sources, jobs, cache, preprocessor=preprocessor,
+                           on_result=lambda original, result, error: attempts.append(original))
+        except KeyboardInterrupt:
+            print("\n🛑 Detenido por el usuario")
+        except TranslationError as e:
+            print(f"\n❌ {e}")
+        finally:
+            if preprocessor:
+                preprocessor.close()
+        elapsed_hours = (time.monotonic() - started) / 3600
         
-        # Resumen final
+        # Resumen final, desde la cola (incluye lo hecho en corridas anteriores)
         print("\n" + "=" * 60)
         print("📊 RESUMEN")
         print("=" * 60)
         
-        successful = sum(1 for r in results if r['result'])
-        print(f"✅ Procesadas exitosamente: {successful}/{len(images)}")
+        counts = jobs.counts(since=run_started)
+        exit_code = EXIT_OK if counts['saved'] == sum(counts.values()) else EXIT_FAILURES
+        print(f"✅ Procesadas exitosamente: {counts['saved']}/{found}")
+        if counts['failed']:
+            print(f"❌ Fallidas: {counts['failed']}")
+        print(f"🗃️ Caché: {cache.hits} acierto(s), {cache.misses} fallo(s)")
+        if preprocessor and preprocessor.processed:
+            print(f"🗜️ Preprocesadas: {preprocessor.processed} "
+                  f"({preprocessor.saved_bytes / 1024 / 1024:.1f} MB menos para subir)")
+        if elapsed_hours > 0:
+            print(f"⚡ Ritmo: {len(attempts) / elapsed_hours:.0f} intentos/hora con {PARALLEL_TABS} pestaña(s)")
+        
+        for job in jobs.jobs(since=run_started):
+            status = {'saved': "✅", 'failed': "❌"}.get(job['state'], "⏳")
+            print(f"   {status} {os.path.basename(job['source'])}")
+            if job['result']:
+                print(f"      → {os.path.basename(job['result'])}")
+            elif job['error']:
+                print(f"      {job['error']} ({job['attempts']} intento(s))")
         
-        for r in results:
-            status = "✅" if r['result'] else "❌"
-            print(f"   {status} {os.path.basename(r['original'])}")
-            if r['result']:
-                print(f"      → {os.path.basename(r['result'])}")
+        print("\n⏱️ Esperas:")
+        for line in format_wait_report():
+            print(f"   {line}")
+        write_run_report()
+        selector_lines = get_registry().format_stats_lines()
+        if selector_lines:
+            print("\n🧭 Selectores:")
+            for line in selector_lines:
+                print(f"   {line}")
         
         print("\n🎉 ¡Proceso completado!")
-        input("\nPresiona Enter para cerrar el navegador...")
+        if INTERACTIVE:
+            input("\nPresiona Enter para cerrar el navegador...")
         
     except Exception as e:
         print(f"\n❌ Error durante la ejecución: {e}")
@@ -605,9 +1377,12 @@ def main():
     
     finally:
         driver.quit()
+        if profile_lease:
+            profile_lease.release()
+        jobs.close()
         print("👋 Navegador cerrado.")
+    
+    return exit_code
 
 if __name__ == "__main__":
-    main()
-
-
+    sys.exit(main())
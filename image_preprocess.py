@@ -0,0 +1,154 @@
+"""
+🗜️ IMAGE PREPROCESS
+====================
+Prepara las imágenes antes de subirlas a Gemini: reduce el lado mayor a
+un máximo, aplica la rotación EXIF, descarta los metadatos y las
+re-codifica en un formato compacto. Las que ya caben en el máximo, o cuya
+variante no pesa menos que el original, se suben tal cual.
+
+La variante procesada se guarda en una carpeta caché con el hash del
+contenido (más los ajustes) como nombre, así que una misma imagen solo se
+procesa una vez. El trabajo corre en un pool de procesos por delante del
+navegador: mientras una pestaña espera a Gemini, las siguientes imágenes ya
+se están redimensionando.
+
+Requiere Pillow; sin él las imágenes se suben tal cual.
+"""
+
+import os
+import time
+import queue
+import hashlib
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = ImageOps = None
+
+MAX_EDGE = 2048  # Píxeles del lado mayor
+OUTPUT_FORMAT = 'webp'
+QUALITY = 90  # Alta: el texto de las capturas tiene que seguir siendo legible
+
+FORMATS = {'webp': ('WEBP', '.webp'), 'jpeg': ('JPEG', '.jpg'), 'png': ('PNG', '.png')}
+
+
+def available():
+    return Image is not None
+
+
+def variant_key(image_path, max_edge, fmt, quality):
+    digest = hashlib.sha256(f"{max_edge}:{fmt}:{quality}:".encode('ascii'))
+    with open(image_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def preprocess_image(image_path, cache_dir, max_edge=MAX_EDGE, fmt=OUTPUT_FORMAT, quality=QUALITY):
+    """Devuelve la ruta de la variante procesada, creándola si no está en la caché.
+
+    Devuelve `image_path` si no hay que reducirla o si la variante no es más
+    pequeña. Se ejecuta en los procesos del pool, así que solo recibe y
+    devuelve rutas.
+    """
+    with Image.open(image_path) as img:
+        if not max_edge or max(img.size) <= max_edge:
+            return image_path  # Solo se leyó la cabecera: re-codificarla no ahorraría nada
+
+    pil_format, extension = FORMATS[fmt]
+    key = variant_key(image_path, max_edge, fmt, quality)
+    target = os.path.join(cache_dir, key + extension)
+    if os.path.exists(target):
+        return target
+
+    with Image.open(image_path) as img:
+        img = ImageOps.exif_transpose(img)  # La orientación vive en el EXIF que se va a descartar
+        if max_edge:
+            img.thumbnail((max_edge, max_edge), Image.LANCZOS)
+        if pil_format == 'JPEG':
+            img = img.convert('RGB')
+        elif img.mode not in ('RGB', 'RGBA', 'L'):
+            has_alpha = 'A' in img.getbands() or 'transparency' in img.info
+            img = img.convert('RGBA' if has_alpha else 'RGB')
+
+        # Sin exif= ni icc_profile= Pillow no copia metadatos al guardar
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{target}.{os.getpid()}.tmp"
+        options = {'optimize': True} if pil_format == 'PNG' else {'quality': quality}
+        img.save(tmp_path, pil_format, **options)
+    if os.path.getsize(tmp_path) >= os.path.getsize(image_path):
+        os.remove(tmp_path)
+        return image_path
+    os.replace(tmp_path, target)
+    return target
+
+
+class Preprocessor:
+    """Pool de procesos que prepara las imágenes por delante de las subidas."""
+
+    def __init__(self, cache_dir, max_edge=MAX_EDGE, fmt=OUTPUT_FORMAT, quality=QUALITY, workers=None):
+        self.cache_dir = cache_dir
+        self.max_edge = max_edge
+        self.fmt = fmt
+        self.quality = quality
+        self.workers = workers or max(1, min(4, (os.cpu_count() or 2) - 1))
+        self.processed = 0
+        self.saved_bytes = 0
+        self._pool = ProcessPoolExecutor(max_workers=self.workers) if available() else None
+
+    def submit(self, image_path):
+        return self._pool.submit(preprocess_image, image_path, self.cache_dir,
+                                 self.max_edge, self.fmt, self.quality)
+
+    def _result(self, image_path, future):
+        try:
+            prepared = future.result()
+        except Exception as e:
+            print(f"   ⚠️ No se pudo preprocesar {os.path.basename(image_path)}: {e}")
+            return image_path
+        if prepared == image_path:
+            return image_path
+        self.processed += 1
+        self.saved_bytes += os.path.getsize(image_path) - os.path.getsize(prepared)
+        return prepared
+
+    def iter_prepared(self, images, ahead=None):
+        """Genera tríos (original, ruta a subir, segundos esperando al pool) en el orden de `images`.
+
+        Un hilo va sacando imágenes y mandándolas al pool con hasta `ahead`
+        por delante del consumidor; así `images` puede bloquearse (p. ej.
+        esperando un reintento) sin frenar las que ya están listas. La espera
+        es lo que el preprocesado no llegó a solapar con el navegador.
+        """
+        if self._pool is None:
+            for image_path in images:
+                yield image_path, image_path, 0.0
+            return
+
+        slots = threading.Semaphore(ahead or self.workers * 2)
+        submitted = queue.Queue()
+
+        def feed():
+            try:
+                for image_path in images:
+                    slots.acquire()
+                    submitted.put((image_path, self.submit(image_path)))
+            finally:
+                submitted.put(None)
+
+        threading.Thread(target=feed, daemon=True).start()
+        while True:
+            item = submitted.get()
+            if item is None:
+                return
+            slots.release()
+            image_path, future = item
+            started = time.perf_counter()
+            prepared = self._result(image_path, future)
+            yield image_path, prepared, time.perf_counter() - started
+
+    def close(self):
+        if self._pool:
+            self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,107 @@
+"""
+🗂️ IMAGE SCANNER
+=================
+Descubre imágenes bajo una carpeta en una sola pasada con os.scandir,
+comparando extensiones sin distinguir mayúsculas.
+
+Guarda un manifiesto con la mtime de cada carpeta y el (tamaño, mtime) de
+cada imagen: en corridas siguientes, las carpetas cuya mtime no cambió no se
+vuelven a listar (crear, borrar o renombrar un archivo sí cambia la mtime de
+su carpeta; editar una imagen en el sitio no, y en ese caso no se detecta).
+"""
+
+import os
+import json
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.bmp', '.webp')
+MANIFEST_VERSION = 1
+
+
+def load_manifest(manifest_path, root):
+    """Carpetas del manifiesto anterior, o {} si no existe o es de otra raíz."""
+    if not manifest_path or not os.path.exists(manifest_path):
+        return {}
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if manifest.get("version") != MANIFEST_VERSION or manifest.get("root") != root:
+        return {}
+    return manifest.get("dirs", {})
+
+
+def save_manifest(manifest_path, root, dirs):
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({"version": MANIFEST_VERSION, "root": root, "dirs": dirs}, f, ensure_ascii=False)
+    os.replace(tmp_path, manifest_path)
+
+
+def _list_dir(path):
+    """Lista una carpeta: (subcarpetas, {imagen: [tamaño, mtime_ns]})."""
+    subdirs = []
+    files = {}
+    with os.scandir(path) as entries:
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.name)
+                elif entry.name.lower().endswith(IMAGE_EXTENSIONS) and entry.is_file():
+                    stat = entry.stat()
+                    files[entry.name] = [stat.st_size, stat.st_mtime_ns]
+            except OSError:
+                continue  # Entrada borrada o sin permisos mientras se recorría
+    subdirs.sort()
+    return subdirs, files
+
+
+def iter_images(root, manifest_path=None, new_only=False, stats=None):
+    """Genera las rutas de las imágenes bajo `root` (recursivo), a medida que las encuentra.
+
+    Con `manifest_path`, las carpetas sin cambios se resuelven desde el
+    manifiesto y este se actualiza al terminar el recorrido completo. Con
+    `new_only`, solo se generan imágenes nuevas o cambiadas desde la última
+    corrida. `stats` (dict opcional) recibe cuántas carpetas se listaron y
+    cuántas salieron del manifiesto.
+    """
+    root = os.path.abspath(root)
+    previous = load_manifest(manifest_path, root)
+    current = {}
+    if stats is not None:
+        stats.update(listed=0, cached=0)
+
+    stack = [root]
+    while stack:
+        folder = stack.pop()
+        try:
+            mtime_ns = os.stat(folder).st_mtime_ns
+        except OSError:
+            continue
+
+        known = previous.get(folder)
+        if known and known["mtime_ns"] == mtime_ns:
+            subdirs, files = known["subdirs"], known["files"]
+            unchanged = True
+        else:
+            try:
+                subdirs, files = _list_dir(folder)
+            except OSError:
+                continue
+            unchanged = False
+        if stats is not None:
+            stats["cached" if unchanged else "listed"] += 1
+        current[folder] = {"mtime_ns": mtime_ns, "subdirs": subdirs, "files": files}
+
+        old_files = known["files"] if known else {}
+        for name in sorted(files):
+            if new_only and (unchanged or old_files.get(name) == files[name]):
+                continue
+            yield os.path.join(folder, name)
+
+        # Invertido para que la pila recorra las subcarpetas en orden alfabético
+        stack.extend(os.path.join(folder, name) for name in reversed(subdirs))
+
+    # Solo un recorrido completo deja un manifiesto válido
+    if manifest_path:
+        save_manifest(manifest_path, root, current)
@@ -1,20 +1,26 @@
 """
 📸 INSTAGRAM POST SCRAPER
 ==========================
-Recorre los posts de un perfil de Instagram, identifica el tipo
-(Reel, Carrusel, Imagen única) y guarda capturas de pantalla.
+Recorre los posts de un perfil de Instagram (o una lista de permalinks
+/p/<id>/), identifica el tipo (Reel, Carrusel, Imagen única) y guarda
+capturas de pantalla.
 """
 
 import os
 import sys
 import re
+import glob
 import time
 import json
 import hashlib
 import threading
+import requests
 import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox
 from datetime import datetime
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 
 from selenium import webdriver
 from selenium.webdriver.common.by import By
@@ -26,32 +32,570 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import NoSuchElementException, TimeoutException
 from webdriver_manager.chrome import ChromeDriverManager
 
+from wait_engine import (wait_until, format_wait_report, reset_wait_stats, any_of, all_of,
+                         url_changed, url_contains, document_ready, element_present, image_decoded,
+                         script_true, element_decoded, dom_settled)
+from selector_registry import get_registry
+from browser_service import attach as attach_browser
+
 # Configuración - Usar el mismo perfil que gemini_translator (ya tiene sesión)
-PROFILE_PATH = os.path.join(os.environ['USERPROFILE'], '.gemini_translator_profile')
-OUTPUT_DIR = os.path.join(os.environ['USERPROFILE'], 'Desktop', 'instagram_posts')
+HOME_PATH = os.environ.get('USERPROFILE') or os.path.expanduser('~')
+PROFILE_PATH = os.path.join(HOME_PATH, '.gemini_translator_profile')
+OUTPUT_DIR = os.path.join(HOME_PATH, 'Desktop', 'instagram_posts')
 CARRUSELES_DIR = os.path.join(OUTPUT_DIR, 'carruseles')
 IMAGENES_DIR = os.path.join(OUTPUT_DIR, 'imagenes')
+POSTS_LOG_PATH = os.path.join(OUTPUT_DIR, 'posts_data.jsonl')  # Registro append-only (un post por línea)
+POSTS_JSON_PATH = os.path.join(OUTPUT_DIR, 'posts_data.json')  # Agregado compactado
+FSYNC_EVERY = 20  # Posts entre cada fsync del registro
+SEEN_INDEX_PATH = os.path.join(OUTPUT_DIR, 'seen_posts.txt')  # IDs ya capturados (uno por línea)
+STOP_AFTER_KNOWN = 10  # Posts conocidos seguidos tras los que se detiene la reanudación (0 = no parar)
+PAGE_LOAD_TIMEOUT = 15  # Máximo para que cargue el perfil / aparezca el grid
+POST_LOAD_TIMEOUT = 8  # Máximo para que cambie de post y se decodifique su imagen
+SLIDE_TIMEOUT = 3  # Máximo para que se monte una slide tras pulsar "Siguiente"
+HARVEST_SCROLL_TIMEOUT = 3  # Máximo por paso de scroll al recolectar el grid
+HARVEST_MAX_IDLE_SCROLLS = 4  # Pasos sin links nuevos para dar el grid por terminado
+MAX_CAROUSEL_SLIDES = 20  # Límite de seguridad si no hay puntos indicadores
+POST_TABS = 3  # Pestañas que cargan permalinks a la vez (1 = de uno en uno)
+USE_DOM_SNAPSHOT = True  # False = detección clásica selector por selector (para comparar round trips)
+DOWNLOAD_WORKERS = 4  # Descargas simultáneas desde el CDN
+DOWNLOAD_TIMEOUT = 30  # Segundos por descarga
+IMAGE_EXTENSIONS_BY_TYPE = {
+    'image/jpeg': '.jpg',
+    'image/png': '.png',
+    'image/webp': '.webp',
+    'image/heic': '.heic',
+}
+
+
+# Devuelve los href de posts/reels visibles en el DOM, en orden de grid
+HARVEST_LINKS_JS = """
+    return Array.from(document.querySelectorAll(arguments[0]))
+        .map(a => a.href || (a.closest('a') && a.closest('a').href) || '')
+        .filter(h => h.includes('/p/') || h.includes('/reel/'));
+"""
+
+
+# Instantánea del post abierto en un único round trip a chromedriver
+POST_SNAPSHOT_JS = """
+    const article = document.querySelector('article');
+    if (!article) return null;
+    const visible = el => el.offsetParent !== null;
+    
+    // Botón "Siguiente" del carrusel (dentro del contenedor de la imagen, no el de posts)
+    const nextBtn = Array.from(article.querySelectorAll(
+        'button[aria-label*="Siguiente"], button[aria-label*="Next"]'
+    )).find(b => b.closest('div._aahi, div._aagw, ul, div[role="presentation"]') && visible(b) && !b.disabled);
+    
+    // Imagen actual: mismos selectores que _get_current_image_url
+    const selectors = [
+        'div._aagv img',
+        'div._aatk img',
+        'img[style*="object-fit"]',
+        'div[role="button"] img',
+        'ul li[style*="translateX"] img',
+    ];
+    let img = null;
+    for (const sel of selectors) {
+        img = Array.from(article.querySelectorAll(sel)).find(
+            i => i.src && i.src.includes('instagram') && !i.src.startsWith('data:'));
+        if (img) break;
+    }
+    if (!img) {
+        img = Array.from(article.querySelectorAll('img')).find(i => i.src && i.src.includes('scontent')) || null;
+    }
+    
+    // Mejor candidato del srcset (mayor ancho)
+    let bestSrc = img ? img.src : null;
+    if (img && img.srcset) {
+        let bestWidth = 0;
+        for (const part of img.srcset.split(',')) {
+            const [url, width] = part.trim().split(/\\s+/);
+            const w = parseInt(width) || 0;
+            if (url && w > bestWidth) { bestWidth = w; bestSrc = url; }
+        }
+    }
+    
+    const dots = article.querySelectorAll('div._acnb').length;
+    const isReel = location.pathname.includes('/reel/') || !!article.querySelector('video');
+    const isCarousel = !!nextBtn || dots > 1 || article.querySelectorAll('div._aalg').length > 1;
+    const caption = article.querySelector('h1');
+    const time = article.querySelector('time[datetime]');
+    
+    return {
+        url: location.href,
+        type: isReel ? 'reel' : (isCarousel ? 'carousel' : 'single'),
+        src: bestSrc,
+        srcset: img ? (img.srcset || null) : null,
+        slide_count: dots > 1 ? dots : 1,
+        caption: caption ? caption.innerText : null,
+        timestamp: time ? time.getAttribute('datetime') : null,
+        has_next: !!nextBtn,
+    };
+"""
+
+# Candidatos para los links del grid y el "Siguiente" del carrusel; el registro
+# de selectores prueba primero el que ganó la última vez
+GRID_POST_SELECTORS = [
+    "a[href*='/p/']",
+    "a[href*='/reel/']",
+    "div._aabd a",  # Selector común para thumbnails
+    "div._ac7v a",  # Grid container links
+    "main article a",
+    "a img"  # Buscar links que tengan una imagen dentro
+]
+CAROUSEL_NEXT_SELECTORS = [
+    # Selector específico para el botón de siguiente en carrusel (dentro de la lista de imágenes)
+    "article div._aahi button[aria-label*='Siguiente']",
+    "article div._aahi button[aria-label*='Next']",
+    # Botón dentro del contenedor de imágenes del carrusel
+    "article ul button[aria-label*='Siguiente']",
+    "article ul button[aria-label*='Next']",
+    # Selector más genérico pero dentro del article
+    "article div[role='presentation'] button[aria-label*='Siguiente']",
+    "article div[role='presentation'] button[aria-label*='Next']",
+    # Botón que está al lado derecho de la imagen (posición relativa)
+    "article div._aagw button[aria-label*='Siguiente']",
+    "article div._aagw button[aria-label*='Next']",
+]
+
+# Elementos de un selector que enlazan a un post, filtrados en la página (un round trip)
+POST_LINKS_JS = """
+    return Array.from(document.querySelectorAll(arguments[0])).filter(a =>
+        a.href && (a.href.includes('/p/') || a.href.includes('/reel/')));
+"""
+
+# Pulsa el primer botón visible y habilitado de un selector; false si no hay
+CLICK_VISIBLE_JS = """
+    const btn = Array.from(document.querySelectorAll(arguments[0]))
+        .find(b => b.offsetParent !== null && !b.disabled);
+    if (!btn) return false;
+    btn.click();
+    return true;
+"""
+
+# Busca y pulsa el "Siguiente" del carrusel en un solo round trip
+CAROUSEL_NEXT_JS = """
+    const article = document.querySelector('article');
+    if (!article) return false;
+    const btn = Array.from(article.querySelectorAll(
+        'button[aria-label*="Siguiente"], button[aria-label*="Next"]'
+    )).find(b => b.closest('div._aahi, div._aagw, ul, div[role="presentation"]')
+                 && b.offsetParent !== null && !b.disabled);
+    if (!btn) return false;
+    btn.click();
+    return true;
+"""
+
+# Igual, con el "Anterior" del carrusel (para volver a la primera slide)
+CAROUSEL_PREV_JS = """
+    const article = document.querySelector('article');
+    if (!article) return false;
+    const btn = Array.from(article.querySelectorAll(
+        'button[aria-label*="Atrás"], button[aria-label*="Anterior"], button[aria-label*="Go back"], button[aria-label*="Previous"]'
+    )).find(b => b.closest('div._aahi, div._aagw, ul, div[role="presentation"]')
+                 && b.offsetParent !== null && !b.disabled);
+    if (!btn) return false;
+    btn.click();
+    return true;
+"""
+
+
+# Todas las slides del carrusel abierto que ya están en el DOM, con su índice real.
+# Primero intenta los datos del post embebidos en la página (carousel_media);
+# si no están, lee los <li> del carrusel y calcula el índice por su translateX
+# o por el punto activo.
+CAROUSEL_SLIDES_JS = """
+    const article = document.querySelector('article');
+    if (!article) return null;
+    const dots = article.querySelectorAll('div._acnb').length;
+    const hasNext = !!Array.from(article.querySelectorAll(
+        'button[aria-label*="Siguiente"], button[aria-label*="Next"]'
+    )).find(b => b.closest('div._aahi, div._aagw, ul, div[role="presentation"]')
+                 && b.offsetParent !== null && !b.disabled);
+    
+    // 1) Datos embebidos: el post completo con todas sus slides
+    const match = location.pathname.match(/\\/(?:p|reel)\\/([A-Za-z0-9_-]+)/);
+    const code = match ? match[1] : null;
+    const findMedia = (node, depth) => {
+        if (!node || typeof node !== 'object' || depth > 40) return null;
+        if (node.code === code && Array.isArray(node.carousel_media)) return node.carousel_media;
+        for (const key in node) {
+            const found = findMedia(node[key], depth + 1);
+            if (found) return found;
+        }
+        return null;
+    };
+    if (code) {
+        for (const script of document.querySelectorAll('script[type="application/json"]')) {
+            const text = script.textContent;
+            if (!text.includes(code) || !text.includes('carousel_media')) continue;
+            let media = null;
+            try { media = findMedia(JSON.parse(text), 0); } catch (e) { continue; }
+            if (media && media.length) {
+                return {
+                    slide_count: media.length,
+                    has_next: hasNext,
+                    slides: media.map((m, i) => {
+                        const candidates = (m.image_versions2 || {}).candidates || [];
+                        return {
+                            index: i,
+                            src: candidates.length ? candidates[0].url : null,
+                            video: !!m.video_versions,
+                        };
+                    }),
+                };
+            }
+        }
+    }
+    
+    // 2) Slides renderizadas en el DOM (el carrusel solo monta las cercanas).
+    // offset: posición respecto de la slide visible. Sin translateX el índice
+    // sale del punto activo; si tampoco hay, queda null y lo calcula Python
+    // con los clics dados.
+    const slides = [];
+    const items = Array.from(article.querySelectorAll('ul li')).filter(li => li.querySelector('img, video'));
+    const list = items.length ? items[0].closest('ul') : null;
+    const box = list ? (list.parentElement || list).getBoundingClientRect() : null;
+    const center = box ? box.left + box.width / 2 : 0;
+    let visible = -1, bestDistance = Infinity;
+    items.forEach((li, position) => {
+        const rect = li.getBoundingClientRect();
+        const distance = Math.abs(rect.left + rect.width / 2 - center);
+        if (rect.width && distance < bestDistance) { bestDistance = distance; visible = position; }
+    });
+    const dotList = Array.from(article.querySelectorAll('div._acnb'));
+    const activeDot = dotList.findIndex(d => d.classList.contains('_acnf'));
+    items.forEach((li, position) => {
+        const img = li.querySelector('img');
+        const tx = (li.style.transform || '').match(/translateX\\((-?[\\d.]+)px\\)/);
+        const offset = visible >= 0 ? position - visible : null;
+        let index = null;
+        if (tx && li.offsetWidth) {
+            index = Math.round(parseFloat(tx[1]) / li.offsetWidth);
+        } else if (activeDot >= 0 && offset !== null) {
+            index = activeDot + offset;
+        }
+        let src = img ? img.src : null;
+        if (img && img.srcset) {
+            let bestWidth = 0;
+            for (const part of img.srcset.split(',')) {
+                const [url, width] = part.trim().split(/\\s+/);
+                const w = parseInt(width) || 0;
+                if (url && w > bestWidth) { bestWidth = w; src = url; }
+            }
+        }
+        slides.push({ index: index, offset: offset, src: src, video: !!li.querySelector('video') });
+    });
+    return { slide_count: dots > 1 ? dots : 0, has_next: hasNext, slides: slides };
+"""
+
+# La imagen de la slide visible (la más cercana al centro del carrusel) ya está
+# decodificada. Las slides montadas fuera de pantalla pueden no decodificarse
+# nunca, así que no se espera por ellas. Sin <li> se mira la primera imagen.
+VISIBLE_SLIDE_DECODED_JS = """
+    const article = document.querySelector('article');
+    if (!article) return false;
+    const decoded = img => !!(img && img.complete && img.naturalWidth > 0);
+    const items = Array.from(article.querySelectorAll('ul li')).filter(li => li.querySelector('img, video'));
+    if (!items.length) return decoded(article.querySelector('img'));
+    const list = items[0].closest('ul');
+    const box = (list.parentElement || list).getBoundingClientRect();
+    const center = box.left + box.width / 2;
+    let visible = null, bestDistance = Infinity;
+    for (const li of items) {
+        const rect = li.getBoundingClientRect();
+        const distance = Math.abs(rect.left + rect.width / 2 - center);
+        if (rect.width && distance < bestDistance) { bestDistance = distance; visible = li; }
+    }
+    if (!visible) return false;
+    const img = visible.querySelector('img');
+    return !img || decoded(img);  // Una slide de video no tiene imagen que esperar
+"""
+
+
+_chromedriver_lock = threading.Lock()
+_chromedriver = None
+
+
+def chromedriver_path():
+    """Ruta de chromedriver, resuelta una vez por proceso (webdriver-manager no es seguro entre hilos)."""
+    global _chromedriver
+    with _chromedriver_lock:
+        if _chromedriver is None:
+            _chromedriver = ChromeDriverManager().install()
+        return _chromedriver
+
+
+class CountingChrome(webdriver.Chrome):
+    """Chrome que cuenta los comandos enviados a chromedriver.
+    
+    Cada comando (find_elements, get_attribute, is_displayed...) es un round
+    trip HTTP, así que el contador mide cuánto cuesta cada post.
+    """
+    
+    commands = 0
+    
+    def execute(self, driver_command, params=None):
+        self.commands += 1
+        return super().execute(driver_command, params)
+
+
+class PostLogWriter:
+    """Registro append-only de posts: una línea JSON por post, con fsync por lotes."""
+    
+    def __init__(self, path, fsync_every=FSYNC_EVERY):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.count = 0
+        self._file = None
+        self._unsynced = 0
+        self._lock = threading.RLock()  # Un mismo registro puede recibir posts de varios scrapers
+    
+    def append(self, record):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, 'a', encoding='utf-8')
+            self._file.write(line)
+            # flush() deja la línea en el SO; el fsync (caro) solo cada N posts
+            self._file.flush()
+            self.count += 1
+            self._unsynced += 1
+            if self._unsynced >= self.fsync_every:
+                self.sync()
+    
+    def sync(self):
+        with self._lock:
+            if self._file is not None and self._unsynced:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._unsynced = 0
+    
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self.sync()
+                self._file.close()
+                self._file = None
+
+
+def migrate_legacy_posts_json(log_path=POSTS_LOG_PATH, json_path=POSTS_JSON_PATH):
+    """Si solo existe el posts_data.json antiguo, lo vuelca al registro JSONL."""
+    if os.path.exists(log_path) or not os.path.exists(json_path):
+        return 0
+    with open(json_path, 'r', encoding='utf-8') as f:
+        posts = json.load(f).get("posts", [])
+    with open(log_path, 'w', encoding='utf-8') as f:
+        for post in posts:
+            f.write(json.dumps(post, ensure_ascii=False) + "\n")
+    return len(posts)
+
+
+def _iter_log_records(log_path):
+    """Recorre el registro JSONL ignorando líneas vacías o truncadas."""
+    with open(log_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue  # Línea a medio escribir por un corte
+    
+
+def compact_posts_log(log_path=POSTS_LOG_PATH, json_path=POSTS_JSON_PATH):
+    """Genera posts_data.json desde el registro JSONL en streaming.
+    
+    Si un post aparece varias veces (varias corridas) se conserva el último
+    registro. Solo se mantienen en memoria los IDs, no los posts.
+    """
+    if not os.path.exists(log_path):
+        return 0
+    
+    # Primera pasada: posición del último registro de cada post
+    last_seen = {}
+    for i, record in enumerate(_iter_log_records(log_path)):
+        last_seen[record.get("id")] = i
+    
+    # Segunda pasada: escribir el agregado a un temporal y reemplazar
+    tmp_path = json_path + ".tmp"
+    total = 0
+    with open(tmp_path, 'w', encoding='utf-8') as out:
+        out.write('{\n  "scraped_at": %s,\n  "posts": [' % json.dumps(datetime.now().isoformat()))
+        for i, record in enumerate(_iter_log_records(log_path)):
+            if last_seen.get(record.get("id")) != i:
+                continue
+            out.write(",\n    " if total else "\n    ")
+            out.write(json.dumps(record, ensure_ascii=False))
+            total += 1
+        out.write('\n  ],\n  "total_posts": %d\n}\n' % total)
+    os.replace(tmp_path, json_path)
+    return total
+
+
+class MediaDownloader:
+    """Descarga los originales del CDN con las cookies de la sesión de Chrome.
+    
+    Usa una sesión HTTP con pool de conexiones keep-alive y un pool de hilos
+    acotado, para que las descargas avancen mientras el navegador navega.
+    """
+    
+    def __init__(self, driver, workers=DOWNLOAD_WORKERS):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers, max_retries=2)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            'User-Agent': driver.execute_script("return navigator.userAgent;"),
+            'Referer': 'https://www.instagram.com/',
+        })
+        for cookie in driver.get_cookies():
+            self.session.cookies.set(cookie['name'], cookie['value'],
+                                     domain=cookie.get('domain'), path=cookie.get('path', '/'))
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='descarga')
+        # Limita las descargas en cola para no acumular memoria si el CDN va lento
+        self._slots = threading.BoundedSemaphore(workers * 4)
+    
+    def submit(self, url, base_path):
+        """Encola la descarga; el futuro devuelve (ruta, bytes)."""
+        self._slots.acquire()
+        future = self.executor.submit(self._download, url, base_path)
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+    
+    def _download(self, url, base_path):
+        response = self.session.get(url, timeout=DOWNLOAD_TIMEOUT)
+        response.raise_for_status()
+        content_type = response.headers.get('Content-Type', '').split(';')[0].strip()
+        ext = IMAGE_EXTENSIONS_BY_TYPE.get(content_type)
+        if not ext:
+            ext = os.path.splitext(url.split('?')[0])[1] or '.jpg'
+        filepath = base_path + ext
+        tmp_path = filepath + '.part'
+        with open(tmp_path, 'wb') as f:
+            f.write(response.content)
+        os.replace(tmp_path, filepath)
+        return filepath, len(response.content)
+    
+    def close(self):
+        self.executor.shutdown(wait=True)
+        self.session.close()
+
+
+class SeenPostsIndex:
+    """Índice persistente de IDs de posts ya capturados en corridas anteriores."""
+    
+    def __init__(self, path=SEEN_INDEX_PATH):
+        self.path = path
+        self.ids = set()
+        self._file = None
+        self._lock = threading.RLock()  # Varios scrapers del mismo proceso pueden compartir el índice
+    
+    def load(self):
+        """Carga el índice; si no existe lo reconstruye desde el registro y las carpetas."""
+        with self._lock:
+            return self._load()
+    
+    def _load(self):
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.ids = {line.strip() for line in f if line.strip()}
+        else:
+            self.ids = self._rebuild()
+            with open(self.path, 'w', encoding='utf-8') as f:
+                f.writelines(post_id + "\n" for post_id in sorted(self.ids))
+        return len(self.ids)
+    
+    def _rebuild(self):
+        ids = set()
+        if os.path.exists(POSTS_LOG_PATH):
+            for record in _iter_log_records(POSTS_LOG_PATH):
+                if record.get("id"):
+                    ids.add(record["id"])
+        # Carpetas carruseles/<post_id> e imagenes/<post_id> con contenido
+        for base in (CARRUSELES_DIR, IMAGENES_DIR):
+            if not os.path.isdir(base):
+                continue
+            for entry in os.scandir(base):
+                if entry.is_dir() and any(os.scandir(entry.path)):
+                    ids.add(entry.name)
+        return ids
+    
+    def __contains__(self, post_id):
+        return post_id in self.ids
+    
+    def __len__(self):
+        return len(self.ids)
+    
+    def add(self, post_id):
+        with self._lock:
+            if post_id in self.ids:
+                return
+            self.ids.add(post_id)
+            if self._file is None:
+                self._file = open(self.path, 'a', encoding='utf-8')
+            self._file.write(post_id + "\n")
+            self._file.flush()
+    
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
 
 
 class InstagramScraperGUI:
     def __init__(self, root):
         self.root = root
         self.root.title("📸 Instagram Post Scraper")
-        self.root.geometry("750x600")
+        self.root.geometry("750x660")
         self.root.configure(bg='#1a1a2e')
         
+        self._init_state()
+        self.setup_ui()
+        self.create_directories()
+    
+    def _init_state(self):
+        """Estado del recorrido, común a la interfaz y a HeadlessScraper."""
         self.driver = None
         self.running = False
+        self.error = None  # Motivo por el que falló la última captura (None si terminó bien)
+        self.compacting = threading.Event()  # Compactación del registro en curso (no se puede iniciar)
         self.stop_requested = False
-        self.posts_data = []  # Lista para guardar links y metadata
-        
-        self.setup_ui()
-        self.create_directories()
+        self.post_log = None  # Registro JSONL de posts (se abre al iniciar)
+        self.seen_index = SeenPostsIndex()
+        self.resume_enabled = True
+        self.stop_after_known = STOP_AFTER_KNOWN
+        self.download_enabled = True
+        self.harvest_enabled = False
+        self.post_tabs = POST_TABS
+        self.downloader = None
+        self.image_sink = None  # Función ruta -> None llamada con cada imagen que llega a disco
+        self.profile_path = PROFILE_PATH  # user-data-dir de Chrome (p. ej. una copia de profile_pool)
+        self.shared_run = False  # Con otros scrapers en el proceso: el orquestador pone post_log y seen_index compartidos, resetea esperas y compacta el JSON
+        self._post_downloads = []  # (entrada, futuro) del post en curso
+        self._pending_post = None  # Post cuyo registro espera a sus descargas
+        self._retry_posts = {}  # url -> (post_data, entradas fallidas), para capturarlas por screenshot
+    
+    def _reset_counters(self):
+        self.count_posts = 0
+        self.count_carruseles = 0
+        self.count_imagenes = 0
+        self.count_reels = 0
+        self.count_known = 0
+        self.total_round_trips = 0
     
     def create_directories(self):
         """Crea las carpetas de salida."""
         os.makedirs(CARRUSELES_DIR, exist_ok=True)
         os.makedirs(IMAGENES_DIR, exist_ok=True)
+        try:
+            migrated = migrate_legacy_posts_json()
+            if migrated:
+                self.log(f"📦 {migrated} posts migrados a {os.path.basename(POSTS_LOG_PATH)}", 'info')
+        except Exception as e:
+            self.log(f"⚠️ No se pudo migrar posts_data.json: {e}", 'warning')
     
     def setup_ui(self):
         """Configura la interfaz gráfica."""
@@ -66,7 +610,7 @@ class InstagramScraperGUI:
         url_frame = tk.Frame(main_frame, bg='#1a1a2e')
         url_frame.pack(fill=tk.X, pady=(0, 15))
         
-        tk.Label(url_frame, text="URL del perfil:", font=('Segoe UI', 11),
+        tk.Label(url_frame, text="URL del perfil o permalinks:", font=('Segoe UI', 11),
                 bg='#1a1a2e', fg='white').pack(side=tk.LEFT)
         
         self.url_entry = tk.Entry(url_frame, font=('Segoe UI', 11), width=50,
@@ -74,6 +618,48 @@ class InstagramScraperGUI:
         self.url_entry.pack(side=tk.LEFT, padx=(10, 0), fill=tk.X, expand=True)
         self.url_entry.insert(0, "https://www.instagram.com/")
         
+        # Opciones de reanudación
+        options_frame = tk.Frame(main_frame, bg='#1a1a2e')
+        options_frame.pack(fill=tk.X, pady=(0, 10))
+        
+        self.resume_var = tk.BooleanVar(value=True)
+        tk.Checkbutton(options_frame, text="⏩ Reanudar (saltar posts ya capturados)",
+                       variable=self.resume_var, font=('Segoe UI', 10),
+                       bg='#1a1a2e', fg='white', selectcolor='#16213e',
+                       activebackground='#1a1a2e', activeforeground='white').pack(side=tk.LEFT)
+        
+        tk.Label(options_frame, text="Parar tras N conocidos (0 = no):", font=('Segoe UI', 10),
+                bg='#1a1a2e', fg='#888').pack(side=tk.LEFT, padx=(20, 5))
+        
+        self.stop_after_var = tk.StringVar(value=str(STOP_AFTER_KNOWN))
+        tk.Spinbox(options_frame, from_=0, to=999, width=5, textvariable=self.stop_after_var,
+                   font=('Segoe UI', 10), bg='#16213e', fg='white',
+                   buttonbackground='#16213e').pack(side=tk.LEFT)
+        
+        # Modo de captura
+        mode_frame = tk.Frame(main_frame, bg='#1a1a2e')
+        mode_frame.pack(fill=tk.X, pady=(0, 10))
+        
+        self.download_var = tk.BooleanVar(value=True)
+        tk.Checkbutton(mode_frame, text="⬇️ Descarga directa (original)",
+                       variable=self.download_var, font=('Segoe UI', 10),
+                       bg='#1a1a2e', fg='white', selectcolor='#16213e',
+                       activebackground='#1a1a2e', activeforeground='white').pack(side=tk.LEFT)
+        
+        self.harvest_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(mode_frame, text="🧭 Recolectar grid primero",
+                       variable=self.harvest_var, font=('Segoe UI', 10),
+                       bg='#1a1a2e', fg='white', selectcolor='#16213e',
+                       activebackground='#1a1a2e', activeforeground='white').pack(side=tk.LEFT, padx=(20, 0))
+        
+        tk.Label(mode_frame, text="Pestañas:", font=('Segoe UI', 10),
+                bg='#1a1a2e', fg='#888').pack(side=tk.LEFT, padx=(20, 5))
+        
+        self.tabs_var = tk.StringVar(value=str(POST_TABS))
+        tk.Spinbox(mode_frame, from_=1, to=8, width=3, textvariable=self.tabs_var,
+                   font=('Segoe UI', 10), bg='#16213e', fg='white',
+                   buttonbackground='#16213e').pack(side=tk.LEFT)
+        
         # Status
         status_frame = tk.Frame(main_frame, bg='#16213e', padx=15, pady=10)
         status_frame.pack(fill=tk.X, pady=(0, 10))
@@ -101,6 +687,10 @@ class InstagramScraperGUI:
         
         self.reels_var = tk.StringVar(value="Reels (saltados): 0")
         tk.Label(counter_frame, textvariable=self.reels_var, font=('Segoe UI', 10),
+                bg='#1a1a2e', fg='#888').pack(side=tk.LEFT, padx=(0, 20))
+        
+        self.known_var = tk.StringVar(value="Conocidos: 0")
+        tk.Label(counter_frame, textvariable=self.known_var, font=('Segoe UI', 10),
                 bg='#1a1a2e', fg='#888').pack(side=tk.LEFT)
         
         # Botones
@@ -125,6 +715,12 @@ class InstagramScraperGUI:
                                          command=self.open_output_folder, cursor='hand2')
         self.open_folder_btn.pack(side=tk.RIGHT)
         
+        self.compact_btn = tk.Button(btn_frame, text="🗜️ Compactar JSON", 
+                                     font=('Segoe UI', 11),
+                                     bg='#16213e', fg='white', padx=15, pady=8,
+                                     command=self.compact_json, cursor='hand2')
+        self.compact_btn.pack(side=tk.RIGHT, padx=(0, 10))
+        
         # Log
         tk.Label(main_frame, text="📋 LOG:", font=('Segoe UI', 10, 'bold'),
                 bg='#1a1a2e', fg='#888').pack(anchor='w')
@@ -149,6 +745,8 @@ class InstagramScraperGUI:
         self.count_carruseles = 0
         self.count_imagenes = 0
         self.count_reels = 0
+        self.count_known = 0
+        self.total_round_trips = 0
     
     def log(self, msg, tag='info'):
         self.log_text.insert(tk.END, msg + "\n", tag)
@@ -165,13 +763,39 @@ class InstagramScraperGUI:
         self.carruseles_var.set(f"Carruseles: {self.count_carruseles}")
         self.imagenes_var.set(f"Imágenes: {self.count_imagenes}")
         self.reels_var.set(f"Reels (saltados): {self.count_reels}")
+        self.known_var.set(f"Conocidos: {self.count_known}")
         self.root.update()
     
     def open_output_folder(self):
         os.startfile(OUTPUT_DIR)
     
+    def compact_json(self):
+        """Genera posts_data.json a demanda a partir del registro JSONL.
+        
+        Solo con el scraper parado (si no, el registro aún se está escribiendo)
+        y en un hilo aparte para no congelar la ventana con registros grandes.
+        """
+        if self.running or self.compacting.is_set():
+            return
+        # Mientras se reescribe el registro no se puede iniciar otra captura
+        self.compacting.set()
+        self.compact_btn.config(state=tk.DISABLED)
+        self.start_btn.config(state=tk.DISABLED)
+        threading.Thread(target=self._compact_json, daemon=True).start()
+    
+    def _compact_json(self):
+        try:
+            total = compact_posts_log()
+            self.log(f"🗜️ posts_data.json generado ({total} posts)", 'success')
+        except Exception as e:
+            self.log(f"   ⚠️ Error compactando JSON: {e}", 'warning')
+        finally:
+            self.compacting.clear()
+            self.compact_btn.config(state=tk.NORMAL)
+            self.start_btn.config(state=tk.NORMAL)
+    
     def start_scraping(self):
-        if self.running:
+        if self.running or self.compacting.is_set():
             return
         
         url = self.url_entry.get().strip()
@@ -181,14 +805,25 @@ class InstagramScraperGUI:
         
         self.running = True
         self.stop_requested = False
-        self.count_posts = 0
-        self.count_carruseles = 0
-        self.count_imagenes = 0
-        self.count_reels = 0
+        self._reset_counters()
         self.update_counters()
         
+        # Leer opciones en el hilo de la interfaz
+        self.resume_enabled = self.resume_var.get()
+        try:
+            self.stop_after_known = max(0, int(self.stop_after_var.get()))
+        except ValueError:
+            self.stop_after_known = STOP_AFTER_KNOWN
+        self.download_enabled = self.download_var.get()
+        self.harvest_enabled = self.harvest_var.get()
+        try:
+            self.post_tabs = max(1, int(self.tabs_var.get()))
+        except ValueError:
+            self.post_tabs = POST_TABS
+        
         self.start_btn.config(state=tk.DISABLED)
         self.stop_btn.config(state=tk.NORMAL)
+        self.compact_btn.config(state=tk.DISABLED)  # El registro se escribe mientras corre
         self.log_text.delete(1.0, tk.END)
         
         thread = threading.Thread(target=self._scrape, args=(url,))
@@ -201,31 +836,40 @@ class InstagramScraperGUI:
         self.set_status("🛑 Deteniendo...", '#ff4757')
     
     def _scrape(self, profile_url):
+        self.error = None
         try:
             self.log("=" * 50, 'header')
             self.log("📸 INSTAGRAM POST SCRAPER", 'header')
             self.log("=" * 50, 'header')
             self.log("")
             
+            if not self.shared_run:
+                self.post_log = PostLogWriter(POSTS_LOG_PATH)
+                reset_wait_stats()
+            self._post_downloads = []
+            self._pending_post = None
+            self._retry_posts = {}
+            # El índice se carga siempre para que los posts nuevos queden registrados
+            known = self.seen_index.load()
+            if self.resume_enabled:
+                self.log(f"⏩ Reanudación activa: {known} posts ya capturados", 'info')
+            
             # Iniciar Chrome
             self.set_status("🚀 Iniciando Chrome...", '#00d9ff')
             self.log("🚀 Iniciando Chrome...", 'info')
+            if self._ensure_driver():
+                self.log("   ✅ Chrome iniciado", 'success')
+            else:
+                self.log("   ♻️ Chrome de la corrida anterior reutilizado", 'success')
             
-            options = Options()
-            options.add_argument(f"--user-data-dir={PROFILE_PATH}")
-            options.add_argument("--disable-blink-features=AutomationControlled")
-            options.add_experimental_option("excludeSwitches", ["enable-automation"])
-            
-            service = ChromeService(ChromeDriverManager().install())
-            self.driver = webdriver.Chrome(service=service, options=options)
-            self.driver.maximize_window()
-            self.log("   ✅ Chrome iniciado", 'success')
-            
-            # Navegar al perfil
+            # Navegar al perfil (o al primer post si se pasó una lista de permalinks)
+            permalinks = self._permalink_list(profile_url)
+            start_url = permalinks[0] if permalinks else profile_url
             self.set_status("🌐 Navegando al perfil...", '#00d9ff')
-            self.log(f"\n🌐 Navegando a: {profile_url}", 'info')
-            self.driver.get(profile_url)
-            time.sleep(5)
+            self.log(f"\n🌐 Navegando a: {start_url}", 'info')
+            self.driver.get(start_url)
+            wait_until(self.driver, all_of(document_ready(), dom_settled(1.0)),
+                       timeout=PAGE_LOAD_TIMEOUT, label="perfil cargado")
             
             # Cerrar popups de cookies o login
             self.log("   🔄 Cerrando popups...", 'info')
@@ -236,7 +880,6 @@ class InstagramScraperGUI:
                 for btn in cookie_btns:
                     if btn.is_displayed():
                         self.driver.execute_script("arguments[0].click();", btn)
-                        time.sleep(0.5)
                 
                 # Cerrar popup de login si aparece
                 close_btns = self.driver.find_elements(By.CSS_SELECTOR, 
@@ -245,166 +888,36 @@ class InstagramScraperGUI:
                     try:
                         if btn.is_displayed():
                             self.driver.execute_script("arguments[0].click();", btn)
-                            time.sleep(0.5)
                     except:
                         pass
             except:
                 pass
+            wait_until(self.driver, dom_settled(0.3), timeout=2, label="cerrar popups")
+            
+            # Preparar descargas directas con las cookies de la sesión
+            self.downloader = None
+            if self.download_enabled:
+                try:
+                    self.downloader = MediaDownloader(self.driver)
+                    self.log("   ⬇️ Descarga directa activa", 'info')
+                except Exception as e:
+                    self.log(f"   ⚠️ Descarga directa no disponible, se usarán capturas: {e}", 'warning')
             
             # Verificar si necesita login
             if "login" in self.driver.current_url.lower() or "accounts" in self.driver.current_url.lower():
                 self.log("⚠️ Necesitas iniciar sesión en Instagram", 'warning')
                 self.log("👉 Inicia sesión manualmente en el navegador", 'warning')
                 self.log("👉 Luego vuelve al perfil y presiona Iniciar de nuevo", 'warning')
+                self.error = "sesión de Instagram no iniciada"
                 return
             
-            # Scroll para cargar contenido
-            self.log("   🔄 Scrolleando para cargar posts...", 'info')
-            self.driver.execute_script("window.scrollTo(0, 500);")
-            time.sleep(2)
-            self.driver.execute_script("window.scrollTo(0, 0);")
-            time.sleep(1)
-            
-            # Esperar a que el grid de posts aparezca
-            self.log("   ⏳ Esperando a que el contenido cargue...", 'info')
-            time.sleep(5)
-            
-            # Verificar si es cuenta privada
-            is_private = self.driver.find_elements(By.XPATH, "//*[contains(text(), 'Esta cuenta es privada') or contains(text(), 'This Account is Private')]")
-            if is_private:
-                self.log("❌ La cuenta es PRIVADA. No se pueden ver los posts.", 'error')
-                return
-
-            # Buscar el primer post
-            self.log("\n🔍 Buscando posts...", 'info')
-            
-            # Intentar múltiples selectores para encontrar posts
-            posts = []
-            
-            # Estrategia 1: Links con href /p/ o /reel/ (Instagram usa estos formatos)
-            selectors_to_try = [
-                "a[href*='/p/']",
-                "a[href*='/reel/']",
-                "div._aabd a",  # Selector común para thumbnails
-                "div._ac7v a",  # Grid container links
-                "main article a",
-                "a img" # Buscar links que tengan una imagen dentro
-            ]
-            
-            for selector in selectors_to_try:
-                try:
-                    all_elements = self.driver.find_elements(By.CSS_SELECTOR, selector)
-                    # Filtrar solo los que parecen ser de posts
-                    valid_posts = [e for e in all_elements if e.get_attribute('href') and ('/p/' in e.get_attribute('href') or '/reel/' in e.get_attribute('href'))]
-                    if valid_posts:
-                        posts = valid_posts
-                        self.log(f"   ✅ Encontrados {len(posts)} posts con selector: {selector}", 'success')
-                        break
-                except:
-                    continue
-            
-            # Estrategia 2: JavaScript para buscar todos los links de posts (como último recurso)
-            if not posts:
-                self.log("   🔍 Usando JavaScript profundo para buscar posts...", 'info')
-                posts = self.driver.execute_script("""
-                    return Array.from(document.querySelectorAll('a')).filter(a => 
-                        a.href && (a.href.includes('/p/') || a.href.includes('/reel/'))
-                    ).map(a => a); // El mapa es para asegurar que Selenium reciba los elementos
-                """)
-            
-            # Debug intensivo si falla
-            if not posts:
-                self.log("⚠️ No se detectaron posts. Iniciando diagnóstico...", 'warning')
-                
-                # 1. ¿Cuántos links hay?
-                total_links = self.driver.execute_script("return document.querySelectorAll('a').length;")
-                self.log(f"   📊 Resumen: {total_links} links totales en la página", 'info')
-                
-                # 2. ¿Hay algún article?
-                articles = self.driver.find_elements(By.TAG_NAME, "article")
-                self.log(f"   📊 Resumen: {len(articles)} elementos <article> encontrados", 'info')
-                
-                # 3. Guardar HTML para análisis (opcional, pesado)
-                # 4. Screenshot de la zona central
-                debug_path = os.path.join(OUTPUT_DIR, "error_grid.png")
-                self.driver.save_screenshot(debug_path)
-                self.log(f"   📸 Pantallazo de error guardado: {debug_path}", 'warning')
-                self.log("   👉 Revisa si en el navegador ves el grid de fotos o una página en blanco/login", 'info')
-            
-            if not posts:
-                self.log("\n❌ NO SE ENCONTRARON POSTS", 'error')
-                self.log("   Posibles razones:", 'info')
-                self.log("   1. Instagram te está pidiendo un CAPTCHA", 'info')
-                self.log("   2. La sesión se cerró y ves la pantalla de login", 'info')
-                self.log("   3. Instagram bloqueó las peticiones automáticas temporalmente", 'info')
+            if permalinks:
+                self.log(f"   📋 {len(permalinks)} permalinks recibidos", 'info')
+                self._scrape_permalinks(permalinks)
+            elif not self._scrape_grid():
                 return
-            
-            self.log(f"   🚀 Iniciando desde el primer post encontrado...", 'success')
-            
-            self.log(f"   ✅ Encontrados {len(posts)} posts", 'success')
-            
-            # Hacer clic en el primer post
-            self.log("\n📷 Abriendo primer post...", 'info')
-            try:
-                self.driver.execute_script("arguments[0].click();", posts[0])
-            except:
-                posts[0].click()
-            time.sleep(2)
-            
-            # Procesar posts
-            while not self.stop_requested:
-                self.count_posts += 1
-                self.update_counters()
-                
-                # Obtener URL actual del post
-                current_url = self.driver.current_url
-                post_id = self._extract_post_id(current_url)
-                
-                self.set_status(f"📷 Procesando: {post_id}", '#ffa502')
-                self.log(f"\n{'='*40}", 'header')
-                self.log(f"📷 Post #{self.count_posts}: {post_id}", 'header')
-                
-                # Detectar tipo de post
-                post_type = self._detect_post_type()
-                
-                # Crear datos del post
-                post_data = {
-                    "id": post_id,
-                    "url": current_url,
-                    "type": post_type,
-                    "scraped_at": datetime.now().isoformat(),
-                    "images": []
-                }
-                
-                if post_type == "reel":
-                    self.log("   📹 Tipo: REEL (saltando)", 'warning')
-                    self.count_reels += 1
-                    post_data["skipped"] = True
-                    
-                elif post_type == "carousel":
-                    self.log("   📚 Tipo: CARRUSEL", 'success')
-                    self.count_carruseles += 1
-                    images = self._save_carousel(post_id)
-                    post_data["images"] = images
-                    
-                else:  # single image
-                    self.log("   🖼️ Tipo: IMAGEN ÚNICA", 'success')
-                    self.count_imagenes += 1
-                    images = self._save_single_image(post_id)
-                    post_data["images"] = images
-                
-                # Guardar datos del post
-                self.posts_data.append(post_data)
-                self._save_posts_json()
-                
-                self.update_counters()
-                
-                # Ir al siguiente post
-                if not self._go_to_next_post():
-                    self.log("\n✅ No hay más posts o se llegó al final", 'success')
-                    break
-                
-                time.sleep(1.5)
+            self._flush_pending_post()
+            self._retry_failed_downloads()
             
             # Resumen
             self.log("\n" + "=" * 50, 'header')
@@ -414,23 +927,412 @@ class InstagramScraperGUI:
             self.log(f"   Carruseles guardados: {self.count_carruseles}", 'success')
             self.log(f"   Imágenes guardadas: {self.count_imagenes}", 'success')
             self.log(f"   Reels saltados: {self.count_reels}", 'warning')
+            if self.count_posts:
+                avg = self.total_round_trips / self.count_posts
+                self.log(f"   Round trips WebDriver por post: {avg:.1f}", 'info')
+            self.log(f"   Ya capturados (saltados): {self.count_known}", 'info')
+            self.log("\n⏱️ Esperas:", 'info')
+            for line in format_wait_report():
+                self.log(f"   {line}", 'info')
+            selector_lines = get_registry().format_stats_lines()
+            if selector_lines:
+                self.log("\n🧭 Selectores:", 'info')
+                for line in selector_lines:
+                    self.log(f"   {line}", 'info')
             self.log(f"\n📁 Guardado en: {OUTPUT_DIR}", 'info')
             
             self.set_status("✅ Completado", '#00ff88')
             
         except Exception as e:
+            self.error = str(e)
             self.log(f"\n❌ Error: {e}", 'error')
             self.set_status("❌ Error", '#ff4757')
         finally:
+            self._flush_pending_post()
+            if self.downloader:
+                self.downloader.close()
+                self.downloader = None
+            if not self.shared_run:
+                if self.post_log:
+                    self.post_log.close()
+                    self._save_posts_json()
+                self.seen_index.close()
             self.running = False
-            self.start_btn.config(state=tk.NORMAL)
-            self.stop_btn.config(state=tk.DISABLED)
+            self._on_finished()
+    
+    def _ensure_driver(self):
+        """Deja un Chrome listo en self.driver; reutiliza el anterior si sigue vivo.
+        
+        Devuelve True si hubo que abrir uno.
+        """
+        if self.driver is not None:
+            try:
+                self.driver.current_window_handle
+                return False
+            except Exception:
+                try:
+                    self.driver.quit()
+                except Exception:
+                    pass
+                self.driver = None
+        
+        # Una pestaña del Chrome de browser_service.py si está corriendo; si no, uno propio
+        self.driver = attach_browser("instagram", driver_class=CountingChrome, profile_path=self.profile_path)
+        if self.driver is None:
+            options = Options()
+            options.add_argument(f"--user-data-dir={self.profile_path}")
+            options.add_argument("--disable-blink-features=AutomationControlled")
+            options.add_experimental_option("excludeSwitches", ["enable-automation"])
+            
+            service = ChromeService(chromedriver_path())
+            self.driver = CountingChrome(service=service, options=options)
+            self.driver.maximize_window()
+        return True
+    
+    def _on_finished(self):
+        self.start_btn.config(state=tk.NORMAL)
+        self.stop_btn.config(state=tk.DISABLED)
+        self.compact_btn.config(state=tk.NORMAL)
+    
+    def _scrape_grid(self):
+        """Busca los posts en el grid del perfil y los recorre; False si no hay posts que ver."""
+        # Scroll para cargar contenido
+        self.log("   🔄 Scrolleando para cargar posts...", 'info')
+        self.driver.execute_script("window.scrollTo(0, 500);")
+        wait_until(self.driver, dom_settled(0.5), timeout=2, label="scroll inicial")
+        self.driver.execute_script("window.scrollTo(0, 0);")
+        
+        # Esperar a que el grid de posts aparezca (o a que la página se calme si no hay grid)
+        self.log("   ⏳ Esperando a que el contenido cargue...", 'info')
+        wait_until(self.driver, any_of(element_present("a[href*='/p/'], a[href*='/reel/']"),
+                                       dom_settled(2.0)),
+                   timeout=PAGE_LOAD_TIMEOUT, label="grid de posts")
+        
+        # Verificar si es cuenta privada
+        is_private = self.driver.find_elements(By.XPATH, "//*[contains(text(), 'Esta cuenta es privada') or contains(text(), 'This Account is Private')]")
+        if is_private:
+            self.log("❌ La cuenta es PRIVADA. No se pueden ver los posts.", 'error')
+            return False
+
+        # Buscar el primer post
+        self.log("\n🔍 Buscando posts...", 'info')
+        
+        # Intentar múltiples selectores para encontrar posts
+        posts = []
+        
+        # Estrategia 1: Links con href /p/ o /reel/ (Instagram usa estos formatos),
+        # empezando por el selector que funcionó la última vez
+        grid_selector = "a"
+        selector, found = get_registry().resolve(
+            "instagram.grid_posts", GRID_POST_SELECTORS,
+            lambda selector: self.driver.execute_script(POST_LINKS_JS, selector))
+        if found:
+            posts = found
+            grid_selector = selector
+            self.log(f"   ✅ Encontrados {len(posts)} posts con selector: {selector}", 'success')
+        
+        # Estrategia 2: JavaScript para buscar todos los links de posts (como último recurso)
+        if not posts:
+            self.log("   🔍 Usando JavaScript profundo para buscar posts...", 'info')
+            posts = self.driver.execute_script("""
+                return Array.from(document.querySelectorAll('a')).filter(a => 
+                    a.href && (a.href.includes('/p/') || a.href.includes('/reel/'))
+                ).map(a => a); // El mapa es para asegurar que Selenium reciba los elementos
+            """)
+        
+        # Debug intensivo si falla
+        if not posts:
+            self.log("⚠️ No se detectaron posts. Iniciando diagnóstico...", 'warning')
+            
+            # 1. ¿Cuántos links hay?
+            total_links = self.driver.execute_script("return document.querySelectorAll('a').length;")
+            self.log(f"   📊 Resumen: {total_links} links totales en la página", 'info')
+            
+            # 2. ¿Hay algún article?
+            articles = self.driver.find_elements(By.TAG_NAME, "article")
+            self.log(f"   📊 Resumen: {len(articles)} elementos <article> encontrados", 'info')
+            
+            # 3. Guardar HTML para análisis (opcional, pesado)
+            # 4. Screenshot de la zona central
+            debug_path = os.path.join(OUTPUT_DIR, "error_grid.png")
+            self.driver.save_screenshot(debug_path)
+            self.log(f"   📸 Pantallazo de error guardado: {debug_path}", 'warning')
+            self.log("   👉 Revisa si en el navegador ves el grid de fotos o una página en blanco/login", 'info')
+        
+        if not posts:
+            self.log("\n❌ NO SE ENCONTRARON POSTS", 'error')
+            self.log("   Posibles razones:", 'info')
+            self.log("   1. Instagram te está pidiendo un CAPTCHA", 'info')
+            self.log("   2. La sesión se cerró y ves la pantalla de login", 'info')
+            self.log("   3. Instagram bloqueó las peticiones automáticas temporalmente", 'info')
+            return False
+        
+        self.log(f"   ✅ Encontrados {len(posts)} posts", 'success')
+        
+        if self.harvest_enabled:
+            # Recolectar todos los permalinks y recorrerlos desde una cola
+            self._scrape_harvested(grid_selector)
+        else:
+            self._scrape_modal(posts)
+        return True
+    
+    def _scrape_modal(self, posts):
+        """Recorre los posts abriendo el primero y avanzando con el modal."""
+        self.log(f"   🚀 Iniciando desde el primer post encontrado...", 'success')
+        
+        # Hacer clic en el primer post
+        self.log("\n📷 Abriendo primer post...", 'info')
+        profile_url = self.driver.current_url
+        try:
+            self.driver.execute_script("arguments[0].click();", posts[0])
+        except:
+            posts[0].click()
+        wait_until(self.driver, url_changed(profile_url), timeout=POST_LOAD_TIMEOUT, label="abrir post")
+        
+        # Procesar posts
+        consecutive_known = 0
+        while not self.stop_requested:
+            # Obtener URL actual del post
+            current_url = self.driver.current_url
+            post_id = self._extract_post_id(current_url)
+            
+            # Reanudación: saltar sin abrir carrusel ni tomar capturas
+            if self.resume_enabled and post_id in self.seen_index:
+                self.count_known += 1
+                consecutive_known += 1
+                self.update_counters()
+                self.log(f"   ⏩ {post_id} ya capturado ({consecutive_known} seguidos)", 'info')
+                if self.stop_after_known and consecutive_known >= self.stop_after_known:
+                    self.log(f"\n✅ {consecutive_known} posts conocidos seguidos, nada nuevo", 'success')
+                    break
+                if not self._go_to_next_post():
+                    self.log("\n✅ No hay más posts o se llegó al final", 'success')
+                    break
+                continue
+            consecutive_known = 0
+            
+            self._process_current_post(current_url, post_id)
+            
+            # Ir al siguiente post
+            if not self._go_to_next_post():
+                self.log("\n✅ No hay más posts o se llegó al final", 'success')
+                break
+    
+    def _scrape_harvested(self, grid_selector):
+        """Recolecta los permalinks del grid y los procesa en orden, varios a la vez."""
+        self.log("\n🧭 Recolectando permalinks del grid...", 'info')
+        urls = self._harvest_post_urls(grid_selector)
+        self.log(f"   ✅ {len(urls)} permalinks recolectados", 'success')
+        self._scrape_permalinks(urls)
+    
+    def _scrape_permalinks(self, urls):
+        """Procesa una lista de permalinks en su orden, cargando los siguientes en otras pestañas."""
+        pending = []
+        for url in urls:
+            if self.resume_enabled and self._extract_post_id(url) in self.seen_index:
+                self.count_known += 1
+                continue
+            pending.append(url)
+        self.update_counters()
+        
+        total = len(pending)
+        self.log(f"   📋 {total} posts en cola ({self.count_known} ya capturados)", 'info')
+        if not pending:
+            return
+        tabs = max(1, min(self.post_tabs, total))
+        if tabs > 1:
+            self.log(f"   🗂️ {tabs} pestañas cargando posts a la vez", 'info')
+        
+        started = time.time()
+        done = 0
+        for url in self._load_in_tabs(pending, tabs):
+            self._process_current_post(url, self._extract_post_id(url))
+            done += 1
+            
+            # Progreso y tiempo estimado
+            elapsed = time.time() - started
+            eta = elapsed / done * (total - done)
+            self.log(f"   📈 {done}/{total} · ETA {int(eta // 60)}m {int(eta % 60)}s", 'info')
+    
+    def _load_in_tabs(self, urls, tabs):
+        """Entrega los permalinks en orden, cada uno con su pestaña al frente y ya cargada.
+        
+        Las `tabs` pestañas cargan posts consecutivos: mientras se procesa uno,
+        los siguientes cargan en las demás. Al terminar un post, su pestaña
+        pasa a cargar el que va `tabs` puestos más adelante, así que el orden
+        de proceso (y del registro) es el del grid. Al final se cierran las
+        pestañas extra.
+        """
+        main_handle = self.driver.current_window_handle
+        opened = []  # Pestañas extra abiertas aquí (con el servicio, Chrome tiene también las de otros)
+        upcoming = iter(urls)
+        loading = deque()  # (handle, url), en orden del grid
+        try:
+            for position, url in zip(range(tabs), upcoming):
+                if not position:
+                    # La pestaña principal puede estar ya en el primer post (lista de permalinks)
+                    if self._canonical_post_url(self.driver.current_url) != url:
+                        self._start_loading(url)
+                elif hasattr(self.driver, 'new_tab'):
+                    self.driver.new_tab(url)  # Pestaña prestada por el servicio de navegador, ya cargando
+                else:
+                    self.driver.switch_to.new_window('tab')
+                    self._start_loading(url)
+                if position:
+                    opened.append(self.driver.current_window_handle)
+                loading.append((self.driver.current_window_handle, url))
+            
+            while loading and not self.stop_requested:
+                handle, url = loading.popleft()
+                if opened:
+                    self.driver.switch_to.window(handle)
+                wait_until(self.driver, all_of(url_contains(f"/{self._extract_post_id(url)}"), document_ready()),
+                           timeout=PAGE_LOAD_TIMEOUT, label="post en pestaña")
+                yield url
+                
+                next_url = next(upcoming, None)
+                if next_url and not self.stop_requested:
+                    self._start_loading(next_url)
+                    loading.append((handle, next_url))
+        finally:
+            try:
+                for handle in opened:
+                    self.driver.switch_to.window(handle)
+                    self.driver.close()
+                self.driver.switch_to.window(main_handle)
+            except Exception:
+                pass
+    
+    def _start_loading(self, url):
+        """Navega la pestaña actual a `url` sin esperar a que cargue."""
+        self.driver.execute_script("window.location.href = arguments[0];", url)
+    
+    def _harvest_post_urls(self, grid_selector):
+        """Scroll incremental del grid acumulando permalinks en orden y sin duplicados.
+        
+        El grid de Instagram es virtualizado (quita del DOM las filas fuera de
+        pantalla), así que se acumulan los links de cada paso en vez de leerlos
+        todos al final.
+        """
+        urls = {}  # dict: conserva el orden de inserción
+        idle_scrolls = 0
+        consecutive_known = 0
+        
+        self.driver.execute_script("window.scrollTo(0, 0);")
+        while not self.stop_requested and idle_scrolls < HARVEST_MAX_IDLE_SCROLLS:
+            hrefs = self.driver.execute_script(HARVEST_LINKS_JS, grid_selector)
+            
+            new_links = 0
+            for href in hrefs:
+                url = self._canonical_post_url(href)
+                if not url or url in urls:
+                    continue
+                urls[url] = None
+                new_links += 1
+                if self._extract_post_id(url) in self.seen_index:
+                    consecutive_known += 1
+                else:
+                    consecutive_known = 0
+            
+            # Reanudación: el grid va de más nuevo a más viejo
+            if (self.resume_enabled and self.stop_after_known
+                    and consecutive_known >= self.stop_after_known):
+                self.log(f"   ⏩ {consecutive_known} posts conocidos seguidos, fin de la recolección", 'info')
+                break
+            
+            idle_scrolls = 0 if new_links else idle_scrolls + 1
+            self.set_status(f"🧭 Recolectando grid: {len(urls)} posts", '#00d9ff')
+            
+            self.driver.execute_script("window.scrollBy(0, Math.floor(window.innerHeight * 0.8));")
+            wait_until(self.driver, dom_settled(0.4), timeout=HARVEST_SCROLL_TIMEOUT, label="scroll grid")
+        
+        return list(urls)
+    
+    def _canonical_post_url(self, href):
+        """Normaliza un link de post a https://www.instagram.com/<p|reel>/<id>/."""
+        match = re.search(r'/(p|reel)/([A-Za-z0-9_-]+)', href or '')
+        if not match:
+            return None
+        return f"https://www.instagram.com/{match.group(1)}/{match.group(2)}/"
+    
+    def _process_current_post(self, current_url, post_id):
+        """Detecta el tipo del post abierto, guarda sus imágenes y su registro."""
+        self.count_posts += 1
+        self.update_counters()
+        
+        self.set_status(f"📷 Procesando: {post_id}", '#ffa502')
+        self.log(f"\n{'='*40}", 'header')
+        self.log(f"📷 Post #{self.count_posts}: {post_id}", 'header')
+        
+        commands_before = self.driver.commands
+        
+        # Esperar a que la imagen (o el video) del post esté lista
+        wait_until(self.driver, any_of(image_decoded("article img"), element_present("article video")),
+                   timeout=POST_LOAD_TIMEOUT, label="media del post")
+        
+        # Detectar tipo de post (una sola llamada con la instantánea del DOM)
+        snapshot = self._snapshot_post() if USE_DOM_SNAPSHOT else None
+        post_type = snapshot["type"] if snapshot else self._detect_post_type()
+        
+        # Crear datos del post
+        post_data = {
+            "id": post_id,
+            "url": current_url,
+            "type": post_type,
+            "scraped_at": datetime.now().isoformat(),
+            "images": []
+        }
+        if snapshot:
+            post_data["caption"] = snapshot["caption"]
+            post_data["timestamp"] = snapshot["timestamp"]
+        
+        if post_type == "reel":
+            self.log("   📹 Tipo: REEL (saltando)", 'warning')
+            self.count_reels += 1
+            post_data["skipped"] = True
+            
+        elif post_type == "carousel":
+            self.log("   📚 Tipo: CARRUSEL", 'success')
+            self.count_carruseles += 1
+            images = self._save_carousel(post_id, snapshot)
+            post_data["images"] = images
+            
+        else:  # single image
+            self.log("   🖼️ Tipo: IMAGEN ÚNICA", 'success')
+            self.count_imagenes += 1
+            images = self._save_single_image(post_id, snapshot)
+            post_data["images"] = images
+        
+        # Guardar datos del post (una línea en el registro)
+        self._save_post_record(post_data)
+        
+        round_trips = self.driver.commands - commands_before
+        self.total_round_trips += round_trips
+        self.log(f"   📡 Round trips WebDriver: {round_trips}", 'info')
+        
+        self.update_counters()
+    
+    def _permalink_list(self, text):
+        """Permalinks de `text` (separados por espacios o comas), o None si no es una lista de posts."""
+        tokens = re.split(r'[\s,]+', text.strip())
+        urls = [self._canonical_post_url(token) for token in tokens if token]
+        if not urls or not all(urls):
+            return None
+        return list(dict.fromkeys(urls))
     
     def _extract_post_id(self, url):
         """Extrae el ID del post de la URL."""
         match = re.search(r'/(?:p|reel)/([A-Za-z0-9_-]+)', url)
         return match.group(1) if match else f"post_{int(time.time())}"
     
+    def _snapshot_post(self):
+        """Lee tipo, imagen actual, slides, caption y fecha del post en un solo round trip."""
+        try:
+            return self.driver.execute_script(POST_SNAPSHOT_JS)
+        except Exception as e:
+            self.log(f"   ⚠️ Instantánea del DOM falló, usando selectores: {e}", 'warning')
+            return None
+    
     def _detect_post_type(self):
         """Detecta si es Reel, Carrusel o Imagen única."""
         try:
@@ -458,11 +1360,18 @@ class InstagramScraperGUI:
         except:
             return "single"
     
-    def _save_carousel(self, post_id):
+    def _save_carousel(self, post_id, snapshot=None):
         """Guarda todas las imágenes del carrusel evitando duplicados."""
         folder = os.path.join(CARRUSELES_DIR, post_id)
         os.makedirs(folder, exist_ok=True)
         
+        # Con descarga directa no hace falta mostrar cada slide: se leen en bloque
+        if snapshot and self.downloader:
+            saved_images = self._save_carousel_bulk(folder)
+            if saved_images is not None:
+                self.log(f"   📁 Guardado en: {folder}", 'info')
+                return saved_images
+        
         saved_images = []  # Lista de URLs guardadas
         seen_hashes = set()  # Hashes de imágenes ya vistas para evitar duplicados
         img_count = 0
@@ -471,7 +1380,7 @@ class InstagramScraperGUI:
         
         while img_count < max_images:
             # Obtener la URL de la imagen actual
-            img_url = self._get_current_image_url()
+            img_url = snapshot["src"] if snapshot else self._get_current_image_url()
             
             if img_url:
                 # Crear hash de la URL para detectar duplicados
@@ -482,13 +1391,8 @@ class InstagramScraperGUI:
                     consecutive_duplicates = 0
                     img_count += 1
                     
-                    # Tomar screenshot del contenedor de imagen
-                    filepath = self._take_post_screenshot(folder, img_count)
-                    saved_images.append({
-                        "index": img_count,
-                        "url": img_url,
-                        "file": filepath
-                    })
+                    # Descargar el original (o capturar el contenedor de imagen)
+                    saved_images.append(self._capture_image(folder, img_count, img_url))
                     self.log(f"      💾 Imagen {img_count} guardada", 'success')
                 else:
                     consecutive_duplicates += 1
@@ -500,49 +1404,129 @@ class InstagramScraperGUI:
                 # Si no encontramos imagen, intentamos continuar
                 img_count += 1
                 filepath = self._take_post_screenshot(folder, img_count)
+                self._emit_image(filepath)
                 self.log(f"      💾 Imagen {img_count} guardada (sin URL)", 'warning')
             
             # Intentar ir a la siguiente imagen del carrusel
             # IMPORTANTE: Buscar el botón DENTRO del article (carrusel), no el de navegación entre posts
-            if not self._click_carousel_next():
+            if snapshot:
+                if not snapshot["has_next"] or not self.driver.execute_script(CAROUSEL_NEXT_JS):
+                    break  # No hay más imágenes
+            elif not self._click_carousel_next():
                 break  # No hay más imágenes
             
-            time.sleep(1.2)  # Esperar a que cargue la siguiente imagen
+            self._wait_for_slide()  # Esperar a que cargue la siguiente imagen
+            if snapshot:
+                snapshot = self._snapshot_post()
         
         self.log(f"   📁 Guardado en: {folder}", 'info')
         return saved_images
     
+    def _save_carousel_bulk(self, folder):
+        """Lee las slides del carrusel en bloque y solo pulsa "Siguiente" para las no montadas.
+        
+        Se detiene exactamente en el número de slides que indican los puntos
+        (div._acnb). Devuelve None si no se pudo leer el carrusel.
+        """
+        slides = {}  # índice -> slide
+        slide_count = 0
+        clicks = 0
+        
+        while True:
+            data = self.driver.execute_script(CAROUSEL_SLIDES_JS)
+            if not data:
+                break
+            slide_count = data["slide_count"] or slide_count
+            self._merge_slides(slides, data, clicks)
+            
+            if slide_count and all(i in slides for i in range(slide_count)):
+                break  # Todas las slides reales ya están leídas
+            
+            # Quedan slides sin renderizar: avanzar el carrusel
+            limit = slide_count - 1 if slide_count else MAX_CAROUSEL_SLIDES
+            if not data["has_next"] or clicks >= limit:
+                break
+            if not self.driver.execute_script(CAROUSEL_NEXT_JS):
+                break
+            clicks += 1
+            self._wait_for_slide()
+        
+        if not slides:
+            return None
+        
+        missing = [i for i in range(slide_count) if i not in slides]
+        if missing:
+            self.log(f"      ⚠️ Faltan {len(missing)} de {slide_count} slides "
+                     f"({', '.join(str(i + 1) for i in missing)}): se recorren con clics", 'warning')
+            self._fill_missing_slides(slides, missing, clicks)
+            missing = [i for i in missing if i not in slides]
+            if missing:
+                self.log(f"      ⚠️ Sin capturar: slides {', '.join(str(i + 1) for i in missing)}", 'warning')
+        
+        if slide_count:
+            indexes = [i for i in range(slide_count) if i in slides]
+        else:
+            indexes = sorted(slides)
+        self.log(f"      📚 {len(indexes)} slides leídas ({clicks} clics)", 'info')
+        
+        # El número de archivo es el de la slide, así un hueco no corre a las siguientes
+        saved_images = []
+        for index in indexes:
+            slide = slides[index]
+            number = index + 1
+            if slide["video"] or not slide["src"]:
+                self.log(f"      ⏭️ Slide {number} es video o no tiene URL (saltando)", 'warning')
+                continue
+            saved_images.append(self._capture_image(folder, number, slide["src"]))
+            self.log(f"      💾 Imagen {number} guardada", 'success')
+        return saved_images
+    
+    def _merge_slides(self, slides, data, clicks):
+        """Añade las slides leídas; sin índice propio, se ubican por los clics dados desde la primera."""
+        for slide in data["slides"]:
+            index = slide["index"]
+            if index is None:
+                if slide.get("offset") is None:
+                    continue
+                index = clicks + slide["offset"]
+            if index >= 0:
+                slides.setdefault(index, slide)
+    
+    def _fill_missing_slides(self, slides, missing, clicks):
+        """Vuelve a la primera slide y avanza de una en una leyendo la visible en cada índice que falta."""
+        for _ in range(clicks):
+            if not self.driver.execute_script(CAROUSEL_PREV_JS):
+                return  # Sin "Anterior" no se sabe en qué slide se está
+            self._wait_for_slide()
+        
+        last = max(missing)
+        for step in range(last + 1):
+            if step in missing:
+                data = self.driver.execute_script(CAROUSEL_SLIDES_JS)
+                current = next((slide for slide in (data or {}).get("slides", ())
+                                if slide.get("offset") == 0), None)
+                if current:
+                    slides[step] = current
+            if step == last or not self.driver.execute_script(CAROUSEL_NEXT_JS):
+                break
+            self._wait_for_slide()
+    
+    def _wait_for_slide(self):
+        """Espera a que termine la transición del carrusel y se decodifique la imagen visible."""
+        wait_until(self.driver, all_of(dom_settled(0.25), script_true(VISIBLE_SLIDE_DECODED_JS)),
+                   timeout=SLIDE_TIMEOUT, label="slide carrusel")
+    
     def _click_carousel_next(self):
         """Hace clic en el botón 'Siguiente' del carrusel (no el de posts)."""
         try:
             # Buscar específicamente dentro del article (contenedor del post modal)
             # El botón del carrusel está DENTRO del contenedor de la imagen
-            carousel_selectors = [
-                # Selector específico para el botón de siguiente en carrusel (dentro de la lista de imágenes)
-                "article div._aahi button[aria-label*='Siguiente']",
-                "article div._aahi button[aria-label*='Next']",
-                # Botón dentro del contenedor de imágenes del carrusel
-                "article ul button[aria-label*='Siguiente']",
-                "article ul button[aria-label*='Next']",
-                # Selector más genérico pero dentro del article
-                "article div[role='presentation'] button[aria-label*='Siguiente']",
-                "article div[role='presentation'] button[aria-label*='Next']",
-                # Botón que está al lado derecho de la imagen (posición relativa)
-                "article div._aagw button[aria-label*='Siguiente']",
-                "article div._aagw button[aria-label*='Next']",
-            ]
-            
-            for selector in carousel_selectors:
-                try:
-                    btns = self.driver.find_elements(By.CSS_SELECTOR, selector)
-                    for btn in btns:
-                        if btn.is_displayed() and btn.is_enabled():
-                            # Verificar que no sea el botón de navegación entre posts
-                            # El botón del carrusel suele estar más cerca de la imagen
-                            self.driver.execute_script("arguments[0].click();", btn)
-                            return True
-                except:
-                    continue
+            # Un round trip por candidato, empezando por el que ganó la última vez
+            selector, clicked = get_registry().resolve(
+                "instagram.carousel_next", CAROUSEL_NEXT_SELECTORS,
+                lambda selector: self.driver.execute_script(CLICK_VISIBLE_JS, selector))
+            if clicked:
+                return True
             
             # Método alternativo: buscar por la estructura del DOM
             # El botón del carrusel tiene un SVG con el chevron hacia la derecha
@@ -586,20 +1570,16 @@ class InstagramScraperGUI:
             self.log(f"      ⚠️ Error al navegar: {e}", 'warning')
             return False
     
-    def _save_single_image(self, post_id):
+    def _save_single_image(self, post_id, snapshot=None):
         """Guarda la imagen única."""
         folder = os.path.join(IMAGENES_DIR, post_id)
         os.makedirs(folder, exist_ok=True)
         
-        img_url = self._get_current_image_url()
-        filepath = self._take_post_screenshot(folder, 1)
+        img_url = snapshot["src"] if snapshot else self._get_current_image_url()
+        entry = self._capture_image(folder, 1, img_url)
         self.log(f"   💾 Imagen guardada en: {folder}", 'success')
         
-        return [{
-            "index": 1,
-            "url": img_url,
-            "file": filepath
-        }]
+        return [entry]
     
     def _get_current_image_url(self):
         """Obtiene la URL de la imagen actualmente visible en el post."""
@@ -635,6 +1615,30 @@ class InstagramScraperGUI:
         
         return None
     
+    def _capture_image(self, folder, index, img_url):
+        """Encola la descarga del original; si no es posible, toma screenshot."""
+        if self.downloader and img_url:
+            entry = {"index": index, "url": img_url, "file": None, "method": "download"}
+            future = self.downloader.submit(img_url, os.path.join(folder, str(index)))
+            if self.image_sink:
+                future.add_done_callback(self._emit_download)
+            self._post_downloads.append((entry, future))
+            return entry
+        
+        filepath = self._take_post_screenshot(folder, index)
+        self._emit_image(filepath)
+        return {"index": index, "url": img_url, "file": filepath, "method": "screenshot"}
+    
+    def _emit_image(self, filepath):
+        """Entrega la imagen ya guardada al consumidor (p. ej. la etapa de traducción)."""
+        if self.image_sink and filepath:
+            self.image_sink(filepath)
+    
+    def _emit_download(self, future):
+        # Corre en el hilo de la descarga: si el consumidor va lento, frena las descargas
+        if not future.cancelled() and future.exception() is None:
+            self._emit_image(future.result()[0])
+    
     def _take_post_screenshot(self, folder, index):
         """Toma screenshot del área del post."""
         filepath = os.path.join(folder, f"{index}.png")
@@ -645,7 +1649,7 @@ class InstagramScraperGUI:
             
             # Scroll para asegurar visibilidad
             self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", media)
-            time.sleep(0.3)
+            wait_until(self.driver, element_decoded(media), timeout=2, label="imagen para captura")
             
             # Screenshot del elemento
             media.screenshot(filepath)
@@ -656,21 +1660,113 @@ class InstagramScraperGUI:
         
         return filepath
     
+    def _save_post_record(self, post_data):
+        """Añade el post al registro JSONL (sin reescribir lo anterior).
+        
+        Si el post tiene descargas en curso, su registro se escribe cuando se
+        guarde el siguiente post, para no frenar la navegación esperándolas.
+        """
+        self._flush_pending_post()
+        if self._post_downloads:
+            self._pending_post = (post_data, self._post_downloads)
+            self._post_downloads = []
+        else:
+            self._write_post_record(post_data, [])
+    
+    def _flush_pending_post(self):
+        """Espera las descargas del post pendiente y escribe su registro."""
+        if self._pending_post:
+            post_data, downloads = self._pending_post
+            self._pending_post = None
+            self._write_post_record(post_data, downloads)
+    
+    def _write_post_record(self, post_data, downloads):
+        failed = []
+        for entry, future in downloads:
+            try:
+                entry["file"], entry["bytes"] = future.result(timeout=DOWNLOAD_TIMEOUT * 2)
+            except Exception as e:
+                entry["error"] = str(e)
+                failed.append(entry)
+                self.log(f"   ⚠️ Falló la descarga {post_data['id']}/{entry['index']}: {e}", 'warning')
+        
+        if failed:
+            # Sin registro ni marca de visto hasta capturar por screenshot las slides que fallaron
+            self._retry_posts[post_data["url"]] = (post_data, failed)
+            self.log(f"   🔁 {post_data['id']}: {len(failed)} imagen(es) se capturarán por screenshot al final", 'warning')
+            return
+        
+        self._append_post_record(post_data)
+    
+    def _append_post_record(self, post_data):
+        try:
+            self.post_log.append(post_data)
+        except Exception as e:
+            self.log(f"   ⚠️ Error guardando registro: {e}", 'warning')
+        
+        # Solo se marca como capturado cuando todas sus imágenes llegaron a disco
+        url = post_data["url"]
+        if '/p/' in url or '/reel/' in url:
+            self.seen_index.add(post_data["id"])
+    
+    def _retry_failed_downloads(self):
+        """Vuelve a abrir los posts con descargas fallidas y captura por screenshot solo esas slides.
+        
+        Las imágenes que sí se descargaron ya se entregaron a image_sink y se
+        conservan; las que fallaron se borran (con sus .part) antes de capturarlas.
+        """
+        if not self._retry_posts:
+            return
+        self.log(f"\n🔁 {len(self._retry_posts)} post(s) con descargas fallidas: capturando por screenshot", 'info')
+        retry_posts, self._retry_posts = self._retry_posts, {}
+        for url, (post_data, failed) in retry_posts.items():
+            if self.stop_requested:
+                break
+            post_id = post_data["id"]
+            folder = os.path.join(CARRUSELES_DIR if post_data["type"] == "carousel" else IMAGENES_DIR, post_id)
+            for entry in failed:
+                for leftover in glob.glob(os.path.join(folder, f"{entry['index']}.*")):
+                    try:
+                        os.remove(leftover)
+                    except OSError:
+                        pass
+            
+            self.driver.get(url)
+            wait_until(self.driver, all_of(url_contains(f"/{post_id}"), document_ready()),
+                       timeout=PAGE_LOAD_TIMEOUT, label="post a reintentar")
+            wait_until(self.driver, image_decoded("article img"),
+                       timeout=POST_LOAD_TIMEOUT, label="media del post")
+            
+            # La página recién abierta muestra la primera slide: se avanza hasta cada índice fallido
+            position = 1
+            for entry in sorted(failed, key=lambda entry: entry["index"]):
+                while position < entry["index"] and self.driver.execute_script(CAROUSEL_NEXT_JS):
+                    position += 1
+                    self._wait_for_slide()
+                if position != entry["index"]:
+                    break  # El carrusel no llegó a esa slide: queda para la próxima corrida
+                entry["file"] = self._take_post_screenshot(folder, entry["index"])
+                entry["method"] = "screenshot"
+                entry.pop("error", None)
+                self._emit_image(entry["file"])
+                self.log(f"      💾 {post_id}/{entry['index']} capturada por screenshot", 'success')
+            
+            if any("error" in entry for entry in failed):
+                self.log(f"   ⚠️ {post_id}: no se pudieron capturar todas las slides", 'warning')
+                continue
+            self._append_post_record(post_data)
+    
     def _save_posts_json(self):
-        """Guarda todos los links y datos de los posts en un archivo JSON."""
-        json_path = os.path.join(OUTPUT_DIR, "posts_data.json")
+        """Compacta el registro JSONL en posts_data.json (al final de la corrida)."""
         try:
-            with open(json_path, 'w', encoding='utf-8') as f:
-                json.dump({
-                    "scraped_at": datetime.now().isoformat(),
-                    "total_posts": len(self.posts_data),
-                    "posts": self.posts_data
-                }, f, indent=2, ensure_ascii=False)
+            total = compact_posts_log()
+            self.log(f"   🗜️ posts_data.json actualizado ({total} posts)", 'info')
         except Exception as e:
             self.log(f"   ⚠️ Error guardando JSON: {e}", 'warning')
     
     def _go_to_next_post(self):
-        """Navega al siguiente post."""
+        """Navega al siguiente post y espera a que cambie la URL."""
+        old_url = self.driver.current_url
         try:
             # Buscar botón de siguiente post (flecha derecha)
             next_post_btn = self.driver.find_element(By.CSS_SELECTOR, 
@@ -684,19 +1780,19 @@ class InstagramScraperGUI:
                 parent = parent.find_element(By.XPATH, "..")
             
             self.driver.execute_script("arguments[0].click();", parent)
-            time.sleep(1)
-            return True
+            return bool(wait_until(self.driver, url_changed(old_url),
+                                   timeout=POST_LOAD_TIMEOUT, label="siguiente post"))
             
         except NoSuchElementException:
             # Intentar con tecla de flecha derecha
             try:
                 body = self.driver.find_element(By.TAG_NAME, "body")
                 body.send_keys(Keys.ARROW_RIGHT)
-                time.sleep(1)
                 
                 # Verificar si cambió la URL
-                new_url = self.driver.current_url
-                return "/p/" in new_url or "/reel/" in new_url
+                new_url = wait_until(self.driver, url_changed(old_url),
+                                     timeout=POST_LOAD_TIMEOUT, label="siguiente post (teclado)")
+                return bool(new_url) and ("/p/" in new_url or "/reel/" in new_url)
             except:
                 return False
     
@@ -710,6 +1806,69 @@ class InstagramScraperGUI:
         self.root.destroy()
 
 
+class HeadlessScraper(InstagramScraperGUI):
+    """El mismo recorrido que la interfaz, sin Tk: el log va a la consola.
+    
+    Para orquestadores que corren la captura como una etapa más; run() se
+    ejecuta en el hilo que lo llama y cierra Chrome al terminar (con
+    keep_browser lo deja abierto para el siguiente run() y se cierra con close()).
+    """
+    
+    def __init__(self, image_sink=None, resume=True, harvest=False, download=True,
+                 stop_after_known=STOP_AFTER_KNOWN, prefix="", profile_path=None, keep_browser=False,
+                 post_tabs=POST_TABS):
+        self.root = None
+        self.prefix = prefix
+        self.keep_browser = keep_browser  # Mantener Chrome abierto entre run() (cerrarlo con close())
+        self._status = None
+        self._init_state()
+        self.profile_path = profile_path or PROFILE_PATH
+        self.image_sink = image_sink
+        self.resume_enabled = resume
+        self.harvest_enabled = harvest
+        self.download_enabled = download
+        self.stop_after_known = stop_after_known
+        self.post_tabs = post_tabs
+        self._reset_counters()
+    
+    def log(self, msg, tag='info'):
+        print(f"{self.prefix}{msg}" if msg.strip() else msg, flush=True)
+    
+    def set_status(self, status, color='#00ff88'):
+        self._status = status
+    
+    def update_counters(self):
+        pass
+    
+    def _on_finished(self):
+        pass
+    
+    def run(self, profile_url):
+        """Captura el perfil; devuelve True si terminó bien (si no, el motivo queda en self.error)."""
+        self.running = True
+        self.stop_requested = False
+        self._status = None
+        self._reset_counters()
+        self.create_directories()
+        try:
+            self._scrape(profile_url)
+        finally:
+            if not self.keep_browser:
+                self.close()
+        return self.error is None
+    
+    def close(self):
+        if self.driver:
+            try:
+                self.driver.quit()
+            except Exception:
+                pass
+            self.driver = None
+    
+    def stop(self):
+        self.stop_requested = True
+
+
 def main():
     root = tk.Tk()
     app = InstagramScraperGUI(root)
@@ -0,0 +1,271 @@
+"""
+🔗 PIPELINE INSTAGRAM → GEMINI
+===============================
+Corre la captura de Instagram y la traducción con Gemini como dos etapas
+concurrentes unidas por una cola acotada: cada imagen que el scraper deja en
+disco entra a la cola y la traducción empieza sin esperar a que termine el
+perfil. Si la traducción va más lenta, la cola se llena y frena las
+descargas del scraper (backpressure) en lugar de acumular trabajo.
+
+Si browser_service.py está corriendo, las dos etapas trabajan en pestañas de
+su Chrome, cada una en su propia ventana para que los cambios de pestaña de
+una no manden al fondo las de la otra (una ventana minimizada sí queda
+frenada: no minimices las del servicio mientras corre el pipeline). Si no, cada etapa abre su propio Chrome, así que la traducción
+necesita un perfil distinto del del scraper: por defecto toma una copia del
+pool de perfiles (profile_pool.py), que ya trae la sesión del perfil maestro.
+
+Uso:
+    python pipeline.py https://www.instagram.com/perfil/ [--harvest] [--queue-size 8]
+                       [opciones de gemini_translator.py: --tabs, --prompt, --output, ...]
+"""
+
+import os
+import sys
+import time
+import queue
+import argparse
+import threading
+
+import browser_service
+import gemini_translator as gt
+from translation_jobs import JobQueue
+from profile_pool import ProfilePool
+from instagram_scraper import HeadlessScraper, OUTPUT_DIR, STOP_AFTER_KNOWN
+
+# Cola propia: la del traductor guarda trabajos de otras carpetas (OneDrive...) que no son de esta etapa
+JOBS_PATH = os.path.join(os.path.dirname(gt.JOBS_PATH), '.gemini_translator_pipeline_jobs.sqlite3')
+QUEUE_SIZE = 8  # Imágenes capturadas esperando traducción antes de frenar al scraper
+REPORT_INTERVAL = 60  # Segundos entre reportes de ritmo
+SINK_POLL = 1.0  # Segundos entre comprobaciones de que la traducción sigue viva
+
+
+class StageStats:
+    """Contador de una etapa: elementos, ritmo y tiempo bloqueado por backpressure."""
+
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.failed = 0
+        self.blocked = 0.0
+        self.started = None
+        self._lock = threading.Lock()
+
+    def add(self, failed=False, blocked=0.0):
+        with self._lock:
+            if self.started is None:
+                self.started = time.monotonic()
+            self.count += 1
+            self.failed += failed
+            self.blocked += blocked
+
+    def per_minute(self):
+        if not self.started or not self.count:
+            return 0.0
+        return self.count / max(time.monotonic() - self.started, 1) * 60
+
+    def line(self):
+        line = f"{self.name}: {self.count} ({self.per_minute():.1f}/min)"
+        if self.failed:
+            line += f", {self.failed} fallida(s)"
+        if self.blocked >= 0.1:
+            line += f", {self.blocked:.0f}s esperando cola"
+        return line
+
+
+class Pipeline:
+    def __init__(self, profile_url, queue_size=QUEUE_SIZE, translator_profile=None,
+                 harvest=False, resume=True, stop_after_known=STOP_AFTER_KNOWN):
+        self.profile_url = profile_url
+        self.translator_profile = translator_profile
+        self.images = queue.Queue(maxsize=queue_size)
+        self.queue_peak = 0
+        self.capture_stats = StageStats("📸 captura")
+        self.translate_stats = StageStats("🍌 traducción")
+        self.translator_error = None
+        self.translator_started = threading.Event()
+        self.finished = threading.Event()
+        self.dropped = []  # Capturadas que la traducción ya no pudo recibir
+        self.jobs_counts = None
+
+        self.cache = gt.TranslationCache()
+        self.cache.load()
+        self.jobs = JobQueue(JOBS_PATH)
+        self.jobs.recover()
+        self.run_started = time.time()
+        gt.run_report.reset_report()
+
+        self.scraper = HeadlessScraper(image_sink=self._sink, resume=resume, harvest=harvest,
+                                       stop_after_known=stop_after_known, prefix="[captura] ")
+        self.translator = threading.Thread(target=self._translator_stage, name='traduccion', daemon=True)
+
+    # --- Etapa 1: captura (corre en los hilos del scraper) ---
+
+    def _put(self, item):
+        """Encola mientras la traducción siga viva; devuelve False si ya no hay quien la reciba."""
+        while self.translator.is_alive():
+            try:
+                self.images.put(item, timeout=SINK_POLL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _sink(self, path):
+        """Encola una imagen capturada; bloquea mientras la cola esté llena."""
+        started = time.monotonic()
+        if not self._put(path):
+            self.dropped.append(path)
+        self.queue_peak = max(self.queue_peak, self.images.qsize())
+        self.capture_stats.add(blocked=time.monotonic() - started)
+
+    # --- Etapa 2: traducción (hilo propio con su Chrome) ---
+
+    def _captured(self):
+        """Imágenes de la cola hasta el fin de la captura; None en cada segundo sin novedades."""
+        while True:
+            try:
+                path = self.images.get(timeout=SINK_POLL)
+            except queue.Empty:
+                yield None  # Ocasión para reclamar reintentos vencidos
+                continue
+            if path is None:
+                return
+            yield path
+
+    def _on_translated(self, original, result, error):
+        self.translate_stats.add(failed=not result)
+
+    def _translator_stage(self):
+        # Con el servicio de navegador las dos etapas comparten su Chrome (y su perfil);
+        # si no, la traducción usa el perfil indicado o una copia del pool
+        profile_lease = None
+        try:
+            if gt.USE_BROWSER_SERVICE and browser_service.available():
+                profile = gt.PROFILE_PATH
+            elif self.translator_profile:
+                profile = self.translator_profile
+            else:
+                profile_lease = ProfilePool(gt.PROFILE_PATH).lease("pipeline-traduccion", timeout=0)
+                profile = profile_lease.path
+            driver = gt.setup_chrome_driver(profile)
+        except Exception as e:
+            self.translator_error = e
+            if profile_lease:
+                profile_lease.release()
+            return
+        finally:
+            self.translator_started.set()
+
+        preprocessor = None
+        try:
+            if not gt.navigate_to_image_tool(driver):
+                self.translator_error = RuntimeError("No se pudo abrir la herramienta de imagen de Gemini")
+                return
+            preprocessor = gt.create_preprocessor()
+            sources = gt.stream_jobs(self._captured(), self.jobs, self.cache, self.run_started,
+                                     on_cached=lambda path, result: self.translate_stats.add())
+            gt.translate_jobs(driver, sources, self.jobs, self.cache,
+                              on_result=self._on_translated, preprocessor=preprocessor)
+        except Exception as e:
+            self.translator_error = e
+        finally:
+            if preprocessor:
+                preprocessor.close()
+            driver.quit()
+            if profile_lease:
+                profile_lease.release()
+
+    # --- Orquestación ---
+
+    def _report_loop(self):
+        while not self.finished.wait(REPORT_INTERVAL):
+            print(f"\n📊 {self.capture_stats.line()} · cola {self.images.qsize()}/{self.images.maxsize} · "
+                  f"{self.translate_stats.line()}", flush=True)
+
+    def run(self):
+        """Corre las dos etapas y devuelve el código de salida (los de gemini_translator)."""
+        self.translator.start()
+        # Los dos Chrome no arrancan a la vez (webdriver-manager comparte caché)
+        self.translator_started.wait()
+        if self.translator_error:
+            print(f"❌ No se pudo iniciar la etapa de traducción: {self.translator_error}")
+            self.jobs.close()
+            return gt.EXIT_SETUP_ERROR
+
+        threading.Thread(target=self._report_loop, daemon=True).start()
+        try:
+            self.scraper.run(self.profile_url)
+        except KeyboardInterrupt:
+            print("\n🛑 Interrumpido: se termina de traducir lo ya capturado")
+        finally:
+            # Fin de la captura: la traducción vacía la cola y termina
+            self._put(None)
+            self.translator.join()
+            self.finished.set()
+            # Si la traducción se cayó antes, lo que quedó en la cola no se tradujo
+            while True:
+                try:
+                    path = self.images.get_nowait()
+                except queue.Empty:
+                    break
+                if path:
+                    self.dropped.append(path)
+            self.jobs_counts = self.jobs.counts(since=self.run_started)
+            self.jobs.close()
+        return self.summary()
+
+    def summary(self):
+        counts = self.jobs_counts
+        print("\n" + "=" * 60)
+        print("📊 RESUMEN DEL PIPELINE")
+        print("=" * 60)
+        print(f"   {self.capture_stats.line()}")
+        print(f"   {self.translate_stats.line()}")
+        print(f"   Cola: máximo {self.queue_peak}/{self.images.maxsize} imágenes en espera")
+        print(f"   Trabajos: {counts['saved']} guardados, {counts['failed']} fallidos, "
+              f"{counts['pending'] + counts['uploading'] + counts['generating']} sin terminar")
+        if self.translator_error:
+            print(f"❌ La traducción se detuvo: {self.translator_error}")
+        if self.dropped:
+            print(f"⚠️ {len(self.dropped)} imagen(es) capturadas sin traducir; "
+                  f"tradúcelas con: python gemini_translator.py --source \"{OUTPUT_DIR}\"")
+        print("\n⏱️ Esperas:")
+        for line in gt.format_wait_report():
+            print(f"   {line}")
+        gt.write_run_report()
+
+        if self.translator_error and not counts['saved']:
+            return gt.EXIT_SETUP_ERROR
+        if counts['saved'] == sum(counts.values()) and not self.dropped and not self.translator_error:
+            return gt.EXIT_OK
+        return gt.EXIT_FAILURES
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Captura un perfil de Instagram y traduce cada imagen con Gemini a medida que llega.",
+        epilog="Las demás opciones se pasan a gemini_translator.py (--tabs, --prompt, --output, ...).")
+    parser.add_argument('profile_url', help="URL del perfil de Instagram")
+    parser.add_argument('--queue-size', type=int, default=QUEUE_SIZE,
+                        help="imágenes en espera antes de frenar la captura")
+    parser.add_argument('--translator-profile',
+                        help="perfil de Chrome para la etapa de traducción (por defecto, una copia del pool)")
+    parser.add_argument('--harvest', action='store_true', help="recolectar permalinks en vez de recorrer el modal")
+    parser.add_argument('--no-resume', action='store_true', help="volver a capturar los posts ya vistos")
+    parser.add_argument('--stop-after-known', type=int, default=STOP_AFTER_KNOWN,
+                        help="posts conocidos seguidos tras los que se detiene la captura (0 = no parar)")
+    args, translator_argv = parser.parse_known_args(argv)
+    gt.apply_args(gt.parse_args(translator_argv))
+
+    print("=" * 60)
+    print("🔗 PIPELINE INSTAGRAM → GEMINI")
+    print("=" * 60)
+    os.makedirs(gt.DESKTOP_PATH, exist_ok=True)
+    pipeline = Pipeline(args.profile_url, max(1, args.queue_size), args.translator_profile,
+                        harvest=args.harvest, resume=not args.no_resume,
+                        stop_after_known=max(0, args.stop_after_known))
+    return pipeline.run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,431 @@
+"""
+🧬 PROFILE POOL
+================
+Copias de trabajo del perfil de Chrome con la sesión iniciada, para correr
+varios Chrome a la vez: Chrome bloquea su user-data-dir, así que dos
+instancias (dos scrapers, dos traductores...) no pueden compartir
+~/.gemini_translator_profile.
+
+Cada copia se clona del perfil maestro sin cachés. Los archivos se clonan
+con copy-on-write (reflink) cuando el sistema de archivos lo permite; las
+carpetas que Chrome nunca reescribe (extensiones, diccionarios) se enlazan
+con hardlinks, y el resto se copia. Antes de prestar una copia se le
+actualizan las cookies desde el maestro, para que herede la sesión vigente.
+
+Los préstamos son archivos .lock con el PID del dueño: se liberan al salir
+del proceso y, si el proceso murió, el siguiente lease los recupera.
+
+    python profile_pool.py --size 4     # Crea o actualiza 4 copias
+    python profile_pool.py --status
+    python profile_pool.py --remove     # Borra las copias libres
+"""
+
+import os
+import sys
+import json
+import time
+import errno
+import atexit
+import shutil
+import socket
+import sqlite3
+import argparse
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin reflink, se copia
+    fcntl = None
+
+HOME_PATH = os.environ.get('USERPROFILE') or os.path.expanduser('~')
+MASTER_PROFILE_PATH = os.path.join(HOME_PATH, '.gemini_translator_profile')  # Perfil con la sesión iniciada
+POOL_PATH = os.path.join(HOME_PATH, '.gemini_translator_profiles')  # Carpeta de las copias
+POOL_SIZE = 4  # Copias que se crean por defecto
+LEASE_POLL = 1.0  # Segundos entre intentos mientras todas las copias están prestadas
+LOCK_GRACE = 30  # Segundos que un lock ilegible se respeta antes de darlo por abandonado
+
+# Carpetas que no se clonan: cachés que Chrome regenera solo
+SKIP_DIRS = {
+    'Cache', 'Code Cache', 'GPUCache', 'DawnCache', 'DawnGraphiteCache', 'DawnWebGPUCache',
+    'GraphiteDawnCache', 'ShaderCache', 'GrShaderCache', 'Media Cache', 'CacheStorage',
+    'ScriptCache', 'Crashpad', 'Crash Reports', 'BrowserMetrics', 'component_crx_cache',
+    'optimization_guide_model_store', 'OptimizationHints', 'Safe Browsing', 'Download Service',
+    'blob_storage', 'GCM Store', 'segmentation_platform', 'Subresource Filter',
+}
+# Archivos de bloqueo de la instancia que usa el perfil
+SKIP_FILES = ('SingletonLock', 'SingletonCookie', 'SingletonSocket', 'lockfile', 'RunningChromeVersion')
+# Carpetas cuyo contenido Chrome no reescribe en su sitio: basta un hardlink
+HARDLINK_DIRS = {'Extensions', 'Dictionaries', 'hyphen-data', 'WidevineCdm'}
+
+# Estado de la sesión que se renueva desde el maestro antes de cada préstamo
+SESSION_FILES = [
+    'Local State',  # Incluye la clave con la que se cifran las cookies
+    os.path.join('Default', 'Cookies'),
+    os.path.join('Default', 'Network', 'Cookies'),
+]
+
+FICLONE = 0x40049409  # ioctl de Linux para clonar un archivo (btrfs, xfs, ...)
+_reflink_supported = fcntl is not None and sys.platform.startswith('linux')
+
+
+def _reflink(src, dst):
+    """Clona src en dst compartiendo bloques; False si el sistema de archivos no puede."""
+    global _reflink_supported
+    if not _reflink_supported:
+        return False
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        try:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+        except OSError as e:
+            if e.errno in (errno.EOPNOTSUPP, errno.EXDEV, errno.EINVAL, errno.ENOTTY):
+                _reflink_supported = False
+            return False
+    shutil.copystat(src, dst)
+    return True
+
+
+def clone_file(src, dst, hardlink=False):
+    """Copia un archivo del perfil por el camino más barato. Devuelve 'hardlink', 'reflink' o 'copy'."""
+    if hardlink:
+        try:
+            os.link(src, dst)
+            return 'hardlink'
+        except OSError:
+            pass
+    try:
+        if _reflink(src, dst):
+            return 'reflink'
+    except OSError:
+        pass
+    shutil.copy2(src, dst)
+    return 'copy'
+
+
+def clone_profile(master, target):
+    """Clona `master` en `target` (que no debe existir). Devuelve cuántos archivos por método."""
+    counts = {'hardlink': 0, 'reflink': 0, 'copy': 0, 'skipped': 0}
+    tmp_target = target + '.tmp'
+    shutil.rmtree(tmp_target, ignore_errors=True)
+    for folder, subdirs, files in os.walk(master):
+        relative = os.path.relpath(folder, master)
+        parts = set(relative.split(os.sep))
+        subdirs[:] = [name for name in subdirs if name not in SKIP_DIRS]
+        os.makedirs(os.path.join(tmp_target, relative), exist_ok=True)
+        hardlink = bool(parts & HARDLINK_DIRS)
+        for name in files:
+            if name.startswith(SKIP_FILES):
+                continue
+            src = os.path.join(folder, name)
+            if os.path.islink(src) or not os.path.isfile(src):
+                continue
+            try:
+                counts[clone_file(src, os.path.join(tmp_target, relative, name), hardlink)] += 1
+            except OSError:
+                counts['skipped'] += 1  # Archivo bloqueado por un Chrome abierto: Chrome lo recrea
+    os.replace(tmp_target, target)
+    return counts
+
+
+def copy_session_file(src, dst):
+    """Copia una base SQLite de forma consistente (API de backup); el resto, tal cual."""
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    with open(src, 'rb') as f:
+        is_sqlite = f.read(16) == b'SQLite format 3\x00'
+    if not is_sqlite:
+        shutil.copy2(src, dst)
+        return
+    try:
+        source = sqlite3.connect(f"file:{src}?mode=ro", uri=True, timeout=2)
+        try:
+            target = sqlite3.connect(dst)
+            try:
+                source.backup(target)
+            finally:
+                target.close()
+        finally:
+            source.close()
+        shutil.copystat(src, dst)
+    except sqlite3.Error:
+        shutil.copy2(src, dst)  # El maestro la tiene bloqueada: copia tal cual
+
+
+def pid_alive(pid):
+    if pid <= 0:
+        return False
+    if sys.platform == 'win32':
+        import ctypes
+        handle = ctypes.windll.kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        ctypes.windll.kernel32.CloseHandle(handle)
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def profile_in_use(path):
+    """True si un Chrome vivo tiene abierto el perfil (según su SingletonLock o lockfile)."""
+    singleton = os.path.join(path, 'SingletonLock')
+    if os.path.islink(singleton):
+        host, _, pid = os.readlink(singleton).rpartition('-')
+        return host == socket.gethostname() and pid.isdigit() and pid_alive(int(pid))
+    return os.path.exists(os.path.join(path, 'lockfile'))
+
+
+class ProfileLease:
+    """Una copia prestada; se devuelve con release() o al salir del bloque with."""
+
+    def __init__(self, pool, name, path, worker):
+        self.pool = pool
+        self.name = name
+        self.path = path
+        self.worker = worker
+        self.released = False
+
+    def release(self):
+        if not self.released:
+            self.released = True
+            self.pool._unlock(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class ProfilePool:
+    """Copias del perfil maestro en POOL_PATH/worker_NN, prestadas con archivos de bloqueo."""
+
+    def __init__(self, master=MASTER_PROFILE_PATH, pool_path=POOL_PATH, size=POOL_SIZE):
+        self.master = os.path.abspath(master)
+        self.pool_path = os.path.abspath(pool_path)
+        self.size = size
+        self._leases = []
+        self._lock = threading.Lock()
+        atexit.register(self.release_all)
+
+    def names(self):
+        return [f"worker_{index:02d}" for index in range(1, self.size + 1)]
+
+    def _path(self, name):
+        return os.path.join(self.pool_path, name)
+
+    def _lock_path(self, name):
+        return os.path.join(self.pool_path, name + '.lock')
+
+    def ensure(self, count=None):
+        """Crea las copias que falten (hasta `count`, o el tamaño del pool). Devuelve las creadas."""
+        if not os.path.isdir(self.master):
+            raise FileNotFoundError(f"No existe el perfil maestro: {self.master}")
+        if profile_in_use(self.master):
+            print("⚠️ El perfil maestro está abierto en Chrome: la copia puede quedar sin algunos archivos")
+        os.makedirs(self.pool_path, exist_ok=True)
+        created = []
+        for name in self.names()[:count or self.size]:
+            if os.path.isdir(self._path(name)):
+                continue
+            started = time.monotonic()
+            counts = clone_profile(self.master, self._path(name))
+            print(f"🧬 {name}: {counts['reflink']} reflink, {counts['hardlink']} hardlink, "
+                  f"{counts['copy']} copiados en {time.monotonic() - started:.1f}s")
+            created.append(name)
+        return created
+
+    def refresh(self, name):
+        """Trae las cookies y la clave de cifrado del maestro si son más nuevas que las de la copia."""
+        refreshed = 0
+        for relative in SESSION_FILES:
+            src = os.path.join(self.master, relative)
+            dst = os.path.join(self._path(name), relative)
+            if not os.path.exists(src):
+                continue
+            if os.path.exists(dst) and os.path.getmtime(dst) >= os.path.getmtime(src):
+                continue
+            for suffix in ('-journal', '-wal'):
+                try:
+                    os.remove(dst + suffix)  # El journal viejo no corresponde a la base nueva
+                except OSError:
+                    pass
+            copy_session_file(src, dst)
+            refreshed += 1
+        return refreshed
+
+    def _try_lock(self, name, worker):
+        """Crea el lock ya escrito: el JSON va a un temporal que se enlaza en su lugar.
+
+        os.link falla si el lock existe, así que nadie lo ve a medio escribir.
+        Sin enlaces duros se crea con O_EXCL (y reclaim respeta LOCK_GRACE).
+        """
+        lock_path = self._lock_path(name)
+        os.makedirs(self.pool_path, exist_ok=True)
+        tmp_path = f"{lock_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"pid": os.getpid(), "worker": worker, "since": time.time()}, f)
+        try:
+            os.link(tmp_path, lock_path)
+            return True
+        except FileExistsError:
+            return False
+        except OSError:
+            try:
+                fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                return False
+            with open(tmp_path, 'r', encoding='utf-8') as src, os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(src.read())
+            return True
+        finally:
+            os.remove(tmp_path)
+
+    def _read_lock(self, name):
+        try:
+            with open(self._lock_path(name), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _unlock(self, lease):
+        with self._lock:
+            if lease in self._leases:
+                self._leases.remove(lease)
+        try:
+            os.remove(self._lock_path(lease.name))
+        except OSError:
+            pass
+
+    def reclaim(self):
+        """Libera las copias cuyo dueño ya no existe; devuelve sus nombres."""
+        reclaimed = []
+        for name in self.names():
+            owner = self._read_lock(name)
+            if owner is None:
+                try:
+                    age = time.time() - os.path.getmtime(self._lock_path(name))
+                except OSError:
+                    continue  # Sin lock: la copia está libre
+                if age < LOCK_GRACE:
+                    continue  # Ilegible pero reciente: puede estar escribiéndose
+            elif pid_alive(owner.get('pid', 0)):
+                continue
+            if profile_in_use(self._path(name)):
+                continue  # El proceso murió pero su Chrome sigue abierto
+            for lock_name in SKIP_FILES:
+                try:
+                    os.remove(os.path.join(self._path(name), lock_name))
+                except OSError:
+                    pass
+            try:
+                os.remove(self._lock_path(name))
+                reclaimed.append(name)
+            except OSError:
+                pass
+        return reclaimed
+
+    def lease(self, worker="", timeout=None):
+        """Presta una copia libre (creándola si hace falta) con la sesión del maestro al día.
+
+        Espera hasta `timeout` segundos si todas están prestadas (None = sin
+        límite); lanza TimeoutError si vence.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            for name in self.names():
+                if not self._try_lock(name, worker):
+                    continue
+                try:
+                    if not os.path.isdir(self._path(name)):
+                        os.makedirs(self.pool_path, exist_ok=True)
+                        clone_profile(self.master, self._path(name))
+                    self.refresh(name)
+                except Exception:
+                    os.remove(self._lock_path(name))
+                    raise
+                lease = ProfileLease(self, name, self._path(name), worker)
+                with self._lock:
+                    self._leases.append(lease)
+                return lease
+            if self.reclaim():
+                continue
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError(f"Las {self.size} copias del perfil están prestadas")
+            time.sleep(LEASE_POLL)
+
+    def release_all(self):
+        with self._lock:
+            leases = list(self._leases)
+        for lease in leases:
+            lease.release()
+
+    def status(self):
+        rows = []
+        for name in self.names():
+            owner = self._read_lock(name)
+            rows.append({
+                "name": name,
+                "exists": os.path.isdir(self._path(name)),
+                "worker": owner.get('worker') if owner else None,
+                "pid": owner.get('pid') if owner else None,
+                "alive": bool(owner) and pid_alive(owner.get('pid', 0)),
+            })
+        return rows
+
+    def remove_free(self):
+        """Borra las copias que no están prestadas (se vuelven a clonar al pedirlas)."""
+        removed = []
+        for row in self.status():
+            if row["exists"] and not row["alive"] and self._try_lock(row["name"], "remove"):
+                try:
+                    shutil.rmtree(self._path(row["name"]), ignore_errors=True)
+                    removed.append(row["name"])
+                finally:
+                    os.remove(self._lock_path(row["name"]))
+        return removed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Copias de trabajo del perfil de Chrome para correr en paralelo.")
+    parser.add_argument('--master', default=MASTER_PROFILE_PATH, help="perfil con la sesión iniciada")
+    parser.add_argument('--pool', default=POOL_PATH, help="carpeta de las copias")
+    parser.add_argument('--size', type=int, default=POOL_SIZE, help="número de copias")
+    parser.add_argument('--status', action='store_true', help="mostrar qué copias están prestadas")
+    parser.add_argument('--reclaim', action='store_true', help="liberar copias de procesos muertos")
+    parser.add_argument('--remove', action='store_true', help="borrar las copias libres")
+    args = parser.parse_args(argv)
+
+    pool = ProfilePool(args.master, args.pool, max(1, args.size))
+    if args.status:
+        for row in pool.status():
+            state = "—" if not row["exists"] else (
+                f"prestada a {row['worker'] or '?'} (PID {row['pid']})" if row["alive"] else "libre")
+            print(f"   {row['name']}: {state}")
+        return 0
+    if args.reclaim:
+        print(f"♻️ Recuperadas: {', '.join(pool.reclaim()) or 'ninguna'}")
+        return 0
+    if args.remove:
+        print(f"🗑️ Borradas: {', '.join(pool.remove_free()) or 'ninguna'}")
+        return 0
+
+    try:
+        created = pool.ensure()
+    except FileNotFoundError as e:
+        print(f"❌ {e}")
+        return 2
+    updated = [name for name in pool.names() if name not in created and pool._try_lock(name, "refresh")]
+    for name in updated:
+        try:
+            pool.refresh(name)
+        finally:
+            os.remove(pool._lock_path(name))
+    print(f"✅ {pool.size} copia(s) en {pool.pool_path} ({len(created)} nueva(s), {len(updated)} actualizada(s))")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
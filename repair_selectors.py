@@ -17,9 +17,12 @@ from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service as ChromeService
 from webdriver_manager.chrome import ChromeDriverManager
 
+from browser_service import attach as attach_browser
+
 # Configuración
 MAIN_SCRIPT = os.path.join(os.path.dirname(__file__), "gemini_translator.py")
-PROFILE_PATH = os.path.join(os.environ['USERPROFILE'], '.gemini_translator_profile')
+PROFILE_PATH = os.path.join(os.environ.get('USERPROFILE') or os.path.expanduser('~'), '.gemini_translator_profile')
+GEMINI_APP_URL = "https://gemini.google.com/app"
 
 
 class RepairToolGUI:
@@ -182,21 +185,27 @@ class RepairToolGUI:
             self.log("")
             self.log("🚀 Iniciando navegador Chrome...", 'info')
             
-            options = Options()
-            options.add_argument(f"--user-data-dir={PROFILE_PATH}")
-            options.add_argument("--disable-blink-features=AutomationControlled")
-            options.add_experimental_option("excludeSwitches", ["enable-automation"])
-            
-            service = ChromeService(ChromeDriverManager().install())
-            self.driver = webdriver.Chrome(service=service, options=options)
-            self.log("   ✅ Chrome iniciado correctamente", 'success')
+            # Una pestaña (ya cargada) del Chrome de browser_service.py si está corriendo
+            self.driver = attach_browser("reparador", GEMINI_APP_URL, profile_path=PROFILE_PATH)
+            if self.driver is None:
+                options = Options()
+                options.add_argument(f"--user-data-dir={PROFILE_PATH}")
+                options.add_argument("--disable-blink-features=AutomationControlled")
+                options.add_experimental_option("excludeSwitches", ["enable-automation"])
+                
+                service = ChromeService(ChromeDriverManager().install())
+                self.driver = webdriver.Chrome(service=service, options=options)
+                self.log("   ✅ Chrome iniciado correctamente", 'success')
+            else:
+                self.log("   ✅ Conectado al servicio de navegador", 'success')
             
             # Paso 2: Navegar a Gemini
             self.set_status("🌐 Navegando a Gemini...")
             self.set_progress(20)
-            self.log("\n🌐 Navegando a gemini.google.com/app...", 'info')
-            self.driver.get("https://gemini.google.com/app")
-            time.sleep(5)
+            if not self.driver.current_url.startswith(GEMINI_APP_URL):
+                self.log("\n🌐 Navegando a gemini.google.com/app...", 'info')
+                self.driver.get(GEMINI_APP_URL)
+                time.sleep(5)
             self.log("   ✅ Página cargada", 'success')
             
             # Cerrar popups
@@ -448,12 +457,11 @@ class RepairToolGUI:
             if sys.platform == 'win32':
                 # Usar CREATE_NEW_CONSOLE para que el usuario pueda ver e interactuar
                 self.translator_process = subprocess.Popen(
-                    [sys.executable, "-u", MAIN_SCRIPT],
+                    [sys.executable, "-u", MAIN_SCRIPT, "--non-interactive"],
                     creationflags=subprocess.CREATE_NEW_CONSOLE,
                     cwd=os.path.dirname(MAIN_SCRIPT)
                 )
                 self.log("📺 Se abrió una ventana de consola separada", 'info')
-                self.log("👉 Presiona Enter en esa ventana para iniciar", 'warning')
                 self.log("", 'info')
                 self.log("⏳ Esperando a que el proceso termine...", 'info')
                 
@@ -463,23 +471,15 @@ class RepairToolGUI:
             else:
                 # En otros sistemas, ejecutar normalmente
                 self.translator_process = subprocess.Popen(
-                    [sys.executable, "-u", MAIN_SCRIPT],
+                    [sys.executable, "-u", MAIN_SCRIPT, "--non-interactive"],
                     stdout=subprocess.PIPE,
                     stderr=subprocess.STDOUT,
-                    stdin=subprocess.PIPE,
+                    stdin=subprocess.DEVNULL,
                     text=True,
                     bufsize=1,
                     cwd=os.path.dirname(MAIN_SCRIPT)
                 )
                 
-                # Enviar Enter automático
-                time.sleep(2)
-                try:
-                    self.translator_process.stdin.write("\n")
-                    self.translator_process.stdin.flush()
-                except:
-                    pass
-                
                 # Leer output
                 for line in iter(self.translator_process.stdout.readline, ''):
                     if line:
@@ -487,11 +487,19 @@ class RepairToolGUI:
                     if self.translator_process.poll() is not None:
                         break
             
-            # Proceso terminado
+            # Proceso terminado: el código de salida dice cómo fue el lote
+            returncode = self.translator_process.wait()
             self.log("\n" + "=" * 50, 'header')
-            self.log("✅ PROCESO COMPLETADO", 'success')
+            if returncode == 0:
+                self.log("✅ PROCESO COMPLETADO", 'success')
+                self.set_status("✅ Traducción completada", '#00ff88')
+            elif returncode == 1:
+                self.log("⚠️ PROCESO COMPLETADO CON FALLOS", 'warning')
+                self.set_status("⚠️ Algunas imágenes fallaron", '#ffa502')
+            else:
+                self.log(f"❌ EL TRADUCTOR NO PUDO EMPEZAR (código {returncode})", 'error')
+                self.set_status("❌ Error al iniciar el traductor", '#ff4757')
             self.log("=" * 50, 'header')
-            self.set_status("✅ Traducción completada", '#00ff88')
             self.set_progress(100)
             
         except Exception as e:
@@ -0,0 +1,189 @@
+"""
+📈 RUN REPORT
+==============
+Telemetría por imagen del traductor: cuánto tarda cada etapa (preprocesado,
+subida, prompt, generación, descarga del resultado...) y qué camino de
+fallback se usó en cada una (p. ej. subida por DevTools, DataTransfer,
+send_keys, menú o diálogo del sistema).
+
+Al final de la corrida se escribe un informe JSON o CSV con una fila por
+intento de imagen y, por etapa, p50 / p95 / máximo; por fallback, cuántas
+veces se usó y cuánto tardó de media su etapa.
+
+Uso:
+    begin(imagen)                      # Abre el registro del intento
+    activate(imagen)                   # Lo vuelve el actual (antes de operar en su pestaña)
+    with span("subida"):               # Mide una etapa del actual
+        ...
+    fallback("subida", "datatransfer") # Anota el camino usado
+    finish(imagen, ok, error)
+"""
+
+import csv
+import json
+import math
+import time
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+_lock = threading.Lock()
+_local = threading.local()
+_open = {}  # imagen -> registro del intento en curso
+_records = []  # Todos los intentos, en orden de inicio
+_started_at = None
+
+
+def reset_report():
+    global _started_at
+    with _lock:
+        _open.clear()
+        _records.clear()
+        _started_at = datetime.now().isoformat()
+
+
+def begin(image):
+    """Abre un registro para un nuevo intento de `image` y lo vuelve el actual."""
+    record = {"image": image, "started_at": datetime.now().isoformat(), "spans": {}, "methods": {},
+              "outcome": None, "error": None, "_t0": time.perf_counter()}
+    with _lock:
+        _open[image] = record
+        _records.append(record)
+    _local.current = record
+    return record
+
+
+def activate(image):
+    """Vuelve actual el intento abierto de `image` (las pestañas se atienden por turnos)."""
+    _local.current = _open.get(image)
+
+
+def _target(image):
+    if image is not None:
+        return _open.get(image)
+    return getattr(_local, 'current', None)
+
+
+def record(stage, seconds, image=None):
+    """Suma `seconds` a la etapa del intento de `image` (o del actual)."""
+    rec = _target(image)
+    if rec is not None:
+        with _lock:
+            rec["spans"][stage] = rec["spans"].get(stage, 0.0) + seconds
+
+
+@contextmanager
+def span(stage, image=None):
+    """Mide el bloque como la etapa `stage`, aunque termine con excepción."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - start, image)
+
+
+def fallback(stage, method, image=None):
+    """Anota qué camino se usó en la etapa (el último gana si se anotan varios)."""
+    rec = _target(image)
+    if rec is not None:
+        with _lock:
+            rec["methods"][stage] = method
+
+
+def finish(image, ok, error=None):
+    with _lock:
+        rec = _open.pop(image, None)
+        if rec is None:
+            return
+        rec["outcome"] = "ok" if ok else "failed"
+        rec["error"] = error
+        rec["total"] = time.perf_counter() - rec.pop("_t0")
+    if getattr(_local, 'current', None) is rec:
+        _local.current = None
+
+
+def percentile(values, q):
+    """Percentil por rango más cercano (q en 0..100)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(q / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def _finished_records():
+    with _lock:
+        return [dict(rec) for rec in _records if rec["outcome"]]
+
+
+def stage_stats(records=None):
+    """Etapa -> count / total / p50 / p95 / max (segundos), en orden de aparición."""
+    records = _finished_records() if records is None else records
+    values = {}
+    for rec in records:
+        for stage, seconds in rec["spans"].items():
+            values.setdefault(stage, []).append(seconds)
+        values.setdefault("total", []).append(rec["total"])
+    return {stage: {"count": len(vals), "total": sum(vals), "p50": percentile(vals, 50),
+                    "p95": percentile(vals, 95), "max": max(vals)}
+            for stage, vals in values.items()}
+
+
+def fallback_stats(records=None):
+    """Etapa -> método -> count y media de la etapa cuando se usó ese método."""
+    records = _finished_records() if records is None else records
+    stats = {}
+    for rec in records:
+        for stage, method in rec["methods"].items():
+            entry = stats.setdefault(stage, {}).setdefault(method, {"count": 0, "seconds": 0.0, "failed": 0})
+            entry["count"] += 1
+            entry["seconds"] += rec["spans"].get(stage, 0.0)
+            entry["failed"] += rec["outcome"] != "ok"
+    for methods in stats.values():
+        for entry in methods.values():
+            entry["avg"] = entry.pop("seconds") / entry["count"]
+    return stats
+
+
+def format_report_lines():
+    """Líneas de texto con el resumen por etapa y por fallback, listas para el log."""
+    records = _finished_records()
+    lines = []
+    for stage, entry in stage_stats(records).items():
+        lines.append(f"{stage}: {entry['count']}x · p50 {entry['p50']:.2f}s · "
+                     f"p95 {entry['p95']:.2f}s · máx {entry['max']:.2f}s")
+    for stage, methods in fallback_stats(records).items():
+        used = ", ".join(f"{method} {entry['count']}x ({entry['avg']:.2f}s)"
+                         for method, entry in sorted(methods.items(), key=lambda item: -item[1]["count"]))
+        lines.append(f"{stage} vía: {used}")
+    return lines
+
+
+def write_report(path):
+    """Escribe el informe; CSV si la ruta termina en .csv (una fila por intento), si no JSON."""
+    records = _finished_records()
+    if path.lower().endswith('.csv'):
+        stages = list(stage_stats(records))
+        stages.remove("total")
+        method_stages = sorted({stage for rec in records for stage in rec["methods"]})
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(["image", "started_at", "outcome", "error", "total"]
+                            + stages + [f"{stage}_method" for stage in method_stages])
+            for rec in records:
+                writer.writerow([rec["image"], rec["started_at"], rec["outcome"], rec["error"] or "",
+                                 f"{rec['total']:.3f}"]
+                                + [f"{rec['spans'][s]:.3f}" if s in rec["spans"] else "" for s in stages]
+                                + [rec["methods"].get(s, "") for s in method_stages])
+        return path
+
+    report = {
+        "started_at": _started_at,
+        "finished_at": datetime.now().isoformat(),
+        "images": records,
+        "stages": stage_stats(records),
+        "fallbacks": fallback_stats(records),
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    return path
@@ -0,0 +1,211 @@
+"""
+🧭 SELECTOR REGISTRY
+=====================
+Registro compartido de selectores CSS candidatos, ordenados por cómo les fue
+en las últimas búsquedas: el que ganó la vez anterior se prueba primero, así
+que cuando Instagram o Gemini cambian el marcado solo la primera búsqueda
+paga por los selectores que ya no sirven.
+
+Los candidatos salen de la lista por defecto de cada herramienta y de
+selectors_report.json (lo que escribe repair_selectors.py). El ranking
+(tasa de acierto reciente y latencia media) se guarda en
+~/.selector_ranking.json al terminar.
+
+Uso:
+    registry = get_registry()
+    selector, posts = registry.resolve("instagram.grid_posts", DEFAULTS, lambda sel: buscar(sel))
+
+    python selector_registry.py    # Muestra el ranking y los aciertos guardados
+"""
+
+import os
+import json
+import time
+import atexit
+import threading
+
+HOME_PATH = os.environ.get('USERPROFILE') or os.path.expanduser('~')
+RANKING_PATH = os.path.join(HOME_PATH, '.selector_ranking.json')  # Ranking entre corridas
+REPORT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'selectors_report.json')
+RECENT_WEIGHT = 0.3  # Peso del último resultado en la tasa de acierto reciente
+UNTRIED_SCORE = 0.5  # Tasa supuesta de un candidato que aún no se probó
+
+
+def report_candidates(report_path=REPORT_PATH):
+    """Clave -> [selector] a partir de selectors_report.json, o {} si no existe.
+
+    El reporte es de la página de Gemini: sus claves quedan como gemini.<clave>.
+    """
+    try:
+        with open(report_path, 'r', encoding='utf-8') as f:
+            report = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    candidates = {}
+    for key, found in report.items():
+        label = (found or {}).get('ariaLabel') if isinstance(found, dict) else None
+        if label:
+            tag = (found.get('tagName') or 'button').lower()
+            escaped = label.replace('\\', '\\\\').replace("'", "\\'")
+            candidates[f"gemini.{key}"] = [f"{tag}[aria-label='{escaped}']"]
+    return candidates
+
+
+class SelectorRegistry:
+    """Candidatos por clave, ordenados por acierto reciente y latencia."""
+
+    def __init__(self, ranking_path=RANKING_PATH, report_path=REPORT_PATH):
+        self.ranking_path = ranking_path
+        self.extra = report_candidates(report_path) if report_path else {}
+        self.ranking = {}  # clave -> selector -> {"hits", "misses", "score", "seconds"}
+        self.lookups = {}  # clave -> {"count", "first_try", "failed"} de esta corrida
+        self._lock = threading.Lock()
+        self._dirty = False
+
+    def load(self):
+        try:
+            with open(self.ranking_path, 'r', encoding='utf-8') as f:
+                self.ranking = json.load(f)
+        except (OSError, ValueError):
+            self.ranking = {}
+        return self
+
+    def save(self):
+        with self._lock:
+            if not self._dirty or not self.ranking_path:
+                return
+            tmp_path = self.ranking_path + '.tmp'
+            try:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(self.ranking, f, ensure_ascii=False, indent=1)
+                os.replace(tmp_path, self.ranking_path)
+                self._dirty = False
+            except OSError as e:
+                print(f"⚠️ No se pudo guardar el ranking de selectores: {e}")
+
+    def ordered(self, key, defaults):
+        """Candidatos de `key` (reporte + defaults + los que ganaron antes), mejor primero."""
+        seen = []
+        with self._lock:
+            known = self.ranking.get(key, {})
+            for selector in [*self.extra.get(key, ()), *defaults, *known]:
+                if selector not in seen:
+                    seen.append(selector)
+
+            def rank(item):
+                index, selector = item
+                entry = known.get(selector)
+                if not entry:
+                    return (-UNTRIED_SCORE, 0.0, index)
+                wins = entry["hits"] or 1
+                return (-entry["score"], entry["seconds"] / wins, index)
+            return [selector for _, selector in sorted(enumerate(seen), key=rank)]
+
+    def record(self, key, selector, hit, seconds=0.0):
+        with self._lock:
+            entry = self.ranking.setdefault(key, {}).setdefault(
+                selector, {"hits": 0, "misses": 0, "score": UNTRIED_SCORE, "seconds": 0.0})
+            entry["score"] = (1 - RECENT_WEIGHT) * entry["score"] + RECENT_WEIGHT * (1.0 if hit else 0.0)
+            if hit:
+                entry["hits"] += 1
+                entry["seconds"] += seconds
+            else:
+                entry["misses"] += 1
+            self._dirty = True
+
+    def _count_lookup(self, key, tries, found):
+        with self._lock:
+            entry = self.lookups.setdefault(key, {"count": 0, "first_try": 0, "failed": 0})
+            entry["count"] += 1
+            entry["first_try"] += found and tries == 1
+            entry["failed"] += not found
+
+    def resolve(self, key, defaults, attempt):
+        """Prueba los candidatos en orden con attempt(selector) hasta el primer resultado verdadero.
+
+        Devuelve (selector, resultado), o (None, None) si ninguno sirvió.
+        Los errores de attempt cuentan como fallo de ese selector.
+        """
+        tries = 0
+        for selector in self.ordered(key, defaults):
+            tries += 1
+            started = time.perf_counter()
+            try:
+                result = attempt(selector)
+            except Exception:
+                result = None
+            self.record(key, selector, bool(result), time.perf_counter() - started)
+            if result:
+                self._count_lookup(key, tries, True)
+                return selector, result
+        self._count_lookup(key, tries, False)
+        return None, None
+
+    def resolved(self, key, candidates, index, seconds):
+        """Anota una búsqueda hecha de una vez (p. ej. en un script) sobre `candidates` en orden.
+
+        `index` es la posición del que ganó, o None si ninguno; los anteriores cuentan como fallos.
+        """
+        tried = candidates if index is None else candidates[:index + 1]
+        for position, selector in enumerate(tried):
+            self.record(key, selector, position == index, seconds)
+        self._count_lookup(key, len(tried), index is not None)
+
+    def stats(self):
+        """Clave -> {"lookups", "first_try", "failed", "selectors": {selector -> hits/misses/hit_rate/avg_ms}}."""
+        with self._lock:
+            stats = {}
+            for key in sorted(set(self.ranking) | set(self.lookups)):
+                lookups = self.lookups.get(key, {"count": 0, "first_try": 0, "failed": 0})
+                selectors = {}
+                for selector, entry in self.ranking.get(key, {}).items():
+                    total = entry["hits"] + entry["misses"]
+                    selectors[selector] = {
+                        "hits": entry["hits"], "misses": entry["misses"],
+                        "hit_rate": entry["hits"] / total if total else 0.0,
+                        "avg_ms": entry["seconds"] / entry["hits"] * 1000 if entry["hits"] else None,
+                    }
+                stats[key] = {"lookups": lookups["count"], "first_try": lookups["first_try"],
+                              "failed": lookups["failed"], "selectors": selectors}
+            return stats
+
+    def format_stats_lines(self, session_only=True):
+        """Líneas de resumen por clave; con session_only, solo las usadas en esta corrida."""
+        lines = []
+        for key, entry in self.stats().items():
+            if session_only and not entry["lookups"]:
+                continue
+            best = max(entry["selectors"].items(), key=lambda item: item[1]["hits"], default=None)
+            line = f"{key}: {entry['lookups']} búsqueda(s), {entry['first_try']} al primer intento"
+            if entry["failed"]:
+                line += f", {entry['failed']} sin resultado"
+            if best and best[1]["hits"]:
+                line += f" · mejor: {best[0]} ({best[1]['hit_rate']:.0%}, {best[1]['avg_ms']:.0f} ms)"
+            lines.append(line)
+        return lines
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """Registro compartido del proceso; se carga la primera vez y se guarda al salir."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = SelectorRegistry().load()
+            atexit.register(_registry.save)
+        return _registry
+
+
+if __name__ == "__main__":
+    registry = SelectorRegistry(report_path=None).load()
+    if not registry.ranking:
+        print(f"Sin ranking guardado en {RANKING_PATH}")
+    for key, entry in registry.stats().items():
+        print(f"\n{key}")
+        for selector in registry.ordered(key, ()):
+            sel = entry["selectors"][selector]
+            avg = f"{sel['avg_ms']:.0f} ms" if sel["avg_ms"] is not None else "-"
+            print(f"   {sel['hits']:>5} ✅ {sel['misses']:>5} ❌  {sel['hit_rate']:>4.0%}  {avg:>7}  {selector}")
@@ -0,0 +1,221 @@
+"""
+🗄️ TRANSLATION JOBS
+====================
+Cola de trabajos persistente (SQLite) para los lotes del traductor.
+
+Cada imagen es un trabajo con estado:
+    pending → uploading → generating → saved
+                                     ↘ failed (tras MAX_ATTEMPTS intentos)
+
+Los cambios de estado se confirman al momento, así que si Chrome o la
+máquina se caen a mitad de lote, la siguiente corrida retoma desde el primer
+trabajo sin terminar. Los fallos se reintentan con espera exponencial.
+"""
+
+import os
+import time
+import sqlite3
+import threading
+
+from profile_pool import pid_alive
+
+PENDING = 'pending'
+UPLOADING = 'uploading'
+GENERATING = 'generating'
+SAVED = 'saved'
+FAILED = 'failed'
+STATES = (PENDING, UPLOADING, GENERATING, SAVED, FAILED)
+
+MAX_ATTEMPTS = 3
+RETRY_BASE_DELAY = 30  # Segundos; se duplica en cada intento
+IDLE_POLL = 1.0  # Segundos entre consultas mientras se espera un reintento
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    source TEXT NOT NULL UNIQUE,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    seen_at REAL NOT NULL,
+    next_attempt_at REAL NOT NULL DEFAULT 0,
+    owner INTEGER
+);
+CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (state, next_attempt_at, id);
+"""
+
+
+class JobQueue:
+    """Cola de trabajos de traducción, una fila por imagen original.
+
+    Se puede usar desde varios hilos (el productor del planificador de
+    pestañas reclama trabajos mientras el hilo principal los completa).
+    """
+
+    def __init__(self, path, max_attempts=MAX_ATTEMPTS, retry_base_delay=RETRY_BASE_DELAY):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.retry_base_delay = retry_base_delay
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+        # Colas creadas antes de que hubiera dueño por trabajo
+        columns = {row['name'] for row in self._db.execute("PRAGMA table_info(jobs)")}
+        if 'owner' not in columns:
+            self._db.execute("ALTER TABLE jobs ADD COLUMN owner INTEGER")
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            return self._db.execute(sql, params)
+
+    def _fetch(self, sql, params=()):
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
+
+    def recover(self):
+        """Devuelve a pending los trabajos que quedaron a medias en una corrida caída.
+        
+        Los de otro proceso que sigue vivo (otra instancia en paralelo) no se tocan.
+        """
+        recovered = 0
+        for row in self._fetch("SELECT DISTINCT owner FROM jobs WHERE state IN (?, ?)", (UPLOADING, GENERATING)):
+            owner = row['owner']
+            if owner and owner != os.getpid() and pid_alive(owner):
+                continue
+            cursor = self._execute(
+                "UPDATE jobs SET state = ?, updated_at = ? WHERE state IN (?, ?) AND owner IS ?",
+                (PENDING, time.time(), UPLOADING, GENERATING, owner))
+            recovered += cursor.rowcount
+        return recovered
+
+    def add(self, source, result=None, seen_at=None, missed=True):
+        """Registra una imagen encontrada en esta corrida.
+
+        Con `result` (ya traducida, p. ej. desde la caché) queda como saved.
+        Sin él, una imagen nueva queda pending; una que constaba como saved
+        vuelve a pending si `missed` (se consultó la caché y su traducción ya
+        no es válida). Con `missed` falso (no se pudo leer la imagen para
+        consultarla) el trabajo saved se deja como está.
+        """
+        now = time.time()
+        seen_at = seen_at or now
+        with self._lock:
+            row = self._db.execute("SELECT state FROM jobs WHERE source = ?", (source,)).fetchone()
+            if row is None:
+                self._db.execute(
+                    "INSERT INTO jobs (source, state, result, created_at, updated_at, seen_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (source, SAVED if result else PENDING, result, now, now, seen_at))
+            elif result:
+                self._db.execute(
+                    "UPDATE jobs SET state = ?, result = ?, error = NULL, updated_at = ?, seen_at = ? "
+                    "WHERE source = ?", (SAVED, result, now, seen_at, source))
+            elif row['state'] == SAVED and missed:
+                self._db.execute(
+                    "UPDATE jobs SET state = ?, attempts = 0, result = NULL, next_attempt_at = 0, "
+                    "updated_at = ?, seen_at = ? WHERE source = ?", (PENDING, now, seen_at, source))
+            else:
+                self._db.execute("UPDATE jobs SET seen_at = ? WHERE source = ?", (seen_at, source))
+
+    def claim(self):
+        """Reclama el primer trabajo listo (pending y sin espera) y lo pasa a uploading.
+        
+        El UPDATE solo gana si el trabajo sigue pending, así que varios
+        procesos (p. ej. traductores con perfiles del pool) pueden compartir
+        la misma cola sin reclamar dos veces la misma imagen.
+        """
+        now = time.time()
+        with self._lock:
+            while True:
+                row = self._db.execute(
+                    "SELECT * FROM jobs WHERE state = ? AND next_attempt_at <= ? ORDER BY id LIMIT 1",
+                    (PENDING, now)).fetchone()
+                if row is None:
+                    return None
+                cursor = self._db.execute(
+                    "UPDATE jobs SET state = ?, attempts = attempts + 1, owner = ?, updated_at = ? "
+                    "WHERE id = ? AND state = ?", (UPLOADING, os.getpid(), now, row['id'], PENDING))
+                if cursor.rowcount:
+                    break
+        job = dict(row, owner=os.getpid())
+        job['attempts'] += 1
+        return job
+
+    def iter_ready(self):
+        """Genera las rutas de los trabajos a medida que están listos.
+
+        Mientras queden trabajos en curso o esperando un reintento, espera
+        en lugar de terminar: un fallo puede volver a la cola.
+        """
+        while True:
+            job = self.claim()
+            if job:
+                yield job['source']
+                continue
+            row = self._fetch(
+                "SELECT COUNT(*) AS busy, MIN(CASE WHEN state = ? THEN next_attempt_at END) AS next_at "
+                "FROM jobs WHERE state IN (?, ?, ?)", (PENDING, PENDING, UPLOADING, GENERATING))[0]
+            if not row['busy']:
+                return
+            wait = (row['next_at'] or 0) - time.time()
+            time.sleep(min(max(wait, 0.1), IDLE_POLL))
+
+    def mark_generating(self, source):
+        self._set_state(source, GENERATING)
+
+    def mark_saved(self, source, result):
+        self._execute(
+            "UPDATE jobs SET state = ?, result = ?, error = NULL, updated_at = ? WHERE source = ?",
+            (SAVED, result, time.time(), source))
+
+    def fail(self, source, error, retry=True):
+        """Anota un fallo. Vuelve a pending con espera exponencial hasta agotar intentos.
+
+        Devuelve el nuevo estado.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT attempts FROM jobs WHERE source = ?", (source,)).fetchone()
+            attempts = row['attempts'] if row else self.max_attempts
+            if retry and attempts < self.max_attempts:
+                state = PENDING
+                next_at = now + self.retry_base_delay * 2 ** max(attempts - 1, 0)
+            else:
+                state, next_at = FAILED, 0
+            self._db.execute(
+                "UPDATE jobs SET state = ?, error = ?, next_attempt_at = ?, updated_at = ? WHERE source = ?",
+                (state, str(error), next_at, now, source))
+        return state
+
+    def retry_failed(self):
+        """Da una nueva tanda de intentos a los trabajos fallidos."""
+        cursor = self._execute(
+            "UPDATE jobs SET state = ?, attempts = 0, next_attempt_at = 0, updated_at = ? WHERE state = ?",
+            (PENDING, time.time(), FAILED))
+        return cursor.rowcount
+
+    def _set_state(self, source, state):
+        self._execute("UPDATE jobs SET state = ?, updated_at = ? WHERE source = ?",
+                      (state, time.time(), source))
+
+    def counts(self, since=0):
+        """Trabajos por estado, de las imágenes vistas desde `since`."""
+        counts = dict.fromkeys(STATES, 0)
+        for row in self._fetch("SELECT state, COUNT(*) AS n FROM jobs WHERE seen_at >= ? GROUP BY state",
+                                 (since,)):
+            counts[row['state']] = row['n']
+        return counts
+
+    def jobs(self, since=0):
+        """Filas de las imágenes vistas desde `since`, en orden de llegada."""
+        return [dict(row) for row in
+                self._fetch("SELECT * FROM jobs WHERE seen_at >= ? ORDER BY id", (since,))]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
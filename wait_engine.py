@@ -0,0 +1,242 @@
+"""
+⏱️ WAIT ENGINE
+===============
+Esperas por eventos para Selenium: en lugar de time.sleep fijos, se sondea
+una condición hasta que se cumple o vence el tiempo, y se registra cuánto
+tardó cada espera para ver en qué se va el tiempo.
+
+Uso:
+    wait_until(driver, url_changed(old_url), timeout=5, label="siguiente post")
+    wait_until(driver, any_of(image_decoded("article img"), element_present("article video")))
+"""
+
+import time
+import threading
+
+DEFAULT_TIMEOUT = 10  # Segundos
+DEFAULT_POLL = 0.1  # Segundos entre sondeos
+
+_stats = {}  # etiqueta -> {"count", "total", "max", "timeouts"}
+_stats_lock = threading.Lock()
+
+
+def wait_until(driver, condition, timeout=DEFAULT_TIMEOUT, poll=DEFAULT_POLL, label=None):
+    """Sondea condition(driver) hasta que devuelva un valor verdadero.
+
+    Devuelve ese valor, o None si venció el tiempo. Los errores de la
+    condición (elemento obsoleto, página navegando...) cuentan como "aún no".
+    Si la condición tiene start(), se llama antes del primer sondeo.
+    """
+    start_hook = getattr(condition, 'start', None)
+    if start_hook:
+        start_hook()
+    start = time.monotonic()
+    deadline = start + timeout
+    result = None
+    while True:
+        try:
+            result = condition(driver)
+        except Exception:
+            result = None
+        if result or time.monotonic() >= deadline:
+            break
+        time.sleep(poll)
+
+    record_wait(label or getattr(condition, '__name__', 'wait'), time.monotonic() - start, not result)
+    return result or None
+
+
+def record_wait(label, seconds, timed_out=False):
+    """Registra la duración de una espera bajo una etiqueta."""
+    with _stats_lock:
+        entry = _stats.setdefault(label, {"count": 0, "total": 0.0, "max": 0.0, "timeouts": 0})
+        entry["count"] += 1
+        entry["total"] += seconds
+        entry["max"] = max(entry["max"], seconds)
+        if timed_out:
+            entry["timeouts"] += 1
+
+
+def wait_stats():
+    """Copia de las estadísticas: etiqueta -> count/total/avg/max/timeouts, de mayor a menor total."""
+    with _stats_lock:
+        rows = {label: dict(entry, avg=entry["total"] / entry["count"]) for label, entry in _stats.items()}
+    return dict(sorted(rows.items(), key=lambda item: item[1]["total"], reverse=True))
+
+
+def format_wait_report():
+    """Líneas de texto con el resumen de esperas, listas para el log."""
+    lines = []
+    for label, entry in wait_stats().items():
+        line = (f"{label}: {entry['count']}x · total {entry['total']:.1f}s · "
+                f"media {entry['avg']:.2f}s · máx {entry['max']:.2f}s")
+        if entry["timeouts"]:
+            line += f" · {entry['timeouts']} timeout(s)"
+        lines.append(line)
+    return lines
+
+
+def reset_wait_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+# ---------------------------------------------------------------------------
+# Condiciones: cada una devuelve una función driver -> valor verdadero/falso.
+# Las que miran el DOM usan un único execute_script (un round trip por sondeo).
+# ---------------------------------------------------------------------------
+
+def script_true(script, *args):
+    """La condición se cumple cuando el script devuelve un valor verdadero."""
+    def condition(driver):
+        return driver.execute_script(script, *args)
+    condition.__name__ = 'script'
+    return condition
+
+
+def url_changed(old_url):
+    def condition(driver):
+        url = driver.current_url
+        return url if url != old_url else None
+    condition.__name__ = 'url_changed'
+    return condition
+
+
+def url_contains(fragment):
+    def condition(driver):
+        return fragment in driver.current_url
+    condition.__name__ = 'url_contains'
+    return condition
+
+
+def document_ready():
+    condition = script_true("return document.readyState === 'complete';")
+    condition.__name__ = 'document_ready'
+    return condition
+
+
+def element_present(css):
+    """Algún elemento coincide con el selector CSS."""
+    condition = script_true("return !!document.querySelector(arguments[0]);", css)
+    condition.__name__ = 'element_present'
+    return condition
+
+
+def element_visible(css):
+    """Algún elemento que coincide con el selector está visible."""
+    condition = script_true("""
+        return Array.from(document.querySelectorAll(arguments[0]))
+            .some(e => e.offsetWidth > 0 && e.offsetHeight > 0);
+    """, css)
+    condition.__name__ = 'element_visible'
+    return condition
+
+
+def element_absent(css):
+    """Ningún elemento visible coincide con el selector (p. ej. un spinner que desaparece)."""
+    condition = script_true("""
+        return !Array.from(document.querySelectorAll(arguments[0]))
+            .some(e => e.offsetWidth > 0 && e.offsetHeight > 0);
+    """, css)
+    condition.__name__ = 'element_absent'
+    return condition
+
+
+def image_decoded(css):
+    """La primera imagen que coincide ya está decodificada (complete && naturalWidth)."""
+    condition = script_true("""
+        const img = document.querySelector(arguments[0]);
+        return !!(img && img.complete && img.naturalWidth > 0);
+    """, css)
+    condition.__name__ = 'image_decoded'
+    return condition
+
+
+def images_decoded(css):
+    """Hay al menos una imagen que coincide y todas están decodificadas."""
+    condition = script_true("""
+        const imgs = Array.from(document.querySelectorAll(arguments[0]));
+        return imgs.length > 0 && imgs.every(img => img.complete && img.naturalWidth > 0);
+    """, css)
+    condition.__name__ = 'images_decoded'
+    return condition
+
+
+def element_decoded(element):
+    """La imagen (WebElement) dada ya está decodificada."""
+    condition = script_true(
+        "return !!(arguments[0].complete && arguments[0].naturalWidth > 0);", element)
+    condition.__name__ = 'element_decoded'
+    return condition
+
+
+# Instala (una vez por documento) un MutationObserver que anota la hora de la
+# última mutación y devuelve los ms transcurridos desde entonces. Con
+# arguments[0] la cuenta empieza de cero: la acción recién hecha puede no
+# haber mutado el DOM todavía.
+_MUTATION_PROBE_JS = """
+    if (arguments[0]) {
+        window.__waitEngineLastMutation = performance.now();
+    }
+    if (!window.__waitEngineObserver) {
+        window.__waitEngineLastMutation = performance.now();
+        window.__waitEngineObserver = new MutationObserver(() => {
+            window.__waitEngineLastMutation = performance.now();
+        });
+        window.__waitEngineObserver.observe(document.documentElement,
+            { childList: true, subtree: true, attributes: true, characterData: true });
+    }
+    return performance.now() - window.__waitEngineLastMutation;
+"""
+
+
+def dom_settled(quiet=0.5):
+    """El DOM lleva `quiet` segundos sin mutaciones, contados desde que empezó la espera."""
+    state = {"fresh": True}
+
+    def condition(driver):
+        reset, state["fresh"] = state["fresh"], False
+        return driver.execute_script(_MUTATION_PROBE_JS, reset) >= quiet * 1000
+
+    def start():
+        state["fresh"] = True
+    condition.__name__ = 'dom_settled'
+    condition.start = start
+    return condition
+
+
+def _start_all(conditions):
+    def start():
+        for cond in conditions:
+            hook = getattr(cond, 'start', None)
+            if hook:
+                hook()
+    return start
+
+
+def any_of(*conditions):
+    def condition(driver):
+        for cond in conditions:
+            try:
+                result = cond(driver)
+            except Exception:
+                continue
+            if result:
+                return result
+        return None
+    condition.__name__ = 'any_of'
+    condition.start = _start_all(conditions)
+    return condition
+
+
+def all_of(*conditions):
+    def condition(driver):
+        result = None
+        for cond in conditions:
+            result = cond(driver)
+            if not result:
+                return None
+        return result
+    condition.__name__ = 'all_of'
+    condition.start = _start_all(conditions)
+    return condition